@@ -39,6 +39,18 @@ CONFIG_FILE = os.environ.get("AX_SHELL_CONFIG_FILE", get_relative_path("../confi
 MATUGEN_STATE_FILE = os.path.join(STATE_DIR, "matugen")
 
 
+# Launcher file search: directories to index, and directory names skipped
+# anywhere below them. Hidden (dot) directories such as ~/.cache are skipped
+# unless file_search_hidden is set.
+FILE_SEARCH_ROOTS_DEFAULT = [HOME_DIR]
+FILE_SEARCH_EXCLUDES_DEFAULT = ["node_modules", "__pycache__", "venv", "site-packages", "target"]
+
+# Exchange rates for the launcher's currency conversions. {base} is the
+# lower-case code of the currency the table is relative to; tables are
+# fetched for the pivot currency, and for others only when it lacks one.
+CURRENCY_RATES_URL_DEFAULT = "https://www.floatrates.com/daily/{base}.json"
+CURRENCY_PIVOT_DEFAULT = "USD"
+
 BAR_WORKSPACE_USE_CHINESE_NUMERALS = False
 BAR_THEME = "Pills"
 
@@ -112,6 +124,13 @@ if os.path.exists(CONFIG_FILE):
         "metrics_small_visible", {"cpu": True, "ram": True, "disk": True, "gpu": True}
     )
 
+    FILE_SEARCH_ROOTS = config.get("file_search_roots", FILE_SEARCH_ROOTS_DEFAULT)
+    FILE_SEARCH_EXCLUDES = config.get("file_search_excludes", FILE_SEARCH_EXCLUDES_DEFAULT)
+    FILE_SEARCH_HIDDEN = config.get("file_search_hidden", False)
+
+    CURRENCY_RATES_URL = config.get("currency_rates_url", CURRENCY_RATES_URL_DEFAULT)
+    CURRENCY_PIVOT = config.get("currency_pivot", CURRENCY_PIVOT_DEFAULT)
+
     DASHBOARD_COMPONENTS = config.get("dashboard_components_visibility", {})
     SHOW_DASHBOARD_WIDGETS = DASHBOARD_COMPONENTS.get("widgets", True)
     SHOW_DASHBOARD_PINS = DASHBOARD_COMPONENTS.get("pins", True)
@@ -159,6 +178,13 @@ else:
     METRICS_VISIBLE = {"cpu": True, "ram": True, "disk": True, "gpu": True}
     METRICS_SMALL_VISIBLE = {"cpu": True, "ram": True, "disk": True, "gpu": True}
 
+    FILE_SEARCH_ROOTS = FILE_SEARCH_ROOTS_DEFAULT
+    FILE_SEARCH_EXCLUDES = FILE_SEARCH_EXCLUDES_DEFAULT
+    FILE_SEARCH_HIDDEN = False
+
+    CURRENCY_RATES_URL = CURRENCY_RATES_URL_DEFAULT
+    CURRENCY_PIVOT = CURRENCY_PIVOT_DEFAULT
+
     SHOW_DASHBOARD_WIDGETS = True
     SHOW_DASHBOARD_PINS = True
     SHOW_DASHBOARD_KANBAN = True
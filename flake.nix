@@ -63,12 +63,9 @@
             ];
           })
           ps_.dbus-python
-          ps_.ijson
-          ps_.numpy
           ps_.pillow
           ps_.psutil
           ps_.pywayland
-          ps_.requests
           ps_.setproctitle
           ps_.toml
           ps_.watchdog
@@ -12,6 +12,8 @@ from modules.corners import Corners
 from modules.dock import Dock
 from modules.notch import Notch
 from modules.notifications import NotificationPopup
+from services.hyprland_state import HyprlandState
+from utils.occlusion import get_occlusion_index
 
 class AxShellApp(Application):
     def __init__(self):
@@ -26,6 +28,11 @@ class AxShellApp(Application):
         self.ensure_current_wallpaper_exists()
         self.config = load_config()
 
+        # Seed the shared compositor store before any module subscribes to it,
+        # and hook the occlusion index up first so it syncs before modules query it.
+        self.hyprland_state = HyprlandState.get_initial()
+        get_occlusion_index()
+
         self.corners = Corners()
         self.bar = Bar()
         self.notch = Notch()
@@ -3,8 +3,9 @@ import re
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-from fabric.utils import idle_add, remove_handler
+from fabric.utils import idle_add
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
@@ -12,9 +13,22 @@ from fabric.widgets.entry import Entry
 from fabric.widgets.image import Image
 from fabric.widgets.label import Label
 from fabric.widgets.scrolledwindow import ScrolledWindow
-from gi.repository import Gdk, GdkPixbuf, GLib
+from gi.repository import Gdk, GLib
 
 import modules.icons as icons
+from services.thumbnail_cache import ThumbnailCache
+from utils.cliphist import decode, entry_content, entry_id, entry_ids, list_entries
+from utils.search_providers import CancellationToken
+from utils.text_index import TrigramIndex
+from widgets.virtual_list import VirtualList
+
+# Lines of `cliphist list` handed to the panel at once while they stream
+# in. The first chunk is about a screenful, so it shows up right away.
+FIRST_CHUNK_SIZE = 20
+CHUNK_SIZE = 500
+# Pixels on the longer side of image previews; rows all have the same
+# height, and a preview fits in a text row.
+THUMBNAIL_SIZE = 48
 
 
 class ClipHistory(Box):
@@ -27,16 +41,29 @@ class ClipHistory(Box):
         )
 
         self.tmp_dir = tempfile.mkdtemp(prefix="cliphist-")
-        self.image_cache = {}
-        
+        self.thumbnails = ThumbnailCache.get_initial()
+
         self.notch = kwargs["notch"]
         self.selected_index = -1
-        self._arranger_handler = 0
         self.clipboard_items = []
-        self._loading = False
-        self._pending_updates = False
-
-        self.viewport = Box(name="viewport", spacing=4, orientation="v")
+        self._items_by_id = {}
+        # Casefolded contents by entry id, filled in by the loader thread.
+        self.search_index = TrigramIndex()
+        self._search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cliphist-search")
+        self._search_token = None
+        self._load_token = None
+        # Whether clipboard_items holds all of the history, and how many
+        # items the running sync has added at the top so far.
+        self._complete = False
+        self._merged_items = 0
+        self._prioritize_handler = 0
+
+        self.viewport = VirtualList(
+            name="viewport",
+            spacing=4,
+            create_row=self.create_clipboard_row,
+            bind_row=self.bind_clipboard_row,
+        )
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Clipboard History...",
@@ -59,6 +86,26 @@ class ClipHistory(Box):
             propagate_width=False,
             propagate_height=False,
         )
+        self.scrolled_window.get_vadjustment().connect(
+            "value-changed", lambda *_: self._queue_prioritize_previews()
+        )
+
+        self.placeholder = Box(
+            name="no-clip-container",
+            orientation="v",
+            h_align="center",
+            v_align="center",
+            h_expand=True,
+            v_expand=True,
+            children=[
+                Label(
+                    name="no-clip",
+                    markup=icons.clipboard,
+                    h_align="center",
+                    v_align="center",
+                ),
+            ],
+        )
 
         self.header_box = Box(
             name="header_box",
@@ -88,244 +135,296 @@ class ClipHistory(Box):
             children=[
                 self.header_box,
                 self.scrolled_window,
+                self.placeholder,
             ],
         )
 
         self.add(self.history_box)
         self.show_all()
+        self.placeholder.set_no_show_all(True)
+        self.placeholder.hide()
 
     def close(self):
         """Close the clipboard history panel"""
-        self.viewport.children = []
-        self.selected_index = -1
+        self._cancel_load()
+        self.update_selection(-1)
         self.notch.close_notch()
 
     def open(self):
-        """Open the clipboard history panel and load items"""
-        if self._loading:
-            return
-        self._loading = True
+        """Open the clipboard history panel and sync items"""
         self.search_entry.set_text("")
         self.search_entry.grab_focus()
+        self._sync()
+
+    def _sync(self):
+        """
+        Bring the items up to date with cliphist. Once they hold the whole
+        history, only entries newer than the newest one are read and
+        merged in, and rows are kept between openings; otherwise it is
+        all loaded again. A sync still running is cancelled, not queued.
+        """
+        self._cancel_load()
+        self._load_token = token = CancellationToken()
+        newest_id = entry_id(self.clipboard_items[0]) if self._complete and self.clipboard_items else None
+        if newest_id is None:
+            self._reset_items()
+        self._complete = False
+        self._merged_items = 0
+        GLib.Thread.new(
+            "cliphist-loader", self._load_clipboard_items_thread, (token, newest_id, len(self._items_by_id))
+        )
 
-        # Use GLib.Thread for proper async execution
-        GLib.Thread.new("cliphist-loader", self._load_clipboard_items_thread, None)
-
-    def _load_clipboard_items_thread(self, user_data):
-        """Background thread worker for loading clipboard items"""
+    def _reset_items(self):
+        self.clipboard_items = []
+        self._items_by_id = {}
+        self.search_index.clear()
+        self.display_clipboard_items(self.search_entry.get_text())
+
+    def _cancel_load(self):
+        if self._load_token is not None:
+            self._load_token.cancel()
+            self._load_token = None
+
+    @property
+    def _loading(self):
+        return self._load_token is not None
+
+    def _load_clipboard_items_thread(self, job):
+        """Background thread worker streaming new clipboard items to the panel in chunks"""
+        token, newest_id, known = job
+        chunk = []
+        chunk_size = FIRST_CHUNK_SIZE
+        completed = False
+        new = 0
         try:
-            result = subprocess.run(
-                ["cliphist", "list"], 
-                capture_output=True, 
-                check=True
-            )
-            # Decode stdout with error handling
-            stdout_str = result.stdout.decode('utf-8', errors='replace')
-            lines = stdout_str.strip().split('\n')
-            new_items = []
-            for line in lines:
+            for line in list_entries(token):
                 if not line or "<meta http-equiv" in line:
                     continue
-                new_items.append(line)
-            # Update UI from main thread
-            GLib.idle_add(self._update_items, new_items)
-        except subprocess.CalledProcessError as e:
+                line_id = entry_id(line)
+                if newest_id is not None and line_id is not None and line_id <= newest_id:
+                    # Newest first: the rest is known already.
+                    break
+                chunk.append(line)
+                new += 1
+                if len(chunk) >= chunk_size:
+                    self._hand_over(token, chunk)
+                    chunk = []
+                    chunk_size = CHUNK_SIZE
+            completed = not token.cancelled
+            if chunk and completed:
+                self._hand_over(token, chunk)
+            if completed and newest_id is not None:
+                # cliphist drops entries on its own too (copied again, past
+                # max-items); known ones it no longer has have to go. The
+                # ids are only read when the entry count says some are gone.
+                ids = entry_ids(known + new)
+                if ids is not None:
+                    gone = self._items_by_id.keys() - ids
+                    if gone:
+                        GLib.idle_add(self._drop_missing, token, gone)
+        except OSError as e:
             print(f"Error loading clipboard history: {e}", file=sys.stderr)
-        except Exception as e:
-            print(f"Unexpected error: {e}", file=sys.stderr)
         finally:
-            GLib.idle_add(self._loading_finished)
-    
-    def _loading_finished(self):
+            GLib.idle_add(self._loading_finished, token, completed)
+
+    def _hand_over(self, token, chunk):
+        # Indexed here, off the main loop, before the items can be searched for.
+        self.search_index.add(
+            (item_id, entry_content(line))
+            for line in chunk
+            if (item_id := entry_id(line)) is not None
+        )
+        GLib.idle_add(self._merge_items, token, chunk)
+
+    def _loading_finished(self, token, completed):
         """Handle loading completion on main thread"""
-        self._loading = False
-        if self._pending_updates:
-            self._pending_updates = False
-            GLib.Thread.new("cliphist-loader", self._load_clipboard_items_thread, None)
+        if token is self._load_token:
+            self._load_token = None
+            # A cancelled sync leaves a gap, so the next one starts over.
+            self._complete = completed
+            if not self.viewport.items and self._search_token is None:
+                self._show_placeholder()
         return False
 
-    def _update_items(self, new_items):
-        """Update the items list from main thread"""
-        self.clipboard_items = new_items
-        self.display_clipboard_items()
-
-    def display_clipboard_items(self, filter_text=""):
-        """Display clipboard items in the viewport"""
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.viewport.children = []
-        self.selected_index = -1
-        
-
-        filtered_items = []
-        for item in self.clipboard_items:
-
-            content = item.split('\t', 1)[1] if '\t' in item else item
-            if filter_text.lower() in content.lower():
-                filtered_items.append(item)
-        
-
-        if not filtered_items:
+    def _merge_items(self, token, new_items):
+        """Add a chunk of streamed items, newer than those known, from the main thread"""
+        if token is not self._load_token:
+            return False
+        position = self._merged_items
+        self._merged_items += len(new_items)
+        for item in new_items:
+            item_id = entry_id(item)
+            if item_id is not None:
+                self._items_by_id[item_id] = item
+        self.clipboard_items[position:position] = new_items
+        self.display_clipboard_items(self.search_entry.get_text(), keep_position=True)
+        return False
 
-            container = Box(
-                name="no-clip-container",
-                orientation="v",
-                h_align="center",
-                v_align="center",
-                h_expand=True,
-                v_expand=True
-            )
-            
+    def _drop_missing(self, token, gone_ids):
+        """Forget the items whose entries cliphist no longer holds, once a sync has finished reading"""
+        if token is self._load_token:
+            gone = [item for item_id in gone_ids if (item := self._items_by_id.get(item_id)) is not None]
+            if gone:
+                self._forget(gone)
+        return False
 
-            label = Label(
-                name="no-clip",
-                markup=icons.clipboard,
-                h_align="center",
-                v_align="center",
-            )
-            
-            container.add(label)
-            self.viewport.add(container)
+    def _forget(self, items):
+        """Drop `items` from the list and their rows, after cliphist deleted them"""
+        items = set(items)
+        self.clipboard_items = [item for item in self.clipboard_items if item not in items]
+        self._unindex(items)
+        self._show_items([item for item in self.viewport.items if item not in items], keep_position=True)
+
+    def _unindex(self, items):
+        ids = [item_id for item in items if (item_id := entry_id(item)) is not None]
+        for item_id in ids:
+            self._items_by_id.pop(item_id, None)
+        self.search_index.remove(ids)
+
+    def display_clipboard_items(self, filter_text="", keep_position=False):
+        """
+        Show the items matching `filter_text`. Matches are looked up in the
+        search index on a worker thread, and a search still running when
+        another starts is cancelled.
+        """
+        if self._search_token is not None:
+            self._search_token.cancel()
+            self._search_token = None
+        if not filter_text:
+            self._show_items(list(self.clipboard_items), keep_position)
             return
-            
-
-        self._display_items_batch(filtered_items, 0, 10)
+        self._search_token = token = CancellationToken()
+        self._search_executor.submit(self._search_thread, token, filter_text, keep_position)
 
-    def _display_items_batch(self, items, start, batch_size):
-        """Display items in batches to keep UI responsive"""
-        end = min(start + batch_size, len(items))
-        
-        for i in range(start, end):
-            item = items[i]
-            self.viewport.add(self.create_clipboard_item(item))
-        
+    def _search_thread(self, token, filter_text, keep_position):
+        if token.cancelled:
+            return
+        ids = self.search_index.search(filter_text, token)
+        if ids is not None:
+            GLib.idle_add(self._search_finished, token, ids, keep_position)
+
+    def _search_finished(self, token, ids, keep_position):
+        if token is self._search_token:
+            self._search_token = None
+            # Entries deleted or replaced since the search started are gone from the map.
+            items_by_id = self._items_by_id
+            self._show_items([items_by_id[i] for i in ids if i in items_by_id], keep_position)
+        return False
 
-        if end < len(items):
-            GLib.idle_add(self._display_items_batch, items, end, batch_size)
+    def _show_items(self, items, keep_position=False):
+        """Put `items` in the list, keeping the selected one selected if it is still there"""
+        previous = self.selected_index
+        selected = self.viewport.items[previous] if keep_position and previous != -1 else None
+        self.viewport.set_items(items, keep_position=keep_position)
+        self.selected_index = -1
+        if selected is not None and selected in items:
+            self.update_selection(items.index(selected))
+        elif selected is not None and items:
+            # The selected item went away; select the one that took its place.
+            self.update_selection(min(previous, len(items) - 1))
+        elif self.search_entry.get_text() and items:
+            self.update_selection(0)
+
+        if items or self._loading or self._search_token is not None:
+            self._hide_placeholder()
         else:
+            self._show_placeholder()
+        self._queue_prioritize_previews()
+
+    def _show_placeholder(self):
+        self.scrolled_window.hide()
+        self.placeholder.show_all()
+
+    def _hide_placeholder(self):
+        self.placeholder.hide()
+        self.scrolled_window.show()
+
+    def create_clipboard_row(self):
+        """A history row; bind_clipboard_row fills it in for an item"""
+        preview = Image(name="clip-icon", h_align="start")
+        glyph = Label(name="clip-icon", markup=icons.clip_text, h_align="start")
+        label = Label(
+            name="clip-label",
+            ellipsization="end",
+            v_align="center",
+            h_align="start",
+            h_expand=True,
+        )
+        button = Button(
+            name="slot-button",
+            child=Box(name="slot-box", orientation="h", spacing=10, children=[preview, glyph, label]),
+            on_clicked=lambda button, *_: self.paste_item(self._item_id(button.item)),
+        )
+        button.connect(
+            "key-press-event",
+            lambda widget, event: self.on_item_key_press(widget, event, self._item_id(widget.item)),
+        )
+        button.set_can_focus(True)
+        button.add_events(Gdk.EventMask.KEY_PRESS_MASK)
+        button.preview = preview
+        button.glyph = glyph
+        button.label = label
+        button.thumbnail_key = None
+        return button
 
-            if self.search_entry.get_text() and self.viewport.get_children():
-                self.update_selection(0)
-
-    def create_clipboard_item(self, item):
-        """Create a button for a clipboard item"""
-
-        parts = item.split('\t', 1)
-        item_id = parts[0] if len(parts) > 1 else "0"
-        content = parts[1] if len(parts) > 1 else item
-        
-
-        display_text = content.strip()
-        if len(display_text) > 100:
-            display_text = display_text[:97] + "..."
-        
-
-        is_image = self.is_image_data(content)
-        
-        if is_image:
-
-            button = Button(
-                name="slot-button",
-                child=Box(
-                    name="slot-box",
-                    orientation="h",
-                    spacing=10,
-                    children=[
-                        Image(name="clip-icon", h_align="start"),
-                        Label(
-                            name="clip-label",
-                            label="[Image]",
-                            ellipsization="end",
-                            v_align="center",
-                            h_align="start",
-                            h_expand=True,
-                        ),
-                    ],
-                ),
-                tooltip_text="Image in clipboard",
-                on_clicked=lambda *_, id=item_id: self.paste_item(id),
-            )
+    def bind_clipboard_row(self, button, item):
+        """Fill in a row for a clipboard item"""
+        item_id = self._item_id(item)
+        content = entry_content(item)
 
+        if self.is_image_data(content):
+            button.glyph.hide()
+            button.preview.show()
+            button.label.set_label("[Image]")
+            button.set_tooltip_text("Image in clipboard")
             self._load_image_preview_async(item_id, button)
         else:
-
-            button = self.create_text_item_button(item_id, display_text)
-        
-
-        button.connect("key-press-event", lambda widget, event, id=item_id: self.on_item_key_press(widget, event, id))
-        
-
-        button.set_can_focus(True)
-        button.add_events(Gdk.EventMask.KEY_PRESS_MASK)
-            
-        return button
+            display_text = content.strip()
+            if len(display_text) > 100:
+                display_text = display_text[:97] + "..."
+            button.thumbnail_key = None
+            button.preview.hide()
+            button.glyph.show()
+            button.label.set_label(display_text)
+            button.set_tooltip_text(display_text)
+
+    @staticmethod
+    def _item_id(item):
+        parts = item.split('\t', 1)
+        return parts[0] if len(parts) > 1 else "0"
 
     def _load_image_preview_async(self, item_id, button):
-        """Load image preview using GLib.idle_add instead of threads"""
-        def load_image():
-            try:
-                if item_id in self.image_cache:
-                    pixbuf = self.image_cache[item_id]
-                else:
-                    result = subprocess.run(
-                        ["cliphist", "decode", item_id],
-                        capture_output=True,
-                        check=True
-                    )
-                    loader = GdkPixbuf.PixbufLoader()
-                    loader.write(result.stdout)
-                    loader.close()
-                    pixbuf = loader.get_pixbuf()
-                    width, height = pixbuf.get_width(), pixbuf.get_height()
-                    max_size = 72
-                    if width > height:
-                        new_width = max_size
-                        new_height = int(height * (max_size / width))
-                    else:
-                        new_height = max_size
-                        new_width = int(width * (max_size / height))
-                    pixbuf = pixbuf.scale_simple(new_width, new_height, GdkPixbuf.InterpType.BILINEAR)
-                    self.image_cache[item_id] = pixbuf
-                self._update_image_button(button, pixbuf)
-            except Exception as e:
-                print(f"Error loading image preview: {e}", file=sys.stderr)
-            return False
-        GLib.idle_add(load_image)
-
-    def _update_image_button(self, button, pixbuf):
-        """Update the button with the loaded image preview"""
-        box = button.get_child()
-        if box and len(box.get_children()) > 0:
-            image_widget = box.get_children()[0]
-            if isinstance(image_widget, Image):
-                image_widget.set_from_pixbuf(pixbuf)
-
-    def create_text_item_button(self, item_id, display_text):
-        """Create a button for a text clipboard item"""
-        return Button(
-            name="slot-button",
-            child=Box(
-                name="slot-box",
-                orientation="h",
-                spacing=10,
-                children=[
-                    Label(
-                        name="clip-icon",
-                        markup=icons.clip_text,
-                        h_align="start",
-                    ),
-                    Label(
-                        name="clip-label",
-                        label=display_text,
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="start",
-                        h_expand=True,
-                    ),
-                ],
-            ),
-            tooltip_text=display_text,
-            on_clicked=lambda *_: self.paste_item(item_id),
-        )
+        """Load image preview through the thumbnail cache, off the main thread"""
+        key = button.thumbnail_key = f"cliphist:{item_id}"
+
+        def on_thumbnail(pixbuf):
+            # The row may have been bound to another item while the preview was decoded.
+            if pixbuf is not None and button.thumbnail_key == key:
+                button.preview.set_from_pixbuf(pixbuf)
+
+        button.preview.clear()
+        self.thumbnails.request(key, lambda: decode(item_id), THUMBNAIL_SIZE, on_thumbnail)
+
+    def _queue_prioritize_previews(self):
+        # Once rows have been bound and moved for the new scroll position.
+        if not self._prioritize_handler:
+            self._prioritize_handler = GLib.idle_add(self._prioritize_visible_previews)
+
+    def _prioritize_visible_previews(self):
+        """Decode the previews of rows in view before the others"""
+        self._prioritize_handler = 0
+        adj = self.scrolled_window.get_vadjustment()
+        top, bottom = adj.get_value(), adj.get_value() + adj.get_page_size()
+        keys = []
+        for row in self.viewport.get_children():
+            if row.thumbnail_key is None or not row.get_visible():
+                continue
+            allocation = row.get_allocation()
+            if allocation.y < bottom and allocation.y + allocation.height > top:
+                keys.append(row.thumbnail_key)
+        if keys:
+            self.thumbnails.prioritize(keys, THUMBNAIL_SIZE)
+        return False
 
     def is_image_data(self, content):
         """Determine if clipboard content is likely an image"""
@@ -343,18 +442,17 @@ class ClipHistory(Box):
         """Copy the selected item to the clipboard and close (GLib.idle_add)"""
         def paste():
             try:
-                result = subprocess.run(
-                    ["cliphist", "decode", item_id],
-                    capture_output=True,
-                    check=True
-                )
+                data = decode(item_id)
+                if data is None:
+                    print(f"Clipboard item {item_id} no longer exists", file=sys.stderr)
+                    return False
                 subprocess.run(
                     ["wl-copy"],
-                    input=result.stdout,
+                    input=data,
                     check=True
                 )
                 GLib.idle_add(self.close)
-            except subprocess.CalledProcessError as e:
+            except (OSError, subprocess.CalledProcessError) as e:
                 print(f"Error pasting clipboard item: {e}", file=sys.stderr)
             return False
         GLib.idle_add(paste)
@@ -364,12 +462,11 @@ class ClipHistory(Box):
         def delete():
             try:
                 subprocess.run(
-                    ["cliphist", "delete", item_id],
+                    ["cliphist", "delete"],
+                    input=f"{item_id}\t\n".encode(),
                     check=True
                 )
-                self._pending_updates = True
-                if not self._loading:
-                    GLib.idle_add(self._load_clipboard_items_thread)
+                self._forget([item for item in self.clipboard_items if entry_id(item) == int(item_id)])
             except subprocess.CalledProcessError as e:
                 print(f"Error deleting clipboard item: {e}", file=sys.stderr)
             return False
@@ -380,9 +477,9 @@ class ClipHistory(Box):
         def clear():
             try:
                 subprocess.run(["cliphist", "wipe"], check=True)
-                self._pending_updates = True
-                if not self._loading:
-                    GLib.idle_add(self._load_clipboard_items_thread)
+                self._cancel_load()
+                self._complete = True
+                self._reset_items()
             except subprocess.CalledProcessError as e:
                 print(f"Error clearing clipboard history: {e}", file=sys.stderr)
             return False
@@ -413,26 +510,16 @@ class ClipHistory(Box):
 
     def update_selection(self, new_index):
         """Update the selected item in the viewport"""
-        children = self.viewport.get_children()
-        
-
-        if self.selected_index != -1 and self.selected_index < len(children):
-            current_button = children[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-            
-
-        if new_index != -1 and new_index < len(children):
-            new_button = children[new_index]
-            new_button.get_style_context().add_class("selected")
+        if 0 <= new_index < len(self.viewport.items):
             self.selected_index = new_index
-            self.scroll_to_selected(new_button)
         else:
             self.selected_index = -1
+        self.viewport.select(self.selected_index)
 
     def move_selection(self, delta):
         """Move the selection up or down"""
-        children = self.viewport.get_children()
-        if not children:
+        items = self.viewport.items
+        if not items:
             return
             
 
@@ -441,54 +528,24 @@ class ClipHistory(Box):
         else:
             new_index = self.selected_index + delta
             
-        new_index = max(0, min(new_index, len(children) - 1))
+        new_index = max(0, min(new_index, len(items) - 1))
         self.update_selection(new_index)
 
-    def scroll_to_selected(self, button):
-        """Scroll to ensure the selected item is visible"""
-        def scroll():
-            adj = self.scrolled_window.get_vadjustment()
-            alloc = button.get_allocation()
-            if alloc.height == 0:
-                return False
-
-            y = alloc.y
-            height = alloc.height
-            page_size = adj.get_page_size()
-            current_value = adj.get_value()
-
-            visible_top = current_value
-            visible_bottom = current_value + page_size
-
-            if y < visible_top:
-
-                adj.set_value(y)
-            elif y + height > visible_bottom:
-
-                new_value = y + height - page_size
-                adj.set_value(new_value)
-            return False
-        GLib.idle_add(scroll)
-
     def use_selected_item(self):
         """Use (paste) the selected clipboard item"""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1 or self.selected_index >= len(self.clipboard_items):
+        if self.selected_index == -1 or self.selected_index >= len(self.viewport.items):
             return
-            
 
-        item_line = self.clipboard_items[self.selected_index]
+        item_line = self.viewport.items[self.selected_index]
         item_id = item_line.split('\t', 1)[0]
         self.paste_item(item_id)
 
     def delete_selected_item(self):
         """Delete the selected clipboard item"""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1:
+        if self.selected_index == -1 or self.selected_index >= len(self.viewport.items):
             return
-            
 
-        item_line = self.clipboard_items[self.selected_index]
+        item_line = self.viewport.items[self.selected_index]
         item_id = item_line.split('\t', 1)[0]
         self.delete_item(item_id)
 
@@ -506,6 +563,5 @@ class ClipHistory(Box):
             if hasattr(self, 'tmp_dir') and os.path.exists(self.tmp_dir):
                 import shutil
                 shutil.rmtree(self.tmp_dir)
-            self.image_cache.clear()
         except Exception as e:
             print(f"Error cleaning up temporary files: {e}", file=sys.stderr)
@@ -3,9 +3,8 @@ import logging
 
 import cairo
 from fabric.hyprland.widgets import get_hyprland_connection
-from fabric.utils import (exec_shell_command, exec_shell_command_async,
-                          get_relative_path, idle_add, remove_handler)
-from fabric.utils.helpers import get_desktop_applications
+from fabric.utils import (exec_shell_command_async, get_relative_path,
+                          idle_add, remove_handler)
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.eventbox import EventBox
@@ -15,6 +14,12 @@ from gi.repository import Gdk, GLib, Gtk
 
 import config.data as data
 from modules.corners import MyCorner
+from services.desktop_apps import DesktopAppIndex
+from services.hyprland_state import HyprlandState
+from services.launch_history import LaunchHistory
+from utils.app_resolver import SubstringIndex, normalize_window_class
+from utils.frame_scheduler import FrameScheduler
+from utils.hyprland_ipc import HyprlandIPC
 from utils.icon_resolver import IconResolver
 from utils.occlusion import check_occlusion
 from widgets.wayland import WaylandWindow as Window
@@ -28,14 +33,13 @@ def read_config():
             config_data = json.load(file)
             
         if "pinned_apps" in config_data and config_data["pinned_apps"] and isinstance(config_data["pinned_apps"][0], str):
-            all_apps = get_desktop_applications()
-            app_map = {app.name: app for app in all_apps if app.name}
+            app_index = DesktopAppIndex.get_initial()
             
             old_pinned = config_data["pinned_apps"]
             config_data["pinned_apps"] = []
             
             for app_id in old_pinned:
-                app = app_map.get(app_id)
+                app = app_index.get_by_name(app_id)
                 if app:
                     app_data_obj = {
                         "name": app.name,
@@ -129,25 +133,34 @@ class Dock(Window):
 
         self.config = read_config()
         self.conn = get_hyprland_connection()
-        self.icon_resolver = IconResolver() 
+        self.hypr_state = HyprlandState.get_initial()
+        self.ipc = HyprlandIPC.get_initial()
+        self.icon_resolver = IconResolver.get_initial()
         self.pinned = self.config.get("pinned_apps", [])
         self.config_path = get_relative_path("../config/dock.json")
-        self.app_map = {}
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        self.app_index = DesktopAppIndex.get_initial()
+        self.launch_history = LaunchHistory.get_initial()
+        self.update_app_map()
         
         self.hide_id = None
         self._arranger_handler = None
+        # Keyed model of the rendered dock: key -> button, in display order.
+        self._buttons: dict[tuple, Button] = {}
+        self._focused_key = None
         self._drag_in_progress = False
         self.always_occluded = data.DOCK_ALWAYS_OCCLUDED if not self.integrated_mode else False
         self.is_mouse_over_dock_area = False
         self._prevent_occlusion = False
 
         self.view = Box(name="viewport", spacing=4)
+        self.separator = Box(v_expand=False, h_expand=False, h_align="center", v_align="center", name="dock-separator")
         self.wrapper = Box(name="dock", children=[self.view], style_classes=["left"] if data.BAR_POSITION == "Right" else [])
 
         self.wrapper.set_orientation(dock_wrapper_orientation_val)
         self.view.set_orientation(dock_wrapper_orientation_val)
+        self.separator.set_orientation(
+            Gtk.Orientation.VERTICAL if dock_wrapper_orientation_val == Gtk.Orientation.HORIZONTAL else Gtk.Orientation.HORIZONTAL
+        )
 
         if self.integrated_mode:
             self.wrapper.add_style_class("integrated")
@@ -277,37 +290,23 @@ class Dock(Window):
             self.conn.connect("event::ready", self.update_dock)
             if not self.integrated_mode: self.conn.connect("event::ready", lambda *args: GLib.timeout_add(250, self.check_occlusion_state))
 
-        for ev in ("activewindow", "openwindow", "closewindow", "changefloatingmode"):
-            self.conn.connect(f"event::{ev}", self.update_dock)
+        scheduler = FrameScheduler.get_initial()
+        self._dock_update = scheduler.subscribe("dock", self.update_dock, widget=self.view)
+        self._focus_update = scheduler.subscribe("dock-focus", self._update_focus, widget=self.view)
+        self.hypr_state.connect("clients-changed", self._dock_update.mark_dirty)
+        self.hypr_state.connect("active-window-changed", self._focus_update.mark_dirty)
+        self.app_index.connect("changed", self._on_apps_changed)
+        Gtk.IconTheme.get_default().connect("changed", self._on_apps_changed)
         
         if not self.integrated_mode:
-            self.conn.connect("event::workspace", self.check_hide)
+            self.hypr_state.connect("workspace-changed", self.check_hide)
         
         GLib.timeout_add_seconds(1, self.check_config_change)
             
-    def _build_app_identifiers_map(self):
-        identifiers = {}
-        for app in self._all_apps:
-            if app.name: identifiers[app.name.lower()] = app
-            if app.display_name: identifiers[app.display_name.lower()] = app
-            if app.window_class: identifiers[app.window_class.lower()] = app
-            if app.executable: identifiers[app.executable.split('/')[-1].lower()] = app
-            if app.command_line: identifiers[app.command_line.split()[0].split('/')[-1].lower()] = app
-        return identifiers
-
-    def _normalize_window_class(self, class_name):
-        if not class_name: return ""
-        normalized = class_name.lower()
-        suffixes = [".bin", ".exe", ".so", "-bin", "-gtk"]
-        for suffix in suffixes:
-            if normalized.endswith(suffix):
-                normalized = normalized[:-len(suffix)]
-        return normalized
-        
     def _classes_match(self, class1, class2):
         if not class1 or not class2: return False
-        norm1 = self._normalize_window_class(class1)
-        norm2 = self._normalize_window_class(class2)
+        norm1 = normalize_window_class(class1)
+        norm2 = normalize_window_class(class2)
         return norm1 == norm2
 
     def on_drag_begin(self, widget, drag_context):
@@ -363,22 +362,20 @@ class Dock(Window):
         return self.find_app_by_key(app_identifier)
     
     def find_app_by_key(self, key_value):
-        if not key_value: return None
-        normalized_id = str(key_value).lower()
-        if normalized_id in self.app_identifiers:
-            return self.app_identifiers[normalized_id]
-        for app in self._all_apps:
-            if app.name and normalized_id in app.name.lower(): return app
-            if app.display_name and normalized_id in app.display_name.lower(): return app
-            if app.window_class and normalized_id in app.window_class.lower(): return app
-            if app.executable and normalized_id in app.executable.lower(): return app
-            if app.command_line and normalized_id in app.command_line.lower(): return app
-        return None
+        return self.app_index.resolver.resolve(key_value)
 
     def update_app_map(self):
-        self._all_apps = get_desktop_applications()
-        self.app_map = {app.name: app for app in self._all_apps if app.name}
-        self.app_identifiers = self._build_app_identifiers_map()
+        self._all_apps = self.app_index.apps
+        self.app_identifiers = self.app_index.identifiers
+
+    def _on_apps_changed(self, *args):
+        # Buttons hold on to the entries and icons they were built from; start over.
+        self.update_app_map()
+        for button in self._buttons.values():
+            button.destroy()
+        self._buttons = {}
+        self._focused_key = None
+        self._dock_update.mark_dirty()
 
     def create_button(self, app_identifier, instances):
         desktop_app = self.find_app(app_identifier)
@@ -400,19 +397,17 @@ class Dock(Window):
                 icon_img = self.icon_resolver.get_icon_pixbuf("image-missing", self.icon_size) 
                 
         items = [Image(pixbuf=icon_img)]
-        tooltip = display_name or (id_value if isinstance(id_value, str) else "Unknown")
-        if not display_name and instances and instances[0].get("title"):
-            tooltip = instances[0]["title"]
 
         button = Button(
             child= Box(name="dock-icon", orientation="v", h_align="center", children=items), 
-            on_clicked=lambda *a: self.handle_app(app_identifier, instances, desktop_app),
-            tooltip_text=tooltip, name="dock-app-button",
+            on_clicked=lambda b, *a: self.handle_app(b.app_identifier, b.instances, b.desktop_app),
+            name="dock-app-button",
         )
         button.app_identifier = app_identifier
         button.desktop_app = desktop_app
-        button.instances = instances
-        if instances: button.add_style_class("instance")
+        button.display_name = display_name
+        button.instances = []
+        self._set_button_instances(button, instances)
 
         button.drag_source_set(
             Gdk.ModifierType.BUTTON1_MASK,
@@ -431,11 +426,27 @@ class Dock(Window):
         button.connect("enter-notify-event", self._on_child_enter)
         return button
 
+    def _set_button_instances(self, button, instances):
+        """Refresh what depends on a button's windows; only touches changed state."""
+        had_instances = bool(button.instances)
+        button.instances = instances
+        if bool(instances) != had_instances:
+            if instances: button.add_style_class("instance")
+            else: button.remove_style_class("instance")
+
+        id_value = button.app_identifier["name"] if isinstance(button.app_identifier, dict) else button.app_identifier
+        tooltip = button.display_name or (id_value if isinstance(id_value, str) else "Unknown")
+        if not button.display_name and instances and instances[0].get("title"):
+            tooltip = instances[0]["title"]
+        if button.get_tooltip_text() != tooltip:
+            button.set_tooltip_text(tooltip)
+
     def handle_app(self, app_identifier, instances, desktop_app=None):
         if not instances:
             if not desktop_app: desktop_app = self.find_app(app_identifier)
             if desktop_app:
                 launch_success = desktop_app.launch()
+                self.launch_history.record(getattr(desktop_app, "id", None))
                 if not launch_success:
                     if desktop_app.command_line: exec_shell_command_async(f"nohup {desktop_app.command_line} &")
                     elif desktop_app.executable: exec_shell_command_async(f"nohup {desktop_app.executable} &")
@@ -451,7 +462,7 @@ class Dock(Window):
             focused = self.get_focused()
             idx = next((i for i, inst in enumerate(instances) if inst["address"] == focused), -1)
             next_inst = instances[(idx + 1) % len(instances)]
-            exec_shell_command(f"hyprctl dispatch focuswindow address:{next_inst['address']}")
+            self.ipc.dispatch("focuswindow", f"address:{next_inst['address']}")
 
     def _on_child_enter(self, widget, event):
         if self.integrated_mode: return False 
@@ -507,10 +518,8 @@ class Dock(Window):
                 self.dock_revealer.set_reveal_child(False)
             self.dock_full.add_style_class("occluded")
 
-    def update_dock(self, *args):
-        self.update_app_map()
-        arranger_handler = getattr(self, "_arranger_handler", None)
-        if arranger_handler: remove_handler(arranger_handler)
+    def _collect_dock_entries(self):
+        """Resolve pinned and running apps into ordered (key, identifier, instances) entries."""
         clients = self.get_clients()
         
         running_windows = {}
@@ -524,11 +533,12 @@ class Dock(Window):
                 else: window_id = title
             if not window_id: window_id = "unknown-app"
             running_windows.setdefault(window_id, []).append(c)
-            normalized_id = self._normalize_window_class(window_id)
+            normalized_id = normalize_window_class(window_id)
             if normalized_id != window_id:
                 running_windows.setdefault(normalized_id, []).extend(running_windows[window_id])
         
-        pinned_buttons = []
+        running_index = SubstringIndex(running_windows)
+        pinned_entries = []
         used_window_classes = set()
         
         for app_data_item in self.pinned:
@@ -556,30 +566,23 @@ class Dock(Window):
             for identifier in possible_identifiers:
                 if identifier in running_windows:
                     instances = running_windows[identifier]; matched_class = identifier; break
-                normalized = self._normalize_window_class(identifier)
+                normalized = normalize_window_class(identifier)
                 if normalized in running_windows:
                     instances = running_windows[normalized]; matched_class = normalized; break
-                for window_class_key in running_windows: 
-                    if len(identifier) >= 3 and identifier in window_class_key:
-                        instances = running_windows[window_class_key]; matched_class = window_class_key
-                        break
-                if matched_class: break
+                if len(identifier) >= 3 and (window_class_key := running_index.find_first(identifier)):
+                    instances = running_windows[window_class_key]; matched_class = window_class_key
+                    break
             
             if matched_class:
                 used_window_classes.add(matched_class)
-                used_window_classes.add(self._normalize_window_class(matched_class))
+                used_window_classes.add(normalize_window_class(matched_class))
             
-            pinned_buttons.append(self.create_button(app_data_item, instances))
+            pinned_entries.append((("pinned", self._pinned_key(app_data_item)), app_data_item, instances))
         
-        open_buttons = []
+        open_entries = []
         for class_name, instances in running_windows.items():
             if class_name not in used_window_classes:
-                app = None
-                app = self.app_identifiers.get(class_name)
-                if not app:
-                    norm_class = self._normalize_window_class(class_name)
-                    app = self.app_identifiers.get(norm_class)
-                if not app: app = self.find_app_by_key(class_name)
+                app = self.find_app_by_key(class_name)
                 if not app and instances and instances[0].get("title"):
                     title = instances[0].get("title", "")
                     potential_name = title.split(" - ")[0].strip()
@@ -593,21 +596,99 @@ class Dock(Window):
                     }
                     identifier = app_data_obj
                 else: identifier = class_name
-                open_buttons.append(self.create_button(identifier, instances))
+                open_entries.append((("open", class_name), identifier, instances))
+
+        # Duplicate pinned entries still need distinct keys.
+        seen = {}
+        for entries in (pinned_entries, open_entries):
+            for i, (key, identifier, instances) in enumerate(entries):
+                count = seen.get(key, 0)
+                seen[key] = count + 1
+                if count: entries[i] = ((*key, count), identifier, instances)
+        return pinned_entries, open_entries
+
+    @staticmethod
+    def _pinned_key(app_data_item):
+        if isinstance(app_data_item, dict):
+            return app_data_item.get("name") or json.dumps(app_data_item, sort_keys=True)
+        return str(app_data_item)
+
+    def update_dock(self, *args):
+        """
+        Reconcile the dock with the pinned apps and running clients. Buttons
+        are keyed, so only apps that appeared or vanished are created or
+        destroyed; the rest just get their windows and style refreshed.
+        """
+        arranger_handler = getattr(self, "_arranger_handler", None)
+        if arranger_handler: remove_handler(arranger_handler)
+        pinned_entries, open_entries = self._collect_dock_entries()
+
+        buttons = {}
+        for key, identifier, instances in pinned_entries + open_entries:
+            button = self._buttons.pop(key, None)
+            if button is not None and button.app_identifier != identifier:
+                button.destroy()
+                button = None
+            if button is None:
+                button = self.create_button(identifier, instances)
+                self.view.add(button)
+                button.show_all()
+                if key == self._focused_key:
+                    # The focused button was replaced; style its successor.
+                    self._focused_key = None
+            else:
+                self._set_button_instances(button, instances)
+            buttons[key] = button
+
+        for stale in self._buttons.values():
+            stale.destroy()
+        self._buttons = buttons
+
+        order = [buttons[key] for key, _, _ in pinned_entries]
+        if pinned_entries and open_entries:
+            order.append(self.separator)
+        order += [buttons[key] for key, _, _ in open_entries]
+
+        if self.separator.get_parent() is None and self.separator in order:
+            self.view.add(self.separator)
+            self.separator.show()
+        elif self.separator.get_parent() is not None and self.separator not in order:
+            self.view.remove(self.separator)
+
+        current = self.view.get_children()
+        if current != order:
+            for position, widget in enumerate(order):
+                if position >= len(current) or current[position] is not widget:
+                    self.view.reorder_child(widget, position)
+                    current = self.view.get_children()
+
+        self._update_focus()
 
-        children = pinned_buttons
-        separator_orientation = Gtk.Orientation.VERTICAL if self.view.get_orientation() == Gtk.Orientation.HORIZONTAL else Gtk.Orientation.HORIZONTAL
-        if pinned_buttons and open_buttons:
-            children += [Box(orientation=separator_orientation, v_expand=False, h_expand=False, h_align="center", v_align="center", name="dock-separator")]
-        children += open_buttons
-        
-        self.view.children = children
         if not self.integrated_mode:
             idle_add(self._update_size)
         self._drag_in_progress = False
         if not self.integrated_mode:
             self.check_occlusion_state()
 
+    def _update_focus(self, *args):
+        """Move the 'focused' style to the button owning the active window."""
+        focused = self.get_focused()
+        focused_key = None
+        if focused:
+            for key, button in self._buttons.items():
+                if any(inst.get("address") == focused for inst in button.instances):
+                    focused_key = key
+                    break
+
+        if focused_key == self._focused_key:
+            return
+        previous = self._buttons.get(self._focused_key)
+        if previous is not None:
+            previous.remove_style_class("focused")
+        if focused_key is not None:
+            self._buttons[focused_key].add_style_class("focused")
+        self._focused_key = focused_key
+
     def _update_size(self):
         if self.integrated_mode: return False 
         width, _ = self.view.get_preferred_width()
@@ -615,16 +696,13 @@ class Dock(Window):
         return False
 
     def get_clients(self):
-        try: return json.loads(self.conn.send_command("j/clients").reply.decode())
-        except json.JSONDecodeError: return []
+        return self.hypr_state.clients
 
     def get_focused(self):
-        try: return json.loads(self.conn.send_command("j/activewindow").reply.decode()).get("address", "")
-        except json.JSONDecodeError: return ""
+        return self.hypr_state.active_window.get("address", "")
 
     def get_workspace(self):
-        try: return json.loads(self.conn.send_command("j/activeworkspace").reply.decode()).get("id", 0)
-        except json.JSONDecodeError: return 0
+        return self.hypr_state.active_workspace.get("id", 0)
 
     def check_occlusion_state(self):
         if self.integrated_mode:
@@ -734,7 +812,7 @@ class Dock(Window):
                 elif instances_dragged:
                     address = instances_dragged[0].get("address")
                     if address:
-                        exec_shell_command(f"hyprctl dispatch focuswindow address:{address}")
+                        self.ipc.dispatch("focuswindow", f"address:{address}")
 
             self._drag_in_progress = False
             if not self.integrated_mode:
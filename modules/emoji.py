@@ -1,18 +1,17 @@
-import os
 import subprocess
 
-import ijson
 from fabric.utils import remove_handler
-from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
 from fabric.widgets.label import Label
 from fabric.widgets.stack import Stack
-from gi.repository import Gdk
+from gi.repository import Gdk, Gtk
 
 import config.data as data
 import modules.icons as icons
+from services.emoji_index import EmojiIndex
+from widgets.emoji_grid import EmojiGrid
 
 vertical_mode = data.PANEL_THEME == "Panel" and (data.BAR_POSITION in ["Left", "Right"] or data.PANEL_POSITION in ["Start", "End"])
 
@@ -36,7 +35,7 @@ class EmojiPicker(Box):
         self.total_pages = 0
 
         self._arranger_handler: int = 0
-        self._all_emojis = self._load_emoji_data()
+        self.emoji_index = EmojiIndex.get_initial()
 
         self.stack = Stack(
             name="viewport",
@@ -45,6 +44,19 @@ class EmojiPicker(Box):
             transition_type="slide-up-down",
             transition_duration=200,
         )
+        self.grids = [
+            EmojiGrid(
+                self.emoji_index,
+                columns=emoji_columns,
+                rows=emoji_rows,
+                on_activate=self.on_emoji_activated,
+                name="emoji-grid",
+            )
+            for _ in range(2)
+        ]
+        for i, grid in enumerate(self.grids):
+            self.stack.add_named(grid, f"page-{i}")
+        self._shown_page_index = 0
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Emojis...",
@@ -85,20 +97,9 @@ class EmojiPicker(Box):
         self.add(self.picker_box)
         self.show_all()
 
-    def _load_emoji_data(self):
-        emoji_data = {}
-        emoji_file_path = get_relative_path("../assets/emoji.json")
-        if not os.path.exists(emoji_file_path):
-            print(f"Emoji JSON file not found at: {emoji_file_path}")
-            return {}
-
-        with open(emoji_file_path, 'r') as f:
-            for emoji_char, emoji_info in ijson.kvitems(f, ''):
-                emoji_data[emoji_char] = emoji_info
-        return emoji_data
-
     def close_picker(self):
-        self.stack.children = []
+        for grid in self.grids:
+            grid.set_items([])
         self.selected_index = -1
         self.notch.close_notch()
 
@@ -110,15 +111,10 @@ class EmojiPicker(Box):
 
     def arrange_viewport(self, query: str = ""):
         remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.stack.children = []
         self.selected_index = -1
         self.current_page_index = 0
 
-        self.filtered_emojis = [
-            (emoji_char, emoji_info)
-            for emoji_char, emoji_info in self._all_emojis.items()
-            if query.casefold() in (emoji_info.get("name", "") + " " + emoji_info.get("group", "")).casefold()
-        ]
+        self.filtered_emojis = self.emoji_index.search(query)
         self.total_pages = (len(self.filtered_emojis) + self.emojis_per_page - 1) // self.emojis_per_page if self.filtered_emojis else 0
 
         self.load_page(self.current_page_index)
@@ -127,105 +123,52 @@ class EmojiPicker(Box):
 
         if should_resize:
             self.resize_viewport()
-        if query.strip() != "" and self.get_all_emoji_buttons():
+        if query.strip() != "" and self.filtered_emojis:
             self.update_selection(0)
 
     def load_page(self, page_index):
-        self.update_selection(-1)
-        page_box = Box(name=f"page-box-{page_index}", orientation="v", spacing=4)
         start_index = page_index * self.emojis_per_page
-        end_index = min((page_index + 1) * self.emojis_per_page, len(self.filtered_emojis))
-        page_emojis = self.filtered_emojis[start_index:end_index]
-
-        grid_box = Box(name="emoji-grid-box", orientation="v", spacing=2)
-
-        row_box = None
-        for i, (emoji_char, emoji_info) in enumerate(page_emojis):
-            if i % emoji_columns == 0:
-                row_box = Box(name="emoji-row-box", orientation="h", spacing=2)
-                grid_box.add(row_box)
-            if row_box is not None:
-                row_box.add(self.bake_emoji_slot(emoji_char, emoji_info))
-        page_box.add(grid_box)
-        self.stack.add_named(page_box, f"page-{page_index}")
-        self.stack.set_visible_child_name(f"page-{page_index}")
-        page_box.show_all()
-
-
-        buttons = self.get_all_emoji_buttons()
-        if buttons and self.selected_index != -1:
-            page_relative_index = self.selected_index % self.emojis_per_page
-            if page_relative_index < len(buttons):
-                self.update_selection(page_relative_index)
+        page_emojis = self.filtered_emojis[start_index:start_index + self.emojis_per_page]
+
+        # Pages alternate between two grids, so the stack can slide from
+        # one to the next.
+        grid = self.grids[page_index % 2]
+        grid.set_items(page_emojis)
+        self.selected_index = -1
+        if self.stack.get_visible_child() is not grid:
+            if page_index > self._shown_page_index:
+                transition = Gtk.StackTransitionType.SLIDE_UP
             else:
-                self.update_selection(len(buttons) - 1)
+                transition = Gtk.StackTransitionType.SLIDE_DOWN
+            self.stack.set_visible_child_full(f"page-{page_index % 2}", transition)
+        self._shown_page_index = page_index
 
+    @property
+    def current_grid(self) -> EmojiGrid:
+        return self.grids[self.current_page_index % 2]
 
     def resize_viewport(self):
         return False
 
-    def bake_emoji_slot(self, emoji_char: str, emoji_info: dict, **kwargs) -> Button:
-        button = Button(
-            name="emoji-slot-button",
-            child=Box(
-                name="emoji-slot-box",
-                orientation="horizontal",
-                halign="center",
-                valign="center",
-                children=[
-                    Label(
-                        name="emoji-char-label",
-                        label=emoji_char,
-                        use_markup=True,
-                        v_align="center",
-                        h_align="center",
-                        css_name="emoji-char-label"
-                    ),
-                ],
-            ),
-            tooltip_text=emoji_info.get("name", "Unknown"),
-            on_clicked=lambda *_: (self.copy_emoji_to_clipboard(emoji_char), self.close_picker()),
-            **kwargs,
-        )
-        return button
-
     def update_selection(self, new_index: int):
-        buttons = self.get_all_emoji_buttons()
-        if not buttons:
-            self.selected_index = -1
-            return
-
-        if self.selected_index != -1 and self.selected_index < len(buttons):
-            current_button = buttons[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-            if not buttons or current_button not in buttons:
-                self.selected_index = -1
-
-        if 0 <= new_index < len(buttons):
-            new_button = buttons[new_index]
-            new_button.get_style_context().add_class("selected")
+        grid = self.current_grid
+        if 0 <= new_index < len(grid.items):
             self.selected_index = new_index
         else:
-             self.selected_index = -1
-
-
-    def get_all_emoji_buttons(self):
-        buttons = []
-        current_page = self.stack.get_visible_child()
-        if current_page and current_page.get_children():
-            if current_page.get_children()[0].get_children():
-                for row_box in current_page.get_children()[0].get_children():
-                    buttons.extend(row_box.get_children())
-        return buttons
+            self.selected_index = -1
+        grid.select(self.selected_index)
 
+    def on_emoji_activated(self, emoji_id: int):
+        self.copy_emoji_to_clipboard(self.emoji_index.char(emoji_id))
+        self.close_picker()
 
     def on_search_entry_activate(self, text):
-        buttons = self.get_all_emoji_buttons()
-        if buttons:
+        emojis = self.current_grid.items
+        if emojis:
             if self.selected_index != -1:
-                buttons[self.selected_index].clicked()
-            elif buttons and text.strip() != "":
-                buttons[0].clicked()
+                self.on_emoji_activated(emojis[self.selected_index])
+            elif text.strip() != "":
+                self.on_emoji_activated(emojis[0])
 
     def on_search_entry_key_press(self, widget, event):
         if event.keyval in (Gdk.KEY_Up, Gdk.KEY_Down, Gdk.KEY_Left, Gdk.KEY_Right):
@@ -237,8 +180,7 @@ class EmojiPicker(Box):
         return False
 
     def move_selection_2d(self, keyval):
-        buttons = self.get_all_emoji_buttons()
-        total_items_current_page = len(buttons)
+        total_items_current_page = len(self.current_grid.items)
         if total_items_current_page == 0:
             return
 
@@ -281,6 +223,7 @@ class EmojiPicker(Box):
                     current_col = col # Keep track of current column
                     self.current_page_index += 1
                     self.load_page(self.current_page_index)
+                    total_items_current_page = len(self.current_grid.items)
                     new_index = current_col # Try to keep the same column
                     if new_index >= total_items_current_page: # if column is out of bound, select last
                         new_index = total_items_current_page - 1
@@ -294,6 +237,7 @@ class EmojiPicker(Box):
                     current_col = col # Keep track of current column
                     self.current_page_index -= 1
                     self.load_page(self.current_page_index)
+                    total_items_current_page = len(self.current_grid.items)
                     new_index = (rows - 1) * columns + current_col # Select last row, same column
                     if new_index >= total_items_current_page: # if column is out of bound, select last
                         new_index = total_items_current_page -1
@@ -1,14 +1,8 @@
 import json
-import math
-import operator
 import os
-import re
 import subprocess
-from collections.abc import Iterator
+from itertools import chain
 
-import numpy as np
-from fabric.utils import (DesktopApp, exec_shell_command_async,
-                          get_desktop_applications, idle_add, remove_handler)
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
@@ -21,7 +15,19 @@ from gi.repository import Gdk, GLib
 import config.data as data
 import modules.icons as icons
 from modules.dock import Dock
+from modules.launcher_providers import (AppsProvider, ClipboardProvider,
+                                        CommandsProvider, EmojiProvider,
+                                        FilesProvider, HistoryProvider,
+                                        TmuxProvider, WindowsProvider)
+from services.calculator import Calculator
+from services.currency_rates import RatesUnavailable
+from services.desktop_apps import DesktopAppIndex
+from services.launch_history import LaunchHistory
+from utils.app_search import AppSearchEngine
 from utils.conversion import Conversion
+from utils.icon_resolver import IconResolver
+from utils.search_providers import SearchDispatcher, SearchResult
+from widgets.virtual_list import VirtualList
 
 tooltip_settings = f"<b>Open {data.APP_NAME_CAP} Settings</b>"
 tooltip_close = "<b>Close</b>"
@@ -38,11 +44,20 @@ class AppLauncher(Box):
         self.notch = kwargs["notch"]
         self.selected_index = -1
 
-        self._arranger_handler: int = 0
-        self._all_apps = get_desktop_applications()
+        self.app_index = DesktopAppIndex.get_initial()
+        self._all_apps = self.app_index.apps
+        self.launch_history = LaunchHistory.get_initial()
+        self._warm_source_id = None
+        self._build_search_engine()
+        self.app_index.connect("changed", self._on_apps_changed)
+        self.launch_history.connect("changed", self._on_launch_history_changed)
+        self.icon_resolver = IconResolver.get_initial()
 
 
         self.converter = Conversion()
+        self._pending_conversion = None
+        self.converter.rates.connect("fetched", self._on_rates_fetched)
+        self.calculator = Calculator.get_initial()
         self.calc_history_path = f"{data.CACHE_DIR}/calc.json"
         if os.path.exists(self.calc_history_path):
             with open(self.calc_history_path, "r") as f:
@@ -57,7 +72,30 @@ class AppLauncher(Box):
         else:
             self.conversion_history = []
 
-        self.viewport = Box(name="viewport", spacing=4, orientation="v")
+        # Prefixed providers first; the rest make up the default search, in this order.
+        self.providers = [
+            HistoryProvider(self, "calculator", "=", lambda: self.calc_history),
+            HistoryProvider(self, "conversion", ";", lambda: self.conversion_history),
+            CommandsProvider(self.notch),
+            ClipboardProvider(self.notch),
+            AppsProvider(self),
+            WindowsProvider(self),
+            TmuxProvider(self.notch),
+            EmojiProvider(self, self.notch),
+            FilesProvider(self),
+        ]
+        self.dispatcher = SearchDispatcher(self.providers, self._on_results)
+        self._sections: dict[str, list] = {}
+        self._section_order: list[str] = []
+        self._auto_select = False
+
+        self.viewport = VirtualList(
+            name="viewport",
+            spacing=4,
+            create_row=self.create_slot,
+            bind_row=self.bind_slot,
+            row_kind=self.slot_kind,
+        )
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Applications...",
@@ -96,6 +134,9 @@ class AppLauncher(Box):
             ],
         )
 
+        self.calc_preview = Label(name="calc-preview", h_align="start", ellipsization="end")
+        self.calc_preview.set_no_show_all(True)
+
         self.launcher_box = Box(
             name="launcher-box",
             spacing=10,
@@ -103,22 +144,49 @@ class AppLauncher(Box):
             orientation="v",
             children=[
                 self.header_box,
+                self.calc_preview,
                 self.scrolled_window,
             ],
         )
 
-        self.resize_viewport()
-
         self.add(self.launcher_box)
         self.show_all()
 
+    def _build_search_engine(self):
+        self.search_engine = AppSearchEngine(self.app_index.apps, self.launch_history.scores())
+        self._start_warming()
+
+    def _on_launch_history_changed(self, *args):
+        self.search_engine.set_frecency(self.launch_history.scores())
+        self._start_warming()
+
+    def _start_warming(self):
+        # Rank short queries while idle so the first keystrokes are cheap;
+        # one warmer at a time, for the current engine only.
+        if self._warm_source_id is not None:
+            GLib.source_remove(self._warm_source_id)
+        self._warm_source_id = GLib.idle_add(self._warm_step)
+
+    def _warm_step(self):
+        if self.search_engine.warm_step():
+            return True
+        self._warm_source_id = None
+        return False
+
+    def _on_apps_changed(self, *args):
+        self._all_apps = self.app_index.apps
+        self._build_search_engine()
+
     def close_launcher(self):
-        self.viewport.children = []
+        self.dispatcher.cancel()
+        self.viewport.set_items([])
         self.selected_index = -1
         self.notch.close_notch()
 
     def open_launcher(self):
-        self._all_apps = get_desktop_applications()
+        self._all_apps = self.app_index.apps
+        for provider in self.providers:
+            provider.reset()
         self.arrange_viewport()
         
 
@@ -138,156 +206,139 @@ class AppLauncher(Box):
         """Make sure the launcher is initialized with apps list before opening"""
         if not hasattr(self, '_initialized'):
 
-            self._all_apps = get_desktop_applications()
+            self._all_apps = self.app_index.apps
             self._initialized = True
             return True
         return False
 
     def arrange_viewport(self, query: str = ""):
-        if query.startswith("="):
-
-            self.update_calculator_viewport()
-            return
-        if query.startswith(";"):
-            # In conversion mode, update history view once (not per keystroke)
-            self.update_conversion_viewport()
-            return
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.viewport.children = []
+        providers = [provider for provider, _ in self.dispatcher.providers_for(query)]
         self.selected_index = -1
+        self._sections = {}
+        self._section_order = [provider.name for provider in providers]
+        self._auto_select = query.strip() != "" and all(p.select_first for p in providers)
 
-        def extract_command_name(command_line):
-            """Extract base command name from command line, removing paths and arguments"""
-            if not command_line:
-                return ""
-            # Remove common shell wrappers
-            if command_line.startswith("/bin/sh -c"):
-                # Handle wrapped commands like "/bin/sh -c "\$SHELL -i -c scrcpy""
-                return ""
-            # Split by spaces and take first part (the command)
-            cmd = command_line.split()[0] if command_line.split() else ""
-            # Extract just the command name from full paths
-            if "/" in cmd:
-                cmd = cmd.split("/")[-1]
-            return cmd
-
-        filtered_apps_iter = iter(
-            sorted(
-                [
-                    app
-                    for app in self._all_apps
-                    if query.casefold()
-                    in (
-                        (app.display_name or "")
-                        + (" " + app.name + " ")
-                        + (app.generic_name or "")
-                        + (" " + (app.command_line or "") + " ")
-                        + (" " + (app.executable or "") + " ")
-                        + (" " + extract_command_name(app.command_line) + " ")
-                    ).casefold()
-                ],
-                key=lambda app: (app.display_name or "").casefold(),
-            )
-        )
-        should_resize = operator.length_hint(filtered_apps_iter) == len(self._all_apps)
+        # Inline providers deliver before search() returns; show them in one go.
+        self._dispatching = True
+        try:
+            self.dispatcher.search(query)
+        finally:
+            self._dispatching = False
+        self._show_results()
 
-        self._arranger_handler = idle_add(
-            lambda apps_iter: self.add_next_application(apps_iter) or self.handle_arrange_complete(should_resize, query),
-            filtered_apps_iter,
-            pin=True,
-        )
+    def _on_results(self, generation, provider, results, done):
+        if generation != self.dispatcher.generation:
+            return False
+        section = self._sections.get(provider.name)
+        self._sections[provider.name] = results if section is None else section + results
+        if not self._dispatching and results:
+            self._show_results(keep_position=True)
+        return False
 
-    def handle_arrange_complete(self, should_resize, query):
-        if should_resize:
-            self.resize_viewport()
+    def _show_results(self, keep_position: bool = False):
+        sections = [self._sections[name] for name in self._section_order if self._sections.get(name)]
+        items = sections[0] if len(sections) == 1 else list(chain.from_iterable(sections))
 
-        if query.strip() != "" and self.viewport.get_children():
-            self.update_selection(0)
-        return False
+        selected = None
+        if keep_position and self.selected_index != -1:
+            selected = self.viewport.items[self.selected_index]
+        self.viewport.set_items(items, keep_position=keep_position)
 
-    def add_next_application(self, apps_iter: Iterator[DesktopApp]):
-        if not (app := next(apps_iter, None)):
-            return False
-        self.viewport.add(self.bake_application_slot(app))
-        return True
+        if selected is not None:
+            # A section that arrived late may have been placed above the selection.
+            self.update_selection(items.index(selected) if selected in items else -1)
+        elif self._auto_select and items:
+            self.update_selection(0)
 
-    def resize_viewport(self):
-        self.scrolled_window.set_min_content_width(
-            self.viewport.get_allocation().width
+    def create_slot(self) -> Button:
+        """A result row; bind_slot fills it in for an app or another provider's result."""
+        icon = Image(name="app-icon", h_align="start")
+        glyph = Label(name="slot-glyph", h_align="start")
+        label = Label(name="app-label", ellipsization="end", v_align="center", h_align="center")
+        desc = Label(
+            name="app-desc",
+            ellipsization="end",
+            v_align="center",
+            h_align="start",
+            h_expand=True,
         )
-        return False
-
-    def bake_application_slot(self, app: DesktopApp, **kwargs) -> Button:
+        slot_box = Box(name="slot-box", orientation="h", spacing=10, children=[icon, glyph, label, desc])
         button = Button(
             name="slot-button",
-            child=Box(
-                name="slot-box",
-                orientation="h",
-                spacing=10,
-                children=[
-                    Image(name="app-icon", pixbuf=app.get_icon_pixbuf(size=24), h_align="start"),
-                    Label(
-                        name="app-label",
-                        label=app.display_name or "Unknown",
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="center",
-                    ),
-                    Label(
-                        name="app-desc",
-                        label=app.description or "",
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="start",
-                        h_expand=True,
-                    ),
-                ],
-            ),
-            tooltip_text=app.description,
-            on_clicked=lambda *_: (app.launch(), self.close_launcher()),
-            **kwargs,
+            child=slot_box,
+            on_clicked=lambda button, *_: self.activate_item(button.item),
         )
+        button.slot_box = slot_box
+        button.icon = icon
+        button.glyph = glyph
+        button.label = label
+        button.desc = desc
         return button
 
-    def update_selection(self, new_index: int):
+    @staticmethod
+    def slot_kind(item) -> str:
+        """The shape of an item's row, which decides its height."""
+        if not isinstance(item, SearchResult):
+            return "app"
+        if item.compact:
+            return "compact"
+        return "icon" if item.icon else "glyph"
+
+    def bind_slot(self, button: Button, item):
+        if isinstance(item, SearchResult):
+            self._bind_result_slot(button, item)
+            return
 
-        if self.selected_index != -1 and self.selected_index < len(self.viewport.get_children()):
-            current_button = self.viewport.get_children()[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
+        self._set_slot_names(button, "slot-box", "app-label")
+        button.icon.set_from_pixbuf(self.icon_resolver.get_named_icon_pixbuf(item.icon_name, 24))
+        button.icon.show()
+        button.glyph.hide()
+        button.label.set_label(item.display_name or "Unknown")
+        button.desc.set_label(item.description or "")
+        button.desc.show()
+        button.set_tooltip_text(item.description)
+
+    def _bind_result_slot(self, button: Button, result: SearchResult):
+        if result.compact:
+            # Calculator or conversion history entry.
+            self._set_slot_names(button, "calc-slot-box", "calc-label")
+            button.icon.hide()
+            button.glyph.hide()
+            button.desc.hide()
+        else:
+            self._set_slot_names(button, "slot-box", "app-label")
+            if result.icon:
+                button.icon.set_from_pixbuf(self.icon_resolver.get_named_icon_pixbuf(result.icon, 24))
+            button.icon.set_visible(bool(result.icon))
+            if result.glyph:
+                button.glyph.set_markup(result.glyph)
+            button.glyph.set_visible(bool(result.glyph) and not result.icon)
+            button.desc.set_label(result.subtitle)
+            button.desc.show()
+        button.label.set_label(result.title)
+        button.set_tooltip_text(result.tooltip or result.title)
+
+    @staticmethod
+    def _set_slot_names(button: Button, box_name: str, label_name: str):
+        # Renaming restyles the widget, so only do it when the row changes kind.
+        if button.slot_box.get_name() != box_name:
+            button.slot_box.set_name(box_name)
+            button.label.set_name(label_name)
+
+    def activate_item(self, item):
+        if isinstance(item, SearchResult):
+            item.activate()
+            return
+        item.launch()
+        self.launch_history.record(item.id)
+        self.close_launcher()
 
-        if new_index != -1 and new_index < len(self.viewport.get_children()):
-            new_button = self.viewport.get_children()[new_index]
-            new_button.get_style_context().add_class("selected")
+    def update_selection(self, new_index: int):
+        if 0 <= new_index < len(self.viewport.items):
             self.selected_index = new_index
-            self.scroll_to_selected(new_button)
         else:
             self.selected_index = -1
-
-    def scroll_to_selected(self, button):
-        def scroll():
-            adj = self.scrolled_window.get_vadjustment()
-            alloc = button.get_allocation()
-            if alloc.height == 0:
-                return False
-
-            y = alloc.y
-            height = alloc.height
-            page_size = adj.get_page_size()
-            current_value = adj.get_value()
-
-            visible_top = current_value
-            visible_bottom = current_value + page_size
-
-            if y < visible_top:
-
-                adj.set_value(y)
-            elif y + height > visible_bottom:
-
-                new_value = y + height - page_size
-                adj.set_value(new_value)
-
-            return False
-        GLib.idle_add(scroll)
+        self.viewport.select(self.selected_index)
 
     def on_search_entry_activate(self, text):
         if text.startswith("="):
@@ -300,22 +351,15 @@ class AppLauncher(Box):
             if self.selected_index == -1:
                 self.evaluate_calculator_expression(text)
             return
-        match text:
-            case ":w":
-                self.notch.open_notch("wallpapers")
-            case ":d":
-                self.notch.open_notch("dashboard")
-            case ":p":
-                self.notch.open_notch("power")
-            case _:
-                children = self.viewport.get_children()
-                if children:
-
-                    if text.strip() == "" and self.selected_index == -1:
-                        return
-                    selected_index = self.selected_index if self.selected_index != -1 else 0
-                    if 0 <= selected_index < len(children):
-                        children[selected_index].clicked()
+        # Commands such as ":w" are results of the commands provider too.
+        items = self.viewport.items
+        if items:
+
+            if text.strip() == "" and self.selected_index == -1:
+                return
+            selected_index = self.selected_index if self.selected_index != -1 else 0
+            if 0 <= selected_index < len(items):
+                self.activate_item(items[selected_index])
 
     def on_search_entry_key_press(self, widget, event):
         text = widget.get_text()
@@ -398,28 +442,20 @@ class AppLauncher(Box):
 
     def notify_text(self, entry, *_):
         """Handle text changes in the search entry"""
+        # Calculator and conversion history are never preselected, so typing
+        # a new expression always evaluates it on Enter.
         text = entry.get_text()
-        if text.startswith("="):
-            self.update_calculator_viewport()
-
-            self.selected_index = -1
-        elif text.startswith(";"):
-            self.update_conversion_viewport()
-            # Always reset selection when typing a new expression
-            self.selected_index = -1
-        else:
-            self.arrange_viewport(text)
+        self.update_preview(text)
+        self.arrange_viewport(text)
 
     def add_selected_app_to_dock(self):
         """Adds the currently selected application to the dock.json file with comprehensive metadata."""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1 or self.selected_index >= len(children):
+        items = self.viewport.items
+        if not items or self.selected_index == -1 or self.selected_index >= len(items):
             return
 
-        selected_button = children[self.selected_index]
-
-        selected_app = next((app for app in self._all_apps if app.display_name == selected_button.get_child().get_children()[1].props.label), None)
-        if not selected_app:
+        selected_app = items[self.selected_index]
+        if isinstance(selected_app, SearchResult):
             return
 
         app_data = {k: v for k, v in {
@@ -463,15 +499,15 @@ class AppLauncher(Box):
         Dock.notify_config_change()
 
     def move_selection(self, delta: int):
-        children = self.viewport.get_children()
-        if not children:
+        items = self.viewport.items
+        if not items:
             return
 
         if self.selected_index == -1 and delta == 1:
             new_index = 0
         else:
             new_index = self.selected_index + delta
-        new_index = max(0, min(new_index, len(children) - 1))
+        new_index = max(0, min(new_index, len(items) - 1))
         self.update_selection(new_index)
 
     def save_calc_history(self):
@@ -483,227 +519,76 @@ class AppLauncher(Box):
             json.dump(self.conversion_history, f)
 
     def evaluate_calculator_expression(self, text: str):
-
-        print(f"Evaluating calculator expression: {text}")
-        
-
         expr = text.lstrip("=").strip()
         if not expr:
             return
-            
-
-        replacements = {
-            "^": "**",
-            "×": "*",
-            "÷": "/",
-            "π": "np.pi",
-            "pi": "np.pi",
-            "e": "np.e",
-            "sin(": "np.sin(",
-            "cos(": "np.cos(",
-            "tan(": "np.tan(",
-            "log(": "np.log10(",
-            "ln(": "np.log(",
-            "sqrt(": "np.sqrt(",
-            "abs(": "np.abs(",
-            "exp(": "np.exp("
-        }
-        
-
-        for old, new in replacements.items():
-            expr = expr.replace(old, new)
-            
+        self.calculator.evaluate_async(expr, lambda result: self._add_calc_result(text, result))
 
-        expr = re.sub(r'(\d+)!', r'np.factorial(\1)', expr)
-        
-
-        for old, new in [("[", "("), ("]", ")"), ("{", "("), ("}", ")")]:
-            expr = expr.replace(old, new)
-            
-
-        safe_dict = {
-            'np': np,
-            'math': math,
-            'arange': np.arange,
-            'linspace': np.linspace,
-            'array': np.array
-        }
-        
-        try:
-
-            result = eval(expr, {"__builtins__": None}, safe_dict)
-            
-
-            if isinstance(result, np.ndarray):
-                if result.size > 10:
-                    result_str = f"Array of shape {result.shape}"
-                else:
-                    result_str = str(result)
-            elif isinstance(result, (int, float, np.number)):
+    def _add_calc_result(self, text: str, result: str):
+        self.calc_history.insert(0, f"{text} => {result}")
+        self.save_calc_history()
+        self.refresh_results()
 
-                if isinstance(result, (int, np.integer)) or result.is_integer():
-                    result_str = str(int(result))
-                else:
-                    result_str = f"{float(result):.10g}"
-            else:
-                result_str = str(result)
-                
-        except Exception as e:
-            result_str = f"Error: {str(e)}"
-            
+    def update_preview(self, text: str):
+        """Shows the result of the expression being typed in `=` or `;` mode."""
+        expr = text[1:].strip() if text[:1] in ("=", ";") else ""
+        if not expr:
+            self.calc_preview.hide()
+            return
+        if text.startswith(";"):
+            # Unit lookups are cheap, and currencies use cached rates, so
+            # this is redone on every keystroke.
+            try:
+                result = self.converter.convert_text(expr)
+            except ValueError:
+                result = "Error"
+            self._show_calc_preview(text, result)
+            return
+        self.calculator.evaluate_async(
+            expr,
+            lambda result: self._show_calc_preview(text, result),
+            supersede=True,
+        )
 
-        self.calc_history.insert(0, f"{text} => {result_str}")
-        self.save_calc_history()
-        self.update_calculator_viewport()
+    def _show_calc_preview(self, text: str, result: str):
+        # Half-typed expressions are errors; keep quiet about them.
+        if text != self.search_entry.get_text() or result.startswith("Error"):
+            self.calc_preview.hide()
+            return
+        self.calc_preview.set_label(f"= {result}")
+        self.calc_preview.show()
 
-    def evaluate_conversion_expression(self, text: str):
-        print(f"Evaluating conversion expression: {text}")
+    def evaluate_conversion_expression(self, text: str, wait_for_rates: bool = True):
         expr = text.lstrip(";").strip()
         if not expr:
             return
 
         try:
-            result_value, result_type = self.converter.parse_input_and_convert(expr)
-            if result_type is None:
-                result_str = f"{result_value:.2f}"
-            else:
-                result_str = f"{result_value:.2f} {result_type}"
-        except:
+            result_str = self.converter.convert_text(expr)
+        except RatesUnavailable as e:
+            if wait_for_rates and e.fetching:
+                # Evaluated again once the rates arrive (or fail to).
+                self._pending_conversion = text
+                return
+            result_str = f"Error: {e}"
+        except ValueError as e:
+            result_str = f"Error: {e}"
+        except Exception:
             result_str = "Error: Invalid conversion expression"
-        
-        # Format the result based on its type
-        
+
         self.conversion_history.insert(0, f"{text} => {result_str}")
         self.save_conversion_history()
-        self.update_conversion_viewport()
-        
-    def update_calculator_viewport(self):
-        self.viewport.children = []
-        for item in self.calc_history:
-            btn = self.create_calc_history_button(item)
-            self.viewport.add(btn)
-
-        if self.selected_index >= len(self.calc_history):
-            self.selected_index = -1
-    
-    def update_conversion_viewport(self):
-        self.viewport.children = []
-        for item in self.conversion_history:
-            btn = self.create_conversion_history_button(item)
-            self.viewport.add(btn)
-        # Don't reset selection index here automatically
-        # Ensure selection state stays valid
-        if self.selected_index >= len(self.conversion_history):
-            self.selected_index = -1
-
-    def create_calc_history_button(self, text: str) -> Button:
+        self.refresh_results()
 
-        if "=>" in text:
-            parts = text.split("=>")
-            expression = parts[0].strip()
-            result = parts[1].strip()
-            
+    def _on_rates_fetched(self, rates, base: str, ok: bool):
+        text, self._pending_conversion = self._pending_conversion, None
+        if text is not None:
+            self.evaluate_conversion_expression(text, wait_for_rates=False)
+        self.update_preview(self.search_entry.get_text())
 
-            display_text = text
-            if len(result) > 50:
-                display_text = f"{expression} => {result[:47]}..."
-                
-            btn = Button(
-                name="slot-button",
-                child=Box(
-                    name="calc-slot-box",
-                    orientation="h",
-                    spacing=10,
-                    children=[
-                        Label(
-                            name="calc-label",
-                            label=display_text,
-                            ellipsization="end",
-                            v_align="center",
-                            h_align="center",
-                        ),
-                    ],
-                ),
-                tooltip_text=text,
-                on_clicked=lambda *_: self.copy_text_to_clipboard(text),
-            )
-        else:
+    def refresh_results(self):
+        self.arrange_viewport(self.search_entry.get_text())
 
-            btn = Button(
-                name="slot-button",
-                child=Box(
-                    name="calc-slot-box",
-                    orientation="h",
-                    spacing=10,
-                    children=[
-                        Label(
-                            name="calc-label",
-                            label=text,
-                            ellipsization="end",
-                            v_align="center",
-                            h_align="center",
-                        ),
-                    ],
-                ),
-                tooltip_text=text,
-                on_clicked=lambda *_: self.copy_text_to_clipboard(text),
-            )
-        return btn
-
-    def create_conversion_history_button(self, text: str) -> Button:
-        # Parse the result to create a more readable display
-        if "=>" in text:
-            parts = text.split("=>")
-            expression = parts[0].strip()
-            result = parts[1].strip()
-            
-            # For very long results, truncate for display but keep full in tooltip
-            display_text = text
-            if len(result) > 50:  # Truncate long results
-                display_text = f"{expression} => {result[:47]}..."
-                
-            btn = Button(
-                name="slot-button",  # reuse existing CSS styling
-                child=Box(
-                    name="calc-slot-box",
-                    orientation="h",
-                    spacing=10,
-                    children=[
-                        Label(
-                            name="calc-label",
-                            label=display_text,
-                            ellipsization="end",
-                            v_align="center",
-                            h_align="center",
-                        ),
-                    ],
-                ),
-                tooltip_text=text,
-                on_clicked=lambda *_: self.copy_text_to_clipboard(text),
-            )
-        else:
-            # Fallback for non-calculation entries
-            btn = Button(
-                name="slot-button",
-                child=Box(
-                    name="calc-slot-box",
-                    orientation="h",
-                    spacing=10,
-                    children=[
-                        Label(
-                            name="calc-label",
-                            label=text,
-                            ellipsization="end",
-                            v_align="center",
-                            h_align="center",
-                        ),
-                    ],
-                ),
-                tooltip_text=text,
-                on_clicked=lambda *_: self.copy_text_to_clipboard(text),
-            )
-        return btn
-    
     def copy_text_to_clipboard(self, text: str):
 
         parts = text.split("=>", 1)
@@ -729,7 +614,7 @@ class AppLauncher(Box):
             self.selected_index = -1
             
 
-            self.update_calculator_viewport()
+            self.refresh_results()
             
 
             if len(self.calc_history) > 0:
@@ -753,7 +638,7 @@ class AppLauncher(Box):
             self.selected_index = -1
             
             # Update the viewport
-            self.update_conversion_viewport()
+            self.refresh_results()
             
             # If we still have items, select the determined index
             if len(self.conversion_history) > 0:
@@ -0,0 +1,288 @@
+import os
+import subprocess
+import threading
+from collections.abc import Callable
+
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import config.data as data
+import modules.icons as icons
+from services.emoji_index import EmojiIndex
+from services.file_index import FileIndex
+from services.hyprland_state import HyprlandState
+from utils.cliphist import list_entries
+from utils.hyprland_ipc import HyprlandIPC
+from utils.icon_resolver import IconResolver
+from utils.search_providers import CancellationToken, SearchProvider, SearchResult
+
+# Clipboard entries longer than this are cut short in their row.
+CLIP_PREVIEW_LENGTH = 100
+
+
+def history_display_text(text: str) -> str:
+    """A history entry as shown in its row; long results are truncated (the tooltip has it all)."""
+    if "=>" in text:
+        expression, result = (part.strip() for part in text.split("=>", 1))
+        if len(result) > 50:
+            return f"{expression} => {result[:47]}..."
+    return text
+
+
+class AppsProvider(SearchProvider):
+    """Installed applications, ranked by the launcher's search engine."""
+
+    name = "apps"
+    inline = True
+
+    def __init__(self, launcher):
+        self.launcher = launcher
+
+    def search(self, query: str, token: CancellationToken):
+        # The engine's lists are shared; rows hold apps, not SearchResults.
+        return self.launcher.search_engine.search(query)
+
+
+class WindowsProvider(SearchProvider):
+    """Open windows by title or class, from the in-process Hyprland store."""
+
+    name = "windows"
+    inline = True
+    min_query_length = 2
+    limit = 8
+
+    def __init__(self, launcher):
+        self.launcher = launcher
+        self.state = HyprlandState.get_initial()
+        self.icon_resolver = IconResolver.get_initial()
+
+    def search(self, query: str, token: CancellationToken):
+        query = query.casefold()
+        for client in self.state.clients:
+            title = client.get("title") or ""
+            window_class = client.get("class") or client.get("initialClass") or ""
+            if query not in title.casefold() and query not in window_class.casefold():
+                continue
+            yield SearchResult(
+                title=title or window_class,
+                subtitle=f"{window_class} · workspace {client.get('workspace', {}).get('name', '?')}",
+                icon=self.icon_resolver.get_icon_name(window_class),
+                action=lambda address=client["address"]: self._focus(address),
+            )
+
+    def _focus(self, address: str):
+        HyprlandIPC.get_initial().dispatch("focuswindow", f"address:{address}")
+        self.launcher.close_launcher()
+
+
+class TmuxProvider(SearchProvider):
+    """tmux sessions by name; activating one attaches to it in a terminal."""
+
+    name = "tmux"
+    min_query_length = 2
+    limit = 8
+
+    def __init__(self, notch):
+        self.notch = notch
+        # Listed by the first search after the launcher opens, then reused.
+        self._sessions: list[str] | None = None
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        self._sessions = None
+
+    def _list_sessions(self, token: CancellationToken) -> list[str] | None:
+        with self._lock:
+            if self._sessions is None:
+                try:
+                    result = subprocess.run(
+                        ["tmux", "list-sessions", "-F", "#{session_name}"],
+                        capture_output=True,
+                        text=True,
+                        timeout=token.remaining(),
+                    )
+                except subprocess.TimeoutExpired:
+                    # Left unset, so the next keystroke tries again.
+                    return None
+                except OSError:
+                    self._sessions = []
+                    return self._sessions
+                lines = result.stdout.splitlines() if result.returncode == 0 else []
+                self._sessions = [line.strip() for line in lines if line.strip()]
+            return self._sessions
+
+    def search(self, query: str, token: CancellationToken):
+        sessions = self._list_sessions(token)
+        if not sessions:
+            return
+        query = query.casefold()
+        for session in sessions:
+            if query in session.casefold():
+                yield SearchResult(
+                    title=session,
+                    subtitle="tmux session",
+                    glyph=icons.terminal,
+                    action=lambda session=session: self.notch.tmux.attach_to_session(session),
+                )
+
+
+class EmojiProvider(SearchProvider):
+    """Emojis by name; activating one copies it."""
+
+    name = "emoji"
+    min_query_length = 3
+    limit = 8
+
+    def __init__(self, launcher, notch):
+        self.launcher = launcher
+        self.notch = notch
+
+    def search(self, query: str, token: CancellationToken):
+        emojis = EmojiIndex.get_initial()
+        for emoji_id in emojis.search(query, self.limit):
+            if token.stopped:
+                return
+            emoji_char = emojis.char(emoji_id)
+            yield SearchResult(
+                title=emojis.name(emoji_id),
+                subtitle=emojis.group(emoji_id),
+                glyph=GLib.markup_escape_text(emoji_char),
+                action=lambda emoji_char=emoji_char: self._copy(emoji_char),
+            )
+
+    def _copy(self, emoji_char: str):
+        self.notch.emoji.copy_emoji_to_clipboard(emoji_char)
+        self.launcher.close_launcher()
+
+
+class ClipboardProvider(SearchProvider):
+    """Text entries of the clipboard history; activating one copies it back."""
+
+    name = "clipboard"
+    prefix = "@"
+    budget_ms = 1000
+
+    def __init__(self, notch):
+        self.notch = notch
+
+    def search(self, query: str, token: CancellationToken):
+        query = query.strip().casefold()
+        try:
+            for line in list_entries(token):
+                item_id, _, content = line.partition("\t")
+                if not content or content.startswith("[[ binary data"):
+                    continue
+                if query and query not in content.casefold():
+                    continue
+                yield self._result(item_id, content)
+        except OSError:
+            return
+
+    def _result(self, item_id: str, content: str) -> SearchResult:
+        preview = content.strip()
+        if len(preview) > CLIP_PREVIEW_LENGTH:
+            preview = preview[:CLIP_PREVIEW_LENGTH - 3] + "..."
+        return SearchResult(
+            title=preview,
+            glyph=icons.clipboard,
+            tooltip=content,
+            action=lambda: self.notch.cliphist.paste_item(item_id),
+        )
+
+
+class FilesProvider(SearchProvider):
+    """Files under the configured roots, by name, from the file index."""
+
+    name = "files"
+    min_query_length = 3
+    limit = 20
+
+    def __init__(self, launcher):
+        self.launcher = launcher
+        self.index = FileIndex.get_initial()
+
+    def search(self, query: str, token: CancellationToken):
+        for path in self.index.search(query, self.limit, token):
+            directory, name = os.path.split(path)
+            if directory.startswith(data.HOME_DIR):
+                directory = "~" + directory[len(data.HOME_DIR):]
+            content_type, _ = Gio.content_type_guess(name, None)
+            yield SearchResult(
+                title=name,
+                subtitle=directory,
+                icon=Gio.content_type_get_generic_icon_name(content_type) or "text-x-generic",
+                tooltip=path,
+                action=lambda path=path: self._open(path),
+            )
+
+    def _open(self, path: str):
+        try:
+            Gio.AppInfo.launch_default_for_uri(Gio.File.new_for_path(path).get_uri(), None)
+        except GLib.Error as e:
+            logger.warning(f"[Launcher] Could not open {path}: {e.message}")
+        self.launcher.close_launcher()
+
+
+class HistoryProvider(SearchProvider):
+    """
+    Past calculator or conversion results, newest first; activating one
+    copies its result. Enter on a new expression evaluates it instead,
+    so nothing is preselected.
+    """
+
+    inline = True
+    select_first = False
+
+    def __init__(self, launcher, name: str, prefix: str, history: Callable[[], list[str]]):
+        self.launcher = launcher
+        self.name = name
+        self.prefix = prefix
+        self.history = history
+
+    def search(self, query: str, token: CancellationToken):
+        # Rows line up with the history list, which the key handlers index.
+        return [
+            SearchResult(
+                title=history_display_text(text),
+                tooltip=text,
+                compact=True,
+                data=text,
+                action=lambda text=text: self.launcher.copy_text_to_clipboard(text),
+            )
+            for text in self.history()
+        ]
+
+
+class CommandsProvider(SearchProvider):
+    """Shell panels reachable by `:` commands, e.g. `:w` for wallpapers."""
+
+    name = "commands"
+    prefix = ":"
+    inline = True
+
+    COMMANDS = (
+        ("w", "Wallpapers", "wallpapers", icons.wallpapers),
+        ("d", "Dashboard", "dashboard", icons.dashboard),
+        ("p", "Power Menu", "power", icons.shutdown),
+    )
+
+    def __init__(self, notch):
+        self.notch = notch
+
+    def search(self, query: str, token: CancellationToken):
+        query = query.strip().casefold()
+        commands = [command for command in self.COMMANDS if command[0] == query]
+        if not commands:
+            # Key prefixes first, then titles; the first row is preselected.
+            commands = [command for command in self.COMMANDS if command[0].startswith(query)]
+            commands += [
+                command for command in self.COMMANDS
+                if command not in commands and query in command[1].casefold()
+            ]
+        for key, title, widget, glyph in commands:
+            yield SearchResult(
+                title=title,
+                subtitle=f":{key}",
+                glyph=glyph,
+                action=lambda widget=widget: self.notch.open_notch(widget),
+            )
@@ -1,5 +1,5 @@
 from fabric.hyprland.widgets import HyprlandActiveWindow as ActiveWindow
-from fabric.utils.helpers import FormattedString, get_desktop_applications
+from fabric.utils.helpers import FormattedString
 from fabric.widgets.box import Box
 from fabric.widgets.centerbox import CenterBox
 from fabric.widgets.image import Image
@@ -19,6 +19,9 @@ from modules.player import PlayerSmall
 from modules.power import PowerMenu
 from modules.tmux import TmuxManager
 from modules.tools import Toolbox
+from services.desktop_apps import DesktopAppIndex
+from services.hyprland_state import HyprlandState
+from utils.frame_scheduler import FrameScheduler
 from utils.icon_resolver import IconResolver
 from utils.occlusion import check_occlusion
 from widgets.wayland import WaylandWindow as Window
@@ -138,9 +141,16 @@ class Notch(Window):
         self._prevent_occlusion = False
         self._occlusion_timer_id = None
 
-        self.icon_resolver = IconResolver()
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        self.hypr_state = HyprlandState.get_initial()
+        scheduler = FrameScheduler.get_initial()
+        self._occlusion_update = scheduler.subscribe(
+            "notch-occlusion", self._check_occlusion, widget=self
+        )
+        self._active_window_update = scheduler.subscribe(
+            "notch-active-window", self._on_active_window_update, widget=self
+        )
+        self.icon_resolver = IconResolver.get_initial()
+        self.app_index = DesktopAppIndex.get_initial()
 
         self.dashboard = Dashboard(notch=self)
         self.nhistory = self.dashboard.widgets.notification_history
@@ -193,9 +203,9 @@ class Notch(Window):
         )
 
         self.active_window.connect("notify::label", self.update_window_icon)
-
-        if data.PANEL_THEME == "Notch":
-            self.active_window.connect("notify::label", self.on_active_window_changed)
+        self.hypr_state.connect(
+            "active-window-changed", self._active_window_update.mark_dirty
+        )
 
         self.active_window.get_children()[0].set_hexpand(True)
         self.active_window.get_children()[0].set_halign(Gtk.Align.FILL)
@@ -429,7 +439,9 @@ class Notch(Window):
         self._current_window_class = self._get_current_window_class()
 
         if data.PANEL_THEME == "Notch":
-            GLib.timeout_add(250, self._check_occlusion)
+            for signal in ("clients-changed", "workspace-changed", "monitors-changed"):
+                self.hypr_state.connect(signal, self._queue_occlusion_check)
+            self._queue_occlusion_check()
         elif data.PANEL_THEME == "Notch":
             self.notch_revealer.set_reveal_child(True)
         else:
@@ -458,6 +470,7 @@ class Notch(Window):
         window = widget.get_window()
         if window:
             window.set_cursor(None)
+        self._queue_occlusion_check()
         return True
 
     def on_notch_hover_area_enter(self, widget, event):
@@ -474,6 +487,7 @@ class Notch(Window):
             return False
 
         self.is_hovered = False
+        self._queue_occlusion_check()
 
         return False
 
@@ -495,6 +509,8 @@ class Notch(Window):
         self.stack.set_visible_child(self.compact)
         if data.PANEL_THEME != "Notch":
             self.notch_revealer.set_reveal_child(False)
+        else:
+            self._queue_occlusion_check()
 
         GLib.timeout_add(300, cleanup_after_animation)
 
@@ -694,33 +710,9 @@ class Notch(Window):
 
             self.update_window_icon()
 
-    def _build_app_identifiers_map(self):
-        """Build a mapping of app identifiers (class names, executables, names) to DesktopApp objects"""
-        identifiers = {}
-        for app in self._all_apps:
-            if app.name:
-                identifiers[app.name.lower()] = app
-
-            if app.display_name:
-                identifiers[app.display_name.lower()] = app
-
-            if app.window_class:
-                identifiers[app.window_class.lower()] = app
-
-            if app.executable:
-                exe_basename = app.executable.split("/")[-1].lower()
-                identifiers[exe_basename] = app
-
-            if app.command_line:
-                cmd_base = app.command_line.split()[0].split("/")[-1].lower()
-                identifiers[cmd_base] = app
-
-        return identifiers
-
     def find_app(self, app_id: str):
-        """Find a DesktopApp object by various identifiers using the pre-built map."""
-        normalized_id = app_id.lower()
-        return self.app_identifiers.get(normalized_id)
+        """Find a DesktopApp object by various identifiers using the shared app index."""
+        return self.app_index.resolver.resolve(app_id, substring=False)
 
     def update_window_icon(self, *args):
         """Update the window icon based on the current active window title"""
@@ -736,15 +728,9 @@ class Notch(Window):
 
         self.window_icon.set_visible(True)
 
-        from fabric.hyprland.widgets import get_hyprland_connection
-
-        conn = get_hyprland_connection()
-        if conn:
+        active_window_data = self.hypr_state.active_window
+        if active_window_data:
             try:
-                import json
-
-                active_window_json = conn.send_command("j/activewindow").reply.decode()
-                active_window_data = json.loads(active_window_json)
                 app_id = active_window_data.get(
                     "initialClass", ""
                 ) or active_window_data.get("class", "")
@@ -792,6 +778,14 @@ class Notch(Window):
                     "application-x-executable-symbolic", 20
                 )
 
+    def _queue_occlusion_check(self, *args):
+        """
+        Schedule an occlusion check for the next frame. Bursts of compositor
+        events collapse into a single evaluation.
+        """
+        if data.PANEL_THEME == "Notch":
+            self._occlusion_update.mark_dirty()
+
     def _check_occlusion(self):
         """
         Check if top 40px of the screen is occluded by any window
@@ -805,25 +799,18 @@ class Notch(Window):
             is_occluded = check_occlusion((occlusion_edge, occlusion_size))
             self.notch_revealer.set_reveal_child(not is_occluded)
 
-        return True
-
     def _get_current_window_class(self):
         """Get the class of the currently active window"""
-        try:
-            from fabric.hyprland.widgets import get_hyprland_connection
-
-            conn = get_hyprland_connection()
-            if conn:
-                import json
+        active_window_data = self.hypr_state.active_window
+        return active_window_data.get("initialClass", "") or active_window_data.get(
+            "class", ""
+        )
 
-                active_window_json = conn.send_command("j/activewindow").reply.decode()
-                active_window_data = json.loads(active_window_json)
-                return active_window_data.get(
-                    "initialClass", ""
-                ) or active_window_data.get("class", "")
-        except Exception as e:
-            print(f"Error getting window class: {e}")
-        return ""
+    def _on_active_window_update(self):
+        """Runs once per frame however many focus events arrived."""
+        self.update_window_icon()
+        if data.PANEL_THEME == "Notch":
+            self.on_active_window_changed()
 
     def on_active_window_changed(self, *args):
         """
@@ -855,6 +842,7 @@ class Notch(Window):
 
         self._prevent_occlusion = False
         self._occlusion_timer_id = None
+        self._queue_occlusion_check()
 
         return False
 
@@ -1,10 +1,6 @@
 # Thanks to https://github.com/muhchaudhary for the original code. You are a legend.
-import json
-
 import cairo
 import gi
-from fabric.hyprland.service import Hyprland
-from fabric.utils.helpers import get_desktop_applications
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.eventbox import EventBox
@@ -15,6 +11,11 @@ from loguru import logger
 
 import config.data as data
 import modules.icons as icons
+from services.desktop_apps import DesktopAppIndex
+from services.hyprland_state import HyprlandState
+from utils.app_resolver import normalize_window_class
+from utils.frame_scheduler import FrameScheduler
+from utils.hyprland_ipc import HyprlandIPC
 # WIP icon resolver (app_id to guessing the icon name)
 from utils.icon_resolver import IconResolver
 
@@ -25,9 +26,10 @@ screen = Gdk.Screen.get_default()
 CURRENT_WIDTH = screen.get_width()
 CURRENT_HEIGHT = screen.get_height()
 
-icon_resolver = IconResolver()
-connection = Hyprland()
+icon_resolver = IconResolver.get_initial()
+ipc = HyprlandIPC.get_initial()
 SCALE = 0.1
+ICON_CACHE_SIZE = 256
 
 # Credit to Aylur for the drag and drop code
 TARGET = [Gtk.TargetEntry.new("text/plain", Gtk.TargetFlags.SAME_APP, 0)]
@@ -71,29 +73,7 @@ class HyprlandWindowButton(Button):
 
         # Enhanced icon resolution using desktop apps
         desktop_app = window.find_app(app_id)
-        
-        # Get icon using improved method with fallbacks
-        icon_pixbuf = None
-        if desktop_app:
-            icon_pixbuf = desktop_app.get_icon_pixbuf(size=icon_size_main)
-        
-        if not icon_pixbuf:
-            # Fallback to IconResolver
-            icon_pixbuf = icon_resolver.get_icon_pixbuf(app_id, icon_size_main)
-        
-        if not icon_pixbuf:
-            # Additional fallbacks for common apps
-            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", icon_size_main)
-            if not icon_pixbuf:
-                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", icon_size_main)
-                
-        # Ensure icon is scaled to the correct size
-        if icon_pixbuf and (icon_pixbuf.get_width() != icon_size_main or icon_pixbuf.get_height() != icon_size_main):
-            icon_pixbuf = icon_pixbuf.scale_simple(
-                icon_size_main, 
-                icon_size_main, 
-                gi.repository.GdkPixbuf.InterpType.BILINEAR
-            )
+        icon_pixbuf = window.get_icon_pixbuf(app_id, icon_size_main)
 
         super().__init__(
             name="overview-client-box",
@@ -101,8 +81,8 @@ class HyprlandWindowButton(Button):
             tooltip_text=title,
             size=size,
             on_clicked=self.on_button_click,
-            on_button_press_event=lambda _, event: connection.send_command(
-                f"/dispatch closewindow address:{address}"
+            on_button_press_event=lambda _, event: ipc.dispatch(
+                "closewindow", f"address:{address}"
             )
             if event.button == 3
             else None,
@@ -128,35 +108,15 @@ class HyprlandWindowButton(Button):
     def on_key_press_event(self, widget, event):
         if event.get_state() & Gdk.ModifierType.SHIFT_MASK:
             if event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter, Gdk.KEY_space):
-                connection.send_command(f"/dispatch closewindow address:{self.address}")
+                ipc.dispatch("closewindow", f"address:{self.address}")
                 return True
         return False
 
     def update_image(self, image):
         # Compute overlay icon size dynamically.
         icon_size_overlay = int(min(self.size) * 0.5)  # adjust factor as needed
-        
-        # Enhanced icon resolution for overlay
-        icon_pixbuf = None
-        if hasattr(self, 'desktop_app') and self.desktop_app:
-            icon_pixbuf = self.desktop_app.get_icon_pixbuf(size=icon_size_overlay)
-            
-        if not icon_pixbuf:
-            icon_pixbuf = icon_resolver.get_icon_pixbuf(self.app_id, icon_size_overlay)
-            
-        if not icon_pixbuf:
-            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", icon_size_overlay)
-            if not icon_pixbuf:
-                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", icon_size_overlay)
-        
-        # Ensure icon is scaled to the correct size
-        if icon_pixbuf and (icon_pixbuf.get_width() != icon_size_overlay or icon_pixbuf.get_height() != icon_size_overlay):
-            icon_pixbuf = icon_pixbuf.scale_simple(
-                icon_size_overlay, 
-                icon_size_overlay, 
-                gi.repository.GdkPixbuf.InterpType.BILINEAR
-            )
-                
+        icon_pixbuf = self.window.get_icon_pixbuf(self.app_id, icon_size_overlay)
+
         self.set_image(
             Overlay(
                 child=image,
@@ -171,27 +131,27 @@ class HyprlandWindowButton(Button):
         )
 
     def on_button_click(self, *_):
-        connection.send_command(f"/dispatch focuswindow address:{self.address}")
+        ipc.dispatch("focuswindow", f"address:{self.address}")
 
 
 class WorkspaceEventBox(EventBox):
     def __init__(self, workspace_id: int, fixed: Gtk.Fixed | None = None):
-        self.fixed = fixed
+        self.fixed = fixed if fixed is not None else Gtk.Fixed.new()
+        self.placeholder = Label(
+            name="overview-add-label",
+            h_expand=True,
+            v_expand=True,
+            markup=icons.circle_plus,
+        )
         super().__init__(
             name="overview-workspace-bg",
             h_expand=True,
             v_expand=True,
             size=(int(CURRENT_WIDTH * SCALE), int(CURRENT_HEIGHT * SCALE)),
-            child=fixed
-            if fixed
-            else Label(
-                name="overview-add-label",
-                h_expand=True,
-                v_expand=True,
-                markup=icons.circle_plus,
-            ),
-            on_drag_data_received=lambda _w, _c, _x, _y, data, *_: connection.send_command(
-                f"/dispatch movetoworkspacesilent {workspace_id},address:{data.get_data().decode()}"
+            child=self.fixed if self.fixed.get_children() else self.placeholder,
+            on_drag_data_received=lambda _w, _c, _x, _y, data, *_: ipc.dispatch(
+                "movetoworkspacesilent",
+                f"{workspace_id},address:{data.get_data().decode()}",
             ),
         )
         self.drag_dest_set(
@@ -199,52 +159,56 @@ class WorkspaceEventBox(EventBox):
             TARGET,
             Gdk.DragAction.COPY,
         )
-        if fixed:
-            fixed.show_all()
+        self.fixed.show_all()
 
+    def refresh_placeholder(self):
+        """Show the window previews, or the "+" label once the workspace is empty."""
+        child = self.fixed if self.fixed.get_children() else self.placeholder
+        current = self.get_child()
+        if current is child:
+            return
+        if current is not None:
+            self.remove(current)
+        self.add(child)
+        child.show_all()
 
 
 class Overview(Box):
     def __init__(self, **kwargs):
         # Initialize as a Box instead of a PopupWindow.
         super().__init__(name="overview", orientation="v", spacing=8, **kwargs)
-        self.workspace_boxes: dict[int, Box] = {}
+        self.workspace_boxes: dict[int, Gtk.Fixed] = {}
+        self.workspace_event_boxes: dict[int, WorkspaceEventBox] = {}
         self.clients: dict[str, HyprlandWindowButton] = {}
+        # address -> (workspace, x, y, size, transform, app_id, title) last rendered
+        self._client_layouts: dict[str, tuple] = {}
+        self._icon_cache: dict[tuple[str, int], object] = {}
         
-        # Initialize app registry for better icon resolution
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
+        # Shared app registry for better icon resolution
+        self.app_index = DesktopAppIndex.get_initial()
+        self.app_index.connect("changed", self._on_apps_changed)
+        Gtk.IconTheme.get_default().connect("changed", self._on_apps_changed)
         
         # Remove the window_class_aliases dictionary completely
 
-        connection.connect("event::openwindow", self.do_update)
-        connection.connect("event::closewindow", self.do_update)
-        connection.connect("event::movewindow", self.do_update)
+        self._build_workspaces()
+
+        self._update_subscription = FrameScheduler.get_initial().subscribe(
+            "overview", self.do_update, widget=self
+        )
+        self.hypr_state = HyprlandState.get_initial()
+        self.hypr_state.connect("clients-changed", self._update_subscription.mark_dirty)
+        self.hypr_state.connect("monitors-changed", self.do_rebuild)
         self.update()
         
-    def _normalize_window_class(self, class_name):
-        """Normalize window class by removing common suffixes and lowercase."""
-        if not class_name:
-            return ""
-            
-        normalized = class_name.lower()
-        
-        # Remove common suffixes
-        suffixes = [".bin", ".exe", ".so", "-bin", "-gtk"]
-        for suffix in suffixes:
-            if normalized.endswith(suffix):
-                normalized = normalized[:-len(suffix)]
-                
-        return normalized
-    
     def _classes_match(self, class1, class2):
         """Check if two window class names match with stricter comparison."""
         if not class1 or not class2:
             return False
             
         # Normalize both classes
-        norm1 = self._normalize_window_class(class1)
-        norm2 = self._normalize_window_class(class2)
+        norm1 = normalize_window_class(class1)
+        norm2 = normalize_window_class(class2)
         
         # Direct match after normalization
         if norm1 == norm2:
@@ -254,80 +218,55 @@ class Overview(Box):
         # This avoids incorrectly matching flatpak apps and others
         return False
         
-    def _build_app_identifiers_map(self):
-        """Build a mapping of app identifiers (class names, executables, names) to DesktopApp objects"""
-        identifiers = {}
-        for app in self._all_apps:
-            # Map by name (lowercase)
-            if app.name:
-                identifiers[app.name.lower()] = app
-                
-            # Map by display name
-            if app.display_name:
-                identifiers[app.display_name.lower()] = app
-                
-            # Map by window class if available
-            if app.window_class:
-                identifiers[app.window_class.lower()] = app
-                
-            # Map by executable name if available
-            if app.executable:
-                exe_basename = app.executable.split('/')[-1].lower()
-                identifiers[exe_basename] = app
-                
-            # Map by command line if available (without parameters)
-            if app.command_line:
-                cmd_base = app.command_line.split()[0].split('/')[-1].lower()
-                identifiers[cmd_base] = app
-                
-        return identifiers
-        
+    def _on_apps_changed(self, *args):
+        self._icon_cache.clear()
+
     def find_app(self, app_identifier):
-        """Return the DesktopApp object by matching any app identifier."""
-        if not app_identifier:
-            return None
+        """
+        Return the DesktopApp object matching an app identifier exactly. No
+        substring matching, as it's too error-prone (flatpak apps and others).
+        Results are memoized by the shared resolver.
+        """
+        return self.app_index.resolver.resolve(app_identifier, substring=False)
+
+    def get_icon_pixbuf(self, app_id: str, size: int):
+        """Resolve and scale an app icon, memoized by (app id, size)."""
+        key = (app_id, size)
+        if key in self._icon_cache:
+            return self._icon_cache[key]
+
+        desktop_app = self.find_app(app_id)
         
-        # Try direct lookup in our identifiers map
-        normalized_id = str(app_identifier).lower()
-        if normalized_id in self.app_identifiers:
-            return self.app_identifiers[normalized_id]
-            
-        # Try with normalized class name
-        norm_id = self._normalize_window_class(normalized_id)
-        if norm_id in self.app_identifiers:
-            return self.app_identifiers[norm_id]
-            
-        # More targeted matching with exact names only
-        for app in self._all_apps:
-            if app.name and app.name.lower() == normalized_id:
-                return app
-            if app.window_class and app.window_class.lower() == normalized_id:
-                return app
-            if app.display_name and app.display_name.lower() == normalized_id:
-                return app
-            # Try with executable basename
-            if app.executable:
-                exe_base = app.executable.split('/')[-1].lower()
-                if exe_base == normalized_id:
-                    return app
-            # Try with command basename
-            if app.command_line:
-                cmd_base = app.command_line.split()[0].split('/')[-1].lower()
-                if cmd_base == normalized_id:
-                    return app
+        # Get icon using improved method with fallbacks
+        icon_pixbuf = None
+        if desktop_app:
+            icon_pixbuf = desktop_app.get_icon_pixbuf(size=size)
+        
+        if not icon_pixbuf:
+            # Fallback to IconResolver
+            icon_pixbuf = icon_resolver.get_icon_pixbuf(app_id, size)
+        
+        if not icon_pixbuf:
+            # Additional fallbacks for common apps
+            icon_pixbuf = icon_resolver.get_icon_pixbuf("application-x-executable-symbolic", size)
+            if not icon_pixbuf:
+                icon_pixbuf = icon_resolver.get_icon_pixbuf("image-missing", size)
                 
-        return None
+        # Ensure icon is scaled to the correct size
+        if icon_pixbuf and (icon_pixbuf.get_width() != size or icon_pixbuf.get_height() != size):
+            icon_pixbuf = icon_pixbuf.scale_simple(
+                size, 
+                size, 
+                gi.repository.GdkPixbuf.InterpType.BILINEAR
+            )
 
-    def update(self, signal_update=False):
-        self._all_apps = get_desktop_applications()
-        self.app_identifiers = self._build_app_identifiers_map()
-        for client in self.clients.values():
-            client.destroy()
-        self.clients.clear()
-        for workspace in self.workspace_boxes.values():
-            workspace.destroy()
-        self.workspace_boxes.clear()
+        if len(self._icon_cache) >= ICON_CACHE_SIZE:
+            self._icon_cache.clear()
+        self._icon_cache[key] = icon_pixbuf
+        return icon_pixbuf
 
+    def _build_workspaces(self):
+        """Create the workspace grid once; windows are reconciled into it by update()."""
         if data.PANEL_THEME == "Panel" and data.BAR_POSITION in ["Left", "Right"]:
             rows = 5
             cols = 2
@@ -337,51 +276,117 @@ class Overview(Box):
 
         self.children = [Box(spacing=8) for _ in range(rows)]
 
-        monitors = {
-            monitor["id"]: (monitor["x"], monitor["y"], monitor["transform"])
-            for monitor in json.loads(connection.send_command("j/monitors").reply.decode())
-        }
-        for client in json.loads(connection.send_command("j/clients").reply.decode()):
-            if client["workspace"]["id"] > 0:
-                btn = HyprlandWindowButton(
-                    window=self,
-                    title=client["title"],
-                    address=client["address"],
-                    app_id=client["initialClass"],
-                    size=(client["size"][0] * SCALE, client["size"][1] * SCALE),
-                    transform=monitors[client["monitor"]][2],
-                )
-                self.clients[client["address"]] = btn
-                w_id = client["workspace"]["id"]
-                if w_id not in self.workspace_boxes:
-                    self.workspace_boxes[w_id] = Gtk.Fixed.new()
-                self.workspace_boxes[w_id].put(
-                    btn,
-                    abs(client["at"][0] - monitors[client["monitor"]][0]) * SCALE,
-                    abs(client["at"][1] - monitors[client["monitor"]][1]) * SCALE,
-                )
-
         for w_id in range(1, 11):
             idx = w_id - 1
             if rows == 2:
                 row = 0 if w_id <= cols else 1
             else:
                 row = idx // cols
-            overview_row = self.children[row]
-            overview_row.add(
+            event_box = WorkspaceEventBox(w_id)
+            self.workspace_boxes[w_id] = event_box.fixed
+            self.workspace_event_boxes[w_id] = event_box
+            self.children[row].add(
                 Box(
                     name="overview-workspace-box",
                     orientation="vertical",
                     children=[
                         Label(name="overview-workspace-label", label=f"Workspace {w_id}"),
-                        WorkspaceEventBox(
-                            w_id,
-                            self.workspace_boxes.get(w_id)
-                        ),
+                        event_box,
                     ],
                 )
             )
 
+    def _add_client(self, address: str, layout: tuple):
+        w_id, x, y, size, transform, app_id, title = layout
+        btn = HyprlandWindowButton(
+            window=self,
+            title=title,
+            address=address,
+            app_id=app_id,
+            size=size,
+            transform=transform,
+        )
+        self.clients[address] = btn
+        self._client_layouts[address] = layout
+        self.workspace_boxes[w_id].put(btn, x, y)
+        btn.show_all()
+        self.workspace_event_boxes[w_id].refresh_placeholder()
+
+    def _remove_client(self, address: str):
+        btn = self.clients.pop(address)
+        w_id = self._client_layouts.pop(address)[0]
+        btn.destroy()
+        self.workspace_event_boxes[w_id].refresh_placeholder()
+
+    def _move_client(self, address: str, layout: tuple):
+        btn = self.clients[address]
+        previous = self._client_layouts[address]
+        w_id, x, y, _, _, _, title = layout
+
+        if previous[0] != w_id:
+            self.workspace_boxes[previous[0]].remove(btn)
+            self.workspace_event_boxes[previous[0]].refresh_placeholder()
+            self.workspace_boxes[w_id].put(btn, x, y)
+            btn.show_all()
+            self.workspace_event_boxes[w_id].refresh_placeholder()
+        elif previous[1:3] != (x, y):
+            self.workspace_boxes[w_id].move(btn, x, y)
+
+        if previous[6] != title:
+            btn.title = title
+            btn.set_tooltip_text(title)
+
+        self._client_layouts[address] = layout
+
+    def update(self, signal_update=False):
+        """
+        Reconcile the window buttons with the shared Hyprland state, keyed by
+        address. Only windows that appeared, vanished, moved or changed get
+        widget operations; everything else is left untouched.
+        """
+        monitors = {
+            monitor["id"]: (monitor["x"], monitor["y"], monitor["transform"])
+            for monitor in self.hypr_state.monitors
+        }
+
+        layouts = {}
+        for client in self.hypr_state.clients:
+            w_id = client["workspace"]["id"]
+            monitor = monitors.get(client["monitor"])
+            if w_id not in self.workspace_boxes or monitor is None:
+                continue
+            layouts[client["address"]] = (
+                w_id,
+                abs(client["at"][0] - monitor[0]) * SCALE,
+                abs(client["at"][1] - monitor[1]) * SCALE,
+                (client["size"][0] * SCALE, client["size"][1] * SCALE),
+                monitor[2],
+                client["initialClass"],
+                client["title"],
+            )
+
+        for address in [a for a in self.clients if a not in layouts]:
+            self._remove_client(address)
+
+        for address, layout in layouts.items():
+            previous = self._client_layouts.get(address)
+            if previous == layout:
+                continue
+            if previous is None:
+                self._add_client(address, layout)
+            elif previous[3:6] != layout[3:6]:
+                # Size, transform or app changed: the button and its icon must be rebuilt.
+                self._remove_client(address)
+                self._add_client(address, layout)
+            else:
+                self._move_client(address, layout)
+
     def do_update(self, *_):
-        logger.info(f"[Overview] Updating for :{_[1].name}")
+        logger.info("[Overview] Reconciling windows")
+        self.update(signal_update=True)
+
+    def do_rebuild(self, *_):
+        """Monitor offsets or transforms changed: every preview has to be re-laid out."""
+        for address in list(self.clients):
+            self._remove_client(address)
         self.update(signal_update=True)
@@ -0,0 +1,129 @@
+import json
+import os
+import select
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from gi.repository import GLib
+from loguru import logger
+
+# The repository root, from which the worker runs `python -m utils.calculator`.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# An evaluation taking longer than this is killed along with its worker.
+EVALUATION_TIMEOUT_SECONDS = 2.0
+RESULT_CACHE_SIZE = 256
+
+
+class Calculator:
+    """
+    Evaluates calculator expressions in a worker process.
+
+    The engine (utils/calculator.py) refuses expressions it can tell are
+    too expensive, but the worker is what keeps the shell responsive: it
+    runs under a memory limit, and one that does not answer within
+    EVALUATION_TIMEOUT_SECONDS is killed and replaced on the next request.
+    Requests go through a single thread that owns the worker; results are
+    cached by expression and delivered on the main loop. Uses a singleton
+    pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the Calculator service."""
+        if Calculator.instance is None:
+            Calculator.instance = Calculator()
+        return Calculator.instance
+
+    def __init__(self):
+        self._process: subprocess.Popen | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calculator")
+        self._results: OrderedDict[str, str] = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._generation = 0
+
+    def evaluate_async(self, expression: str, callback, supersede: bool = False) -> None:
+        """
+        Evaluates `expression` and calls `callback(result)` on the main
+        loop, where `result` is the formatted value or "Error: ...". With
+        `supersede`, as for previews while typing, the request is dropped
+        if another superseding one is made before it is answered.
+        """
+        if supersede:
+            self._generation += 1
+        generation = self._generation
+
+        def run():
+            if supersede and generation != self._generation:
+                return
+            result = self.evaluate(expression)
+            if supersede and generation != self._generation:
+                return
+            GLib.idle_add(callback, result)
+
+        self._executor.submit(run)
+
+    def evaluate(self, expression: str) -> str:
+        """Evaluates `expression`, blocking until done. Call off the main loop."""
+        with self._results_lock:
+            if expression in self._results:
+                self._results.move_to_end(expression)
+                return self._results[expression]
+
+        reply = self._request(expression)
+        if reply is None:
+            return "Error: Calculation took too long"
+        result = reply["result"] if "result" in reply else f"Error: {reply.get('error')}"
+
+        with self._results_lock:
+            self._results[expression] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def _request(self, expression: str) -> dict | None:
+        request = json.dumps({"expression": expression}) + "\n"
+        try:
+            process = self._ensure_process()
+            process.stdin.write(request)
+            process.stdin.flush()
+            ready, _, _ = select.select([process.stdout], [], [], EVALUATION_TIMEOUT_SECONDS)
+            line = process.stdout.readline() if ready else ""
+            if line:
+                return json.loads(line)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Calculator] Worker failed: {e}")
+        # Timed out, or the worker died (e.g. at its memory limit).
+        self._stop_process()
+        return None
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._process is not None and self._process.poll() is not None:
+            self._stop_process()
+        if self._process is None:
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "utils.calculator"],
+                cwd=ROOT_DIR,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        return self._process
+
+    def _stop_process(self):
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.wait()
+        for stream in (self._process.stdin, self._process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self._process = None
@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from fabric.core.service import Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+import config.data as data
+
+RATES_DIR = f"{data.CACHE_DIR}/currency"
+# Tables older than this are refetched in the background; until then,
+# and whenever fetching fails, the cached table is used as it is.
+RATES_TTL_SECONDS = 12 * 3600
+# A failed fetch is not retried sooner than this.
+RETRY_SECONDS = 300
+FETCH_TIMEOUT_SECONDS = 10
+
+
+class RatesUnavailable(ValueError):
+    """
+    No cached table covers a currency pair yet. `fetching` tells whether
+    a table that may is being fetched, so `fetched` will follow; if not,
+    fetching failed too recently to be tried again.
+    """
+
+    def __init__(self, message: str, fetching: bool):
+        super().__init__(message)
+        self.fetching = fetching
+
+
+def parse_rates(payload) -> dict[str, float]:
+    """
+    Rates from a provider's reply, as units of each currency per unit of
+    the base. Understands floatrates' {"eur": {"rate": ...}} and the
+    common {"rates": {"EUR": ...}} layouts.
+    """
+    if isinstance(payload, dict) and isinstance(payload.get("rates"), dict):
+        entries = payload["rates"].items()
+    elif isinstance(payload, dict):
+        entries = (
+            (entry.get("code", code), entry.get("rate"))
+            for code, entry in payload.items()
+            if isinstance(entry, dict)
+        )
+    else:
+        raise ValueError("Unexpected exchange rates format")
+    rates = {}
+    for code, rate in entries:
+        if isinstance(rate, (int, float)) and rate > 0:
+            rates[str(code).upper()] = float(rate)
+    if not rates:
+        raise ValueError("No exchange rates in reply")
+    return rates
+
+
+class CurrencyRates(Service):
+    """
+    Exchange rates for currency conversions, cached on disk.
+
+    Tables are kept per base currency, one JSON file each, and any pair
+    is converted through a table holding both currencies, normally the
+    pivot currency's, so one table serves every conversion. Lookups never
+    block: they use whatever table is cached, however old, and start a
+    background fetch when it is missing or older than RATES_TTL_SECONDS.
+    When nothing cached covers a pair, RatesUnavailable is raised; if a
+    fetch is under way, `fetched` tells when to try again. The URL is a template with a
+    {base} placeholder (data.CURRENCY_RATES_URL). Uses a singleton
+    pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the CurrencyRates service."""
+        if CurrencyRates.instance is None:
+            CurrencyRates.instance = CurrencyRates()
+        return CurrencyRates.instance
+
+    @Signal
+    def fetched(self, base: str, ok: bool) -> None:
+        """Signal emitted when fetching the table for `base` finished, `ok` if it succeeded."""
+        pass
+
+    def __init__(
+        self,
+        url: str | None = None,
+        pivot: str | None = None,
+        cache_dir: str = RATES_DIR,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.url = url or data.CURRENCY_RATES_URL
+        self.pivot = (pivot or data.CURRENCY_PIVOT).upper()
+        self.cache_dir = cache_dir
+        # base -> {"fetched": timestamp, "rates": {code: units per base}}
+        self._tables: dict[str, dict] = self._load()
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._failed_at: dict[str, float] = {}
+
+        self._refresh_if_stale(self.pivot)
+
+    def _load(self) -> dict[str, dict]:
+        tables = {}
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return tables
+        except OSError as e:
+            logger.warning(f"[CurrencyRates] Cannot read cached rates: {e}")
+            return tables
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name), "r") as f:
+                    table = json.load(f)
+                tables[table["base"]] = {
+                    "fetched": float(table["fetched"]),
+                    "rates": {code: float(rate) for code, rate in table["rates"].items()},
+                }
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"[CurrencyRates] Ignoring unreadable {name}: {e}")
+        return tables
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """
+        Units of `to_code` per unit of `from_code`. Raises RatesUnavailable
+        when no cached table covers both.
+        """
+        from_code, to_code = from_code.upper(), to_code.upper()
+        if from_code == to_code:
+            return 1.0
+
+        tables = self._tables
+        for base in dict.fromkeys((self.pivot, from_code, to_code, *tables)):
+            table = tables.get(base)
+            rate = self._cross_rate(table, base, from_code, to_code) if table else None
+            if rate is not None:
+                self._refresh_if_stale(base)
+                return rate
+
+        # The pivot table lacks one of them (or is still coming): ask for
+        # a table based on the source currency as well.
+        fetching = self._refresh_if_stale(self.pivot)
+        if self.pivot in tables:
+            fetching = self._refresh_if_stale(from_code) or fetching
+        if fetching:
+            message = f"Exchange rates for {from_code} to {to_code} are not available yet"
+        else:
+            message = f"Exchange rates for {from_code} to {to_code} are not available"
+        raise RatesUnavailable(message, fetching)
+
+    def convert(self, value: float, from_code: str, to_code: str) -> float:
+        return value * self.rate(from_code, to_code)
+
+    @staticmethod
+    def _cross_rate(table: dict, base: str, from_code: str, to_code: str) -> float | None:
+        rates = table["rates"]
+        from_rate = 1.0 if from_code == base else rates.get(from_code)
+        to_rate = 1.0 if to_code == base else rates.get(to_code)
+        if from_rate is None or to_rate is None:
+            return None
+        return to_rate / from_rate
+
+    def _refresh_if_stale(self, base: str) -> bool:
+        """Starts fetching `base` if its table is missing or old. Returns whether it is being fetched."""
+        now = time.time()
+        table = self._tables.get(base)
+        if table is not None and now - table["fetched"] < RATES_TTL_SECONDS:
+            return False
+        with self._lock:
+            if base in self._pending:
+                return True
+            if now - self._failed_at.get(base, 0) < RETRY_SECONDS:
+                return False
+            self._pending.add(base)
+        GLib.Thread.new("currency-rates", self._fetch, base)
+        return True
+
+    def _fetch(self, base: str):
+        ok = False
+        try:
+            url = self.url.format(base=base.lower())
+            with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+                payload = json.load(response)
+            table = {"fetched": time.time(), "rates": parse_rates(payload)}
+            self._write(base, table)
+            with self._lock:
+                # Replace rather than mutate, so lookups on the main loop
+                # never iterate a dict that is being changed.
+                self._tables = {**self._tables, base: table}
+            ok = True
+        except (OSError, ValueError) as e:
+            logger.warning(f"[CurrencyRates] Could not fetch rates for {base}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(base)
+                if not ok:
+                    self._failed_at[base] = time.time()
+        GLib.idle_add(self.emit, "fetched", base, ok)
+
+    def _write(self, base: str, table: dict):
+        path = os.path.join(self.cache_dir, f"{base}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"base": base, **table}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[CurrencyRates] Could not cache rates for {base}: {e}")
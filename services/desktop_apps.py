@@ -0,0 +1,296 @@
+import json
+import os
+
+from fabric.core.service import Service, Signal
+from fabric.utils import DesktopApp
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import config.data as data
+from utils.app_resolver import AppResolver
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = f"{data.CACHE_DIR}/desktop_apps.json"
+# Package managers touch many files at once; rescan once they settle.
+RESCAN_DELAY_MS = 500
+
+# DesktopApp attributes stored in the snapshot.
+APP_FIELDS = (
+    "name",
+    "generic_name",
+    "display_name",
+    "description",
+    "window_class",
+    "executable",
+    "command_line",
+    "icon_name",
+)
+# Lookup tables, in the precedence order of the merged identifier map.
+LOOKUP_FIELDS = ("name", "display_name", "window_class", "executable", "command")
+
+
+def application_dirs() -> list[str]:
+    """The `applications` directories of every XDG data dir, highest priority first."""
+    data_dirs = [GLib.get_user_data_dir(), *GLib.get_system_data_dirs()]
+    dirs = []
+    for data_dir in data_dirs:
+        path = os.path.join(data_dir, "applications")
+        if path not in dirs:
+            dirs.append(path)
+    return dirs
+
+
+def directory_mtimes(dirs: list[str]) -> dict[str, int]:
+    """
+    Modification times of the application directories and their
+    subdirectories (desktop file ids may be nested, e.g. kde4/foo.desktop).
+    """
+    mtimes = {}
+    for top in dirs:
+        if not os.path.isdir(top):
+            continue
+        for root, _, _ in os.walk(top):
+            try:
+                mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                pass
+    return mtimes
+
+
+def command_basename(command_line: str | None) -> str:
+    """`/usr/bin/foo --bar %U` -> `foo`."""
+    parts = (command_line or "").split()
+    return parts[0].split("/")[-1] if parts else ""
+
+
+class IndexedApp:
+    """
+    A desktop entry as recorded in the index.
+
+    Carries the same attributes as fabric's DesktopApp, so modules can use
+    it in its place. Entries restored from the snapshot have not parsed
+    their .desktop file; that happens on the first launch(), icon load or
+    access to any other DesktopApp attribute.
+    """
+
+    def __init__(self, app_id: str, fields: dict, app_info: Gio.DesktopAppInfo | None = None):
+        self.id = app_id
+        for field in APP_FIELDS:
+            setattr(self, field, fields.get(field))
+        self._app_info = app_info
+        self._desktop_app = None
+
+    @classmethod
+    def from_app_info(cls, app_info: Gio.DesktopAppInfo) -> "IndexedApp":
+        icon = app_info.get_icon()
+        fields = {
+            "name": app_info.get_name(),
+            "generic_name": app_info.get_generic_name(),
+            "display_name": app_info.get_display_name(),
+            "description": app_info.get_description(),
+            "window_class": app_info.get_startup_wm_class(),
+            "executable": app_info.get_executable(),
+            "command_line": app_info.get_commandline(),
+            "icon_name": icon.to_string() if icon else "application-x-executable",
+        }
+        return cls(app_info.get_id(), fields, app_info)
+
+    def to_record(self) -> dict:
+        record = {field: getattr(self, field) for field in APP_FIELDS}
+        record["id"] = self.id
+        return record
+
+    @property
+    def desktop_app(self) -> DesktopApp | None:
+        """The fabric DesktopApp for this entry, built on first use."""
+        if self._desktop_app is None:
+            app_info = self._app_info or Gio.DesktopAppInfo.new(self.id)
+            if app_info is None:
+                return None
+            self._desktop_app = DesktopApp(app_info)
+        return self._desktop_app
+
+    def launch(self):
+        app = self.desktop_app
+        return app.launch() if app else False
+
+    def get_icon_pixbuf(self, *args, **kwargs):
+        app = self.desktop_app
+        return app.get_icon_pixbuf(*args, **kwargs) if app else None
+
+    def __getattr__(self, name):
+        # Only reached for attributes the index does not record.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        app = self.desktop_app
+        if app is None:
+            raise AttributeError(name)
+        return getattr(app, name)
+
+
+class DesktopAppIndex(Service):
+    """
+    Process-wide index of the installed desktop applications.
+
+    The .desktop files are parsed once and the result is written to a
+    snapshot in the cache directory, keyed by the modification times of
+    the application directories; later startups load the snapshot instead
+    of parsing every file again. While running, Gio file monitors on the
+    directories trigger a (debounced) rescan, after which `changed` is
+    emitted. Lookup tables for the identifiers modules match window
+    classes against are precomputed once per scan. Uses a singleton
+    pattern so Dock, Overview, Notch and the launcher share one index.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the DesktopAppIndex service."""
+        if DesktopAppIndex.instance is None:
+            DesktopAppIndex.instance = DesktopAppIndex()
+        return DesktopAppIndex.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted after installed applications were added, removed or edited."""
+        pass
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._dirs = application_dirs()
+        self._apps: list[IndexedApp] = []
+        self._tables: dict[str, dict[str, IndexedApp]] = {}
+        self._identifiers: dict[str, IndexedApp] = {}
+        self._by_name: dict[str, IndexedApp] = {}
+        self._resolver: AppResolver | None = None
+        self._monitors = []
+        self._rescan_id = None
+
+        mtimes = directory_mtimes(self._dirs)
+        if not self._load_snapshot(mtimes):
+            self._scan(mtimes)
+        self._watch()
+
+    # Building
+
+    def _load_snapshot(self, mtimes: dict[str, int]) -> bool:
+        try:
+            with open(SNAPSHOT_PATH, "r") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("dirs") != mtimes:
+            return False
+        try:
+            apps = [IndexedApp(record["id"], record) for record in snapshot["apps"]]
+        except (KeyError, TypeError):
+            return False
+        self._set_apps(apps)
+        return True
+
+    def _scan(self, mtimes: dict[str, int] | None = None) -> None:
+        if mtimes is None:
+            mtimes = directory_mtimes(self._dirs)
+        apps = [
+            IndexedApp.from_app_info(app_info)
+            for app_info in Gio.AppInfo.get_all()
+            if isinstance(app_info, Gio.DesktopAppInfo) and app_info.should_show()
+        ]
+        self._set_apps(apps)
+        self._write_snapshot(mtimes)
+
+    def _write_snapshot(self, mtimes: dict[str, int]) -> None:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "dirs": mtimes,
+            "apps": [app.to_record() for app in self._apps],
+        }
+        tmp_path = f"{SNAPSHOT_PATH}.tmp"
+        try:
+            os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except OSError as e:
+            logger.warning(f"[DesktopAppIndex] Could not write snapshot: {e}")
+
+    def _set_apps(self, apps: list[IndexedApp]) -> None:
+        tables = {field: {} for field in LOOKUP_FIELDS}
+        identifiers = {}
+        by_name = {}
+        for app in apps:
+            keys = (
+                app.name,
+                app.display_name,
+                app.window_class,
+                (app.executable or "").split("/")[-1],
+                command_basename(app.command_line),
+            )
+            for field, key in zip(LOOKUP_FIELDS, keys):
+                if key:
+                    tables[field][key.lower()] = app
+                    identifiers[key.lower()] = app
+            if app.name:
+                by_name[app.name] = app
+
+        self._apps = apps
+        self._tables = tables
+        self._identifiers = identifiers
+        self._by_name = by_name
+        self._resolver = AppResolver(apps, identifiers)
+
+    # Watching
+
+    def _watch(self) -> None:
+        for path in self._dirs:
+            try:
+                monitor = Gio.File.new_for_path(path).monitor_directory(
+                    Gio.FileMonitorFlags.NONE, None
+                )
+            except GLib.Error as e:
+                logger.debug(f"[DesktopAppIndex] Not watching {path}: {e.message}")
+                continue
+            monitor.connect("changed", self._on_directory_changed)
+            self._monitors.append(monitor)
+
+    def _on_directory_changed(self, monitor, file, other_file, event_type):
+        if event_type == Gio.FileMonitorEvent.ATTRIBUTE_CHANGED:
+            return
+        if self._rescan_id is not None:
+            GLib.source_remove(self._rescan_id)
+        self._rescan_id = GLib.timeout_add(RESCAN_DELAY_MS, self._on_rescan)
+
+    def _on_rescan(self):
+        self._rescan_id = None
+        self._scan()
+        logger.info(f"[DesktopAppIndex] Rescanned {len(self._apps)} applications")
+        self.emit("changed")
+        return False
+
+    # Read API. Returned collections are shared and must not be mutated.
+
+    @property
+    def apps(self) -> list[IndexedApp]:
+        return self._apps
+
+    @property
+    def identifiers(self) -> dict[str, IndexedApp]:
+        """
+        Lowercased name, display name, window class, executable basename
+        and command basename of every app, merged into one map.
+        """
+        return self._identifiers
+
+    def table(self, field: str) -> dict[str, IndexedApp]:
+        """The lookup table for one of LOOKUP_FIELDS, keyed by lowercased value."""
+        return self._tables[field]
+
+    def get_by_name(self, name: str) -> IndexedApp | None:
+        """Exact (case-sensitive) match on the desktop entry's Name."""
+        return self._by_name.get(name)
+
+    @property
+    def resolver(self) -> AppResolver:
+        """Memoizing identifier resolver over the current entries."""
+        return self._resolver
@@ -0,0 +1,338 @@
+import json
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from fabric.utils.helpers import get_relative_path
+from gi.repository import GLib
+from loguru import logger
+
+import config.data as data
+from utils.section_file import SectionFile, write_section_file
+
+SOURCE_PATH = get_relative_path("../assets/emoji.json")
+INDEX_PATH = f"{data.CACHE_DIR}/emoji.idx"
+INDEX_MAGIC = b"AXEMOJI\0"
+INDEX_VERSION = 1
+
+# Where a token comes from, best first; postings hold emoji id * 4 + field.
+FIELD_LEADING_WORD = 0
+FIELD_NAME = 1
+FIELD_GROUP = 2
+
+# magic, version, source size and mtime, emoji and token counts, then
+# (offset, length) of each section in SECTIONS.
+SECTIONS = (
+    "string_blob", "string_offsets",
+    "chars", "names", "groups", "ranks",
+    "key_blob", "key_offsets",
+    "token_blob", "token_offsets", "token_postings", "postings",
+)
+HEADER = struct.Struct("<8sIQQII" + "QQ" * len(SECTIONS))
+
+WORD = re.compile(r"[^\W_]+")
+
+
+def _tokens(text: str) -> list[str]:
+    return WORD.findall(text.casefold())
+
+
+def _source_signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def build_index(source_path: str, index_path: str) -> None:
+    """Compiles the emoji JSON at `source_path` into an index at `index_path`."""
+    size, mtime = _source_signature(source_path)
+    with open(source_path, "r", encoding="utf-8") as f:
+        emojis = json.load(f)
+
+    # Every distinct string is stored once; emojis refer to them by id.
+    strings: dict[str, int] = {}
+
+    def intern(string: str) -> int:
+        string_id = strings.get(string)
+        if string_id is None:
+            string_id = strings[string] = len(strings)
+        return string_id
+
+    chars, names, groups = array("I"), array("I"), array("I")
+    keys = []
+    name_strings = []
+    postings_by_token: dict[str, dict[int, int]] = {}
+    for emoji_id, (char, info) in enumerate(emojis.items()):
+        name = info.get("name", "")
+        group = info.get("group", "")
+        chars.append(intern(char))
+        names.append(intern(name))
+        name_strings.append(name)
+        groups.append(intern(group))
+        keys.append(f"{name} {group}".casefold().encode("utf-8"))
+
+        fields = [(token, FIELD_LEADING_WORD if i == 0 else FIELD_NAME) for i, token in enumerate(_tokens(name))]
+        fields += [(token, FIELD_NAME) for token in _tokens(info.get("slug", ""))]
+        fields += [(token, FIELD_GROUP) for token in _tokens(group)]
+        for token, field in fields:
+            posting = postings_by_token.setdefault(token, {})
+            posting[emoji_id] = min(posting.get(emoji_id, field), field)
+
+    def blob(encoded):
+        offsets = array("I", [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        return b"".join(encoded), offsets
+
+    # Ties between equally good matches go to shorter names, then to the
+    # data's own order; ranks[id] is an emoji's place in that order.
+    ranks = array("I", bytes(4 * len(chars)))
+    by_length = sorted(range(len(chars)), key=lambda emoji_id: (len(name_strings[emoji_id]), emoji_id))
+    for rank, emoji_id in enumerate(by_length):
+        ranks[emoji_id] = rank
+
+    string_blob, string_offsets = blob([string.encode("utf-8") for string in strings])
+    key_blob, key_offsets = blob(keys)
+    tokens = sorted(token.encode("utf-8") for token in postings_by_token)
+    token_blob, token_offsets = blob(tokens)
+    token_postings = array("I", [0])
+    postings = array("I")
+    for token in tokens:
+        posting = postings_by_token[token.decode("utf-8")]
+        postings.extend(emoji_id * 4 + field for emoji_id, field in sorted(posting.items()))
+        token_postings.append(len(postings))
+
+    sections = {
+        "string_blob": string_blob, "string_offsets": string_offsets,
+        "chars": chars, "names": names, "groups": groups, "ranks": ranks,
+        "key_blob": key_blob, "key_offsets": key_offsets,
+        "token_blob": token_blob, "token_offsets": token_offsets,
+        "token_postings": token_postings, "postings": postings,
+    }
+    write_section_file(
+        index_path,
+        HEADER,
+        (INDEX_MAGIC, INDEX_VERSION, size, mtime, len(chars), len(tokens)),
+        [(name, sections[name]) for name in SECTIONS],
+    )
+
+
+class _Blob:
+    """The strings of a blob section as a read-only sequence of bytes, for bisect."""
+
+    __slots__ = ("_file", "_name", "_offsets")
+
+    def __init__(self, file: SectionFile, name: str, offsets: memoryview):
+        self._file = file
+        self._name = name
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._file.bytes(self._name, self._offsets[index], self._offsets[index + 1])
+
+
+class MappedEmojiIndex:
+    """
+    An emoji index read in place from its memory-mapped file.
+
+    Characters, names and groups are interned in one string table that
+    emojis point into, and decoded strings are cached, so a group name is
+    only ever decoded once. Words of names, slugs and groups form a sorted
+    token table with posting lists of emoji ids, tagged with where the
+    word came from; a query word matches the tokens it is a prefix of,
+    found by bisection. Casefolded "name group" keys back up substring
+    matches inside words.
+    """
+
+    def __init__(self, path: str):
+        self._file = SectionFile(path, HEADER, SECTIONS)
+        magic, version, self.source_size, self.source_mtime, self.count, _ = self._file.fields
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not an emoji index of this version")
+        uint32 = self._file.uint32
+        self._strings = _Blob(self._file, "string_blob", uint32("string_offsets"))
+        self._chars = uint32("chars")
+        self._names = uint32("names")
+        self._groups = uint32("groups")
+        self.ranks = uint32("ranks")
+        self._key_offsets = uint32("key_offsets")
+        self._tokens = _Blob(self._file, "token_blob", uint32("token_offsets"))
+        self._token_postings = uint32("token_postings")
+        self._postings = uint32("postings")
+        self._decoded: dict[int, str] = {}
+        self._group_lengths: dict[int, int] = {}
+
+    def _string(self, string_id: int) -> str:
+        string = self._decoded.get(string_id)
+        if string is None:
+            string = self._decoded[string_id] = self._strings[string_id].decode("utf-8")
+        return string
+
+    def char(self, emoji_id: int) -> str:
+        return self._string(self._chars[emoji_id])
+
+    def name(self, emoji_id: int) -> str:
+        return self._string(self._names[emoji_id])
+
+    def group(self, emoji_id: int) -> str:
+        return self._string(self._groups[emoji_id])
+
+    def _group_key_length(self, emoji_id: int) -> int:
+        # Bytes of the group at the end of an emoji's key; groups are few.
+        group_id = self._groups[emoji_id]
+        length = self._group_lengths.get(group_id)
+        if length is None:
+            length = self._group_lengths[group_id] = len(self._string(group_id).casefold().encode("utf-8"))
+        return length
+
+    def word_scores(self, word: str) -> dict[int, int]:
+        """
+        Emoji id -> score (lower is better) for every emoji matching
+        `word`: whole words before prefixes, names before groups, and
+        substrings inside a word last, again names before groups.
+        """
+        key = word.encode("utf-8")
+        tokens = self._tokens
+        scores: dict[int, int] = {}
+        position = bisect_left(tokens, key)
+        postings = self._postings
+        while position < len(tokens):
+            token = tokens[position]
+            if not token.startswith(key):
+                break
+            prefix_penalty = 0 if len(token) == len(key) else 1
+            start, end = self._token_postings[position], self._token_postings[position + 1]
+            for posting in postings[start:end].tolist():
+                emoji_id = posting >> 2
+                score = (posting & 3) * 2 + prefix_penalty
+                if score < scores.get(emoji_id, 8):
+                    scores[emoji_id] = score
+            position += 1
+
+        # Inside words, as in "ace" for "face": search the keys in place.
+        if len(key) >= 2:
+            key_map = self._file.map
+            base = self._file.starts["key_blob"]
+            end = base + self._file.lengths["key_blob"]
+            key_offsets = self._key_offsets
+            found = key_map.find(key, base, end)
+            while found != -1:
+                emoji_id = bisect_right(key_offsets, found - base) - 1
+                key_end = base + key_offsets[emoji_id + 1]
+                if found + len(key) > key_end:
+                    # Runs into the next key; try again from within it.
+                    found = key_map.find(key, found + 1, end)
+                    continue
+                # Keys are "name group", so the name ends before the group's
+                # length and a space; the first match is the one in the name.
+                in_name = found + len(key) < key_end - self._group_key_length(emoji_id)
+                scores.setdefault(emoji_id, 6 if in_name else 7)
+                found = key_map.find(key, key_end, end)
+        return scores
+
+
+class EmojiIndex:
+    """
+    Searchable emoji data for the emoji picker and the launcher.
+
+    assets/emoji.json is compiled on first run (and whenever it changes)
+    into a binary index in the cache directory, on a worker thread; later
+    startups memory-map it, which reads nothing but its header. Queries
+    are ranked by how well each word matches (see
+    MappedEmojiIndex.word_scores), then by name length and the data's own
+    order; an empty query lists every emoji in that order. Uses a
+    singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the EmojiIndex."""
+        if EmojiIndex.instance is None:
+            EmojiIndex.instance = EmojiIndex()
+        return EmojiIndex.instance
+
+    def __init__(self):
+        self._index: MappedEmojiIndex | None = None
+        self._ready = threading.Event()
+        try:
+            signature = _source_signature(SOURCE_PATH)
+        except OSError as e:
+            logger.warning(f"[EmojiIndex] No emoji data: {e}")
+            self._ready.set()
+            return
+        try:
+            index = MappedEmojiIndex(INDEX_PATH)
+        except (OSError, ValueError, struct.error):
+            index = None
+        if index is not None and (index.source_size, index.source_mtime) == signature:
+            self._index = index
+            self._ready.set()
+        else:
+            GLib.Thread.new("emoji-index-builder", self._build, None)
+
+    def _build(self, _):
+        try:
+            build_index(SOURCE_PATH, INDEX_PATH)
+            self._index = MappedEmojiIndex(INDEX_PATH)
+            logger.info(f"[EmojiIndex] Indexed {self._index.count} emojis")
+        except (OSError, ValueError) as e:
+            logger.warning(f"[EmojiIndex] Could not build the emoji index: {e}")
+        finally:
+            self._ready.set()
+
+    def _wait(self) -> MappedEmojiIndex | None:
+        # Only the first run builds, and that takes a few milliseconds.
+        self._ready.wait()
+        return self._index
+
+    def __len__(self) -> int:
+        index = self._wait()
+        return index.count if index is not None else 0
+
+    @property
+    def signature(self) -> tuple[int, int]:
+        """Size and mtime of the emoji data the ids refer to."""
+        index = self._wait()
+        return (index.source_size, index.source_mtime) if index is not None else (0, 0)
+
+    def char(self, emoji_id: int) -> str:
+        return self._index.char(emoji_id)
+
+    def name(self, emoji_id: int) -> str:
+        return self._index.name(emoji_id)
+
+    def group(self, emoji_id: int) -> str:
+        return self._index.group(emoji_id)
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        """Ids of the emojis matching every word of `query`, best first."""
+        ids = self._search(tuple(_tokens(query)))
+        return list(ids[:limit] if limit is not None else ids)
+
+    @lru_cache(maxsize=64)
+    def _search(self, words: tuple[str, ...]) -> tuple[int, ...]:
+        index = self._wait()
+        if index is None:
+            return ()
+        if not words:
+            return tuple(range(index.count))
+
+        totals: dict[int, int] | None = None
+        for word in words:
+            scores = index.word_scores(word)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {emoji_id: total + scores[emoji_id] for emoji_id, total in totals.items() if emoji_id in scores}
+            if not totals:
+                return ()
+        ranks = index.ranks
+        return tuple(sorted(totals, key=lambda emoji_id: (totals[emoji_id], ranks[emoji_id])))
@@ -0,0 +1,473 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from heapq import nsmallest
+
+from gi.repository import Gio, GLib
+from loguru import logger
+
+import config.data as data
+from utils.section_file import SectionFile, write_section_file
+
+INDEX_PATH = f"{data.CACHE_DIR}/files.idx"
+INDEX_MAGIC = b"AXFILES\0"
+INDEX_VERSION = 1
+# Length, in UTF-8 bytes, of the name fragments the index is keyed by.
+GRAM_SIZE = 3
+# Rebuild in the background on startup when the index is older than this;
+# changes made while the shell was not running are only seen by a rebuild.
+REBUILD_AFTER_SECONDS = 24 * 3600
+# Rebuild once monitors have recorded this many changes since the last build.
+OVERLAY_LIMIT = 5000
+# inotify watches are a limited resource; monitor the shallowest directories.
+MAX_WATCHED_DIRECTORIES = 4096
+# Monitors set up per idle callback after the index is loaded.
+WATCH_BATCH_SIZE = 256
+
+# magic, version, config signature, build time, directory, file and gram counts,
+# then (offset, length) of each section in SECTIONS.
+SECTIONS = (
+    "dir_blob", "dir_offsets",
+    "name_blob", "name_offsets",
+    "key_blob", "key_offsets",
+    "file_dirs",
+    "grams", "gram_offsets", "postings",
+    "head_grams", "head_offsets", "head_postings",
+)
+HEADER = struct.Struct("<8sI16sdIII" + "QQ" * len(SECTIONS))
+
+
+def _grams(key: bytes) -> set[int]:
+    """The distinct GRAM_SIZE-byte fragments of `key`, packed into ints."""
+    return {
+        int.from_bytes(key[i:i + GRAM_SIZE], "big")
+        for i in range(len(key) - GRAM_SIZE + 1)
+    }
+
+
+def _search_key(name: str) -> bytes:
+    return name.casefold().encode("utf-8", "surrogateescape")
+
+
+def config_signature() -> bytes:
+    """Identifies the configured roots and exclusions an index was built for."""
+    config = json.dumps(
+        [data.FILE_SEARCH_ROOTS, sorted(data.FILE_SEARCH_EXCLUDES), data.FILE_SEARCH_HIDDEN]
+    )
+    return hashlib.md5(config.encode()).digest()
+
+
+def walk_roots(roots: list[str], excludes: set[str], include_hidden: bool):
+    """
+    Lists the directories under `roots` (skipping excluded names and, unless
+    `include_hidden`, dot-directories) and the files in them. Returns the
+    directory paths and (directory index, file name) pairs. Symlinks are
+    not followed.
+    """
+    dirs = []
+    files = []
+    stack = [os.path.expanduser(root) for root in reversed(roots)]
+    while stack:
+        path = stack.pop()
+        dir_id = len(dirs)
+        dirs.append(path)
+        try:
+            with os.scandir(path) as entries:
+                subdirs = []
+                for entry in entries:
+                    name = entry.name
+                    if not include_hidden and name.startswith("."):
+                        continue
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if name not in excludes:
+                            subdirs.append(entry.path)
+                    else:
+                        files.append((dir_id, name))
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+    return dirs, files
+
+
+def write_index(path: str, signature: bytes, dirs: list[str], files: list[tuple[int, str]]) -> None:
+    """Writes an index for `dirs`/`files` (see walk_roots) atomically to `path`."""
+    sections = {}
+
+    def blob(strings, encode):
+        offsets = array("I", [0])
+        parts = []
+        position = 0
+        for string in strings:
+            encoded = encode(string)
+            parts.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+        return b"".join(parts), offsets
+
+    sections["dir_blob"], sections["dir_offsets"] = blob(dirs, os.fsencode)
+    sections["name_blob"], sections["name_offsets"] = blob((name for _, name in files), os.fsencode)
+    keys = [_search_key(name) for _, name in files]
+    sections["key_blob"], sections["key_offsets"] = blob(keys, lambda key: key)
+    sections["file_dirs"] = array("I", (dir_id for dir_id, _ in files))
+
+    def posting_table(postings_by_gram):
+        grams = array("I", sorted(postings_by_gram))
+        offsets = array("I", [0])
+        postings = array("I")
+        for gram in grams:
+            postings.extend(postings_by_gram[gram])
+            offsets.append(len(postings))
+        return grams, offsets, postings
+
+    # Every gram of every name, and separately the gram each name starts with.
+    postings_by_gram: dict[int, array] = {}
+    heads_by_gram: dict[int, array] = {}
+    for file_id, key in enumerate(keys):
+        for gram in _grams(key):
+            posting = postings_by_gram.get(gram)
+            if posting is None:
+                posting = postings_by_gram[gram] = array("I")
+            posting.append(file_id)
+        if len(key) >= GRAM_SIZE:
+            head = int.from_bytes(key[:GRAM_SIZE], "big")
+            posting = heads_by_gram.get(head)
+            if posting is None:
+                posting = heads_by_gram[head] = array("I")
+            posting.append(file_id)
+    grams, gram_offsets, postings = posting_table(postings_by_gram)
+    sections["grams"], sections["gram_offsets"], sections["postings"] = grams, gram_offsets, postings
+    sections["head_grams"], sections["head_offsets"], sections["head_postings"] = posting_table(heads_by_gram)
+
+    write_section_file(
+        path,
+        HEADER,
+        (INDEX_MAGIC, INDEX_VERSION, signature, time.time(), len(dirs), len(files), len(grams)),
+        [(name, sections[name]) for name in SECTIONS],
+    )
+
+
+class MappedIndex:
+    """
+    A file index read in place from its memory-mapped file.
+
+    Names, search keys (casefolded names) and directory paths are stored
+    as blobs with offset tables; a sorted table of name trigrams points
+    into posting lists of file ids, and a second one lists the files by
+    the trigram their name starts with, for ranking prefix matches.
+    Nothing but the header is read at load time; a query touches the
+    posting lists of its own trigrams and the names of the files they
+    have in common.
+    """
+
+    def __init__(self, path: str):
+        self._file = SectionFile(path, HEADER, SECTIONS)
+        self._map = self._file.map
+        magic, version, self.signature, self.built_at, self.dir_count, self.file_count, _ = self._file.fields
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not a file index of this version")
+
+        self._section_starts = self._file.starts
+        for name in SECTIONS:
+            if not name.endswith("_blob"):
+                setattr(self, f"_{name}", self._file.uint32(name))
+
+    def _string(self, blob: str, index: int) -> bytes:
+        offsets = getattr(self, f"_{blob}_offsets")
+        base = self._section_starts[f"{blob}_blob"]
+        return self._map[base + offsets[index]:base + offsets[index + 1]]
+
+    def path(self, file_id: int) -> str:
+        directory = os.fsdecode(self._string("dir", self._file_dirs[file_id]))
+        return os.path.join(directory, os.fsdecode(self._string("name", file_id)))
+
+    def directories(self) -> list[str]:
+        return [os.fsdecode(self._string("dir", i)) for i in range(self.dir_count)]
+
+    @staticmethod
+    def _lookup(grams, offsets, postings, gram: int):
+        position = bisect_left(grams, gram)
+        if position == len(grams) or grams[position] != gram:
+            return None
+        return postings[offsets[position]:offsets[position + 1]]
+
+    def matches(self, key: bytes, token=None) -> list[tuple[bool, int, int]]:
+        """
+        (not a prefix match, name length, file id) for every file whose
+        search key contains `key`, which must be at least GRAM_SIZE bytes.
+        """
+        postings = []
+        for gram in _grams(key):
+            posting = self._lookup(self._grams, self._gram_offsets, self._postings, gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        found = postings[0]
+        if len(postings) > 1:
+            found = set(found)
+            for posting in postings[1:]:
+                if not found or (token is not None and token.stopped):
+                    break
+                found.intersection_update(posting)
+
+        # Only names starting with the key's first gram can start with the key.
+        head = self._lookup(
+            self._head_grams, self._head_offsets, self._head_postings,
+            int.from_bytes(key[:GRAM_SIZE], "big"),
+        )
+        heads = set(head) if head is not None else set()
+
+        # A key of exactly one gram is matched by its posting list as is.
+        verify = len(key) > GRAM_SIZE
+        key_map = self._map
+        base = self._section_starts["key_blob"]
+        key_offsets = self._key_offsets
+        key_length = len(key)
+        ranked = []
+        for file_id in found:
+            start = base + key_offsets[file_id]
+            end = base + key_offsets[file_id + 1]
+            if verify and key not in key_map[start:end]:
+                continue
+            prefix = file_id in heads and (not verify or key_map[start:start + key_length] == key)
+            ranked.append((not prefix, end - start, file_id))
+        return ranked
+
+
+class FileIndex:
+    """
+    Searchable index of the files under the configured roots.
+
+    The index is built by walking the roots on a worker thread and written
+    to the cache directory in a compact binary format (see MappedIndex)
+    that later startups memory-map instead of walking again. While running,
+    Gio monitors on the indexed directories (the shallowest
+    MAX_WATCHED_DIRECTORIES of them) record created, deleted and moved
+    files in an in-memory overlay that queries merge in. Once the overlay
+    grows past OVERLAY_LIMIT changes, or the index is older than
+    REBUILD_AFTER_SECONDS at startup, it is rebuilt in the background.
+    Queries match a file name fragment (at least GRAM_SIZE bytes,
+    optionally preceded by part of its path) and never touch the
+    filesystem. Uses a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the FileIndex."""
+        if FileIndex.instance is None:
+            FileIndex.instance = FileIndex()
+        return FileIndex.instance
+
+    def __init__(self):
+        self._index: MappedIndex | None = None
+        self._signature = config_signature()
+        self._building = False
+        self._monitors: dict[str, Gio.FileMonitor] = {}
+        self._watch_queue: list[str] = []
+        # path -> (search key, time recorded), and path -> time recorded.
+        self._added: dict[str, tuple[bytes, float]] = {}
+        self._removed: dict[str, float] = {}
+        self._overlay_lock = threading.Lock()
+
+        try:
+            index = MappedIndex(INDEX_PATH)
+        except (OSError, ValueError, struct.error):
+            index = None
+        if index is not None and index.signature == self._signature:
+            self._set_index(index)
+            if time.time() - index.built_at > REBUILD_AFTER_SECONDS:
+                self.rebuild()
+        else:
+            self.rebuild()
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def rebuild(self) -> None:
+        """Walks the roots again on a worker thread and swaps the new index in."""
+        if self._building:
+            return
+        self._building = True
+        GLib.Thread.new("file-index-builder", self._build, time.time())
+
+    def _build(self, started: float):
+        try:
+            dirs, files = walk_roots(
+                data.FILE_SEARCH_ROOTS, set(data.FILE_SEARCH_EXCLUDES), data.FILE_SEARCH_HIDDEN
+            )
+            write_index(INDEX_PATH, self._signature, dirs, files)
+            index = MappedIndex(INDEX_PATH)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[FileIndex] Could not build the file index: {e}")
+            index = None
+        GLib.idle_add(self._on_built, index, started)
+
+    def _on_built(self, index: MappedIndex | None, started: float):
+        self._building = False
+        if index is None:
+            return False
+        logger.info(f"[FileIndex] Indexed {index.file_count} files in {index.dir_count} directories")
+        with self._overlay_lock:
+            # Changes seen while walking may have been missed by the walk.
+            self._added = {p: v for p, v in self._added.items() if v[1] >= started}
+            self._removed = {p: t for p, t in self._removed.items() if t >= started}
+        self._set_index(index)
+        return False
+
+    def _set_index(self, index: MappedIndex):
+        self._index = index
+        for monitor in self._monitors.values():
+            monitor.cancel()
+        self._monitors = {}
+        directories = index.directories()
+        directories.sort(key=lambda path: path.count(os.sep))
+        self._watch_queue = directories[:MAX_WATCHED_DIRECTORIES]
+        GLib.idle_add(self._watch_next_batch)
+
+    # Watching
+
+    def _watch_next_batch(self):
+        batch, self._watch_queue = self._watch_queue[:WATCH_BATCH_SIZE], self._watch_queue[WATCH_BATCH_SIZE:]
+        for path in batch:
+            self._watch(path)
+        return bool(self._watch_queue)
+
+    def _watch(self, path: str):
+        if path in self._monitors or len(self._monitors) >= MAX_WATCHED_DIRECTORIES:
+            return
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None
+            )
+        except GLib.Error as e:
+            logger.debug(f"[FileIndex] Not watching {path}: {e.message}")
+            return
+        monitor.connect("changed", self._on_changed)
+        self._monitors[path] = monitor
+
+    def _on_changed(self, monitor, file, other_file, event_type):
+        Event = Gio.FileMonitorEvent
+        if event_type in (Event.CREATED, Event.MOVED_IN):
+            self._record_added(file.get_path())
+        elif event_type in (Event.DELETED, Event.MOVED_OUT):
+            self._record_removed(file.get_path())
+        elif event_type == Event.RENAMED:
+            self._record_removed(file.get_path())
+            if other_file is not None:
+                self._record_added(other_file.get_path())
+        else:
+            return
+        if len(self._added) + len(self._removed) > OVERLAY_LIMIT:
+            self.rebuild()
+
+    def _is_indexed_name(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return data.FILE_SEARCH_HIDDEN or not name.startswith(".")
+
+    def _record_added(self, path: str | None):
+        if not path or not self._is_indexed_name(path):
+            return
+        if os.path.isdir(path):
+            if os.path.basename(path) in data.FILE_SEARCH_EXCLUDES:
+                return
+            with self._overlay_lock:
+                # Deleted earlier, it would hide everything under it still.
+                self._removed.pop(path, None)
+            self._watch(path)
+            # A directory moved in arrives with its contents.
+            GLib.Thread.new("file-index-walker", self._walk_added_directory, path)
+            return
+        now = time.time()
+        with self._overlay_lock:
+            self._removed.pop(path, None)
+            self._added[path] = (_search_key(os.path.basename(path)), now)
+
+    def _walk_added_directory(self, path: str):
+        dirs, files = walk_roots([path], set(data.FILE_SEARCH_EXCLUDES), data.FILE_SEARCH_HIDDEN)
+        now = time.time()
+        with self._overlay_lock:
+            for dir_id, name in files:
+                file_path = os.path.join(dirs[dir_id], name)
+                self._removed.pop(file_path, None)
+                self._added[file_path] = (_search_key(name), now)
+
+    def _record_removed(self, path: str | None):
+        if not path:
+            return
+        now = time.time()
+        with self._overlay_lock:
+            self._added.pop(path, None)
+            # Also hides everything under it, if it was a directory.
+            self._removed[path] = now
+        monitor = self._monitors.pop(path, None)
+        if monitor is not None:
+            monitor.cancel()
+
+    # Querying. Safe to call from worker threads.
+
+    def search(self, query: str, limit: int = 20, token=None) -> list[str]:
+        """
+        Paths of up to `limit` files whose name contains the last
+        component of `query`, and whose path contains all of `query` if
+        it has a `/`. Prefix matches and shorter names rank first.
+        """
+        index = self._index
+        query = query.strip()
+        path_filter = query.casefold() if os.sep in query else None
+        key = _search_key(query.rsplit(os.sep, 1)[-1])
+        if index is None or len(key) < GRAM_SIZE:
+            return []
+
+        with self._overlay_lock:
+            added = dict(self._added)
+            removed = set(self._removed)
+
+        ranked = [(*match, None) for match in index.matches(key, token)]
+        for path, (name_key, _) in added.items():
+            if key in name_key:
+                ranked.append((not name_key.startswith(key), len(name_key), -1, path))
+        if token is not None and token.cancelled:
+            return []
+
+        if path_filter:
+            ranked.sort()
+        else:
+            # Take extra candidates in case some were removed, or are
+            # listed twice (files replaced in place are in both).
+            ranked = nsmallest(limit + len(removed) + len(added), ranked)
+        paths = []
+        seen = set()
+        for *_, file_id, path in ranked:
+            path = path or index.path(file_id)
+            if path in seen:
+                continue
+            seen.add(path)
+            if removed and self._is_removed(path, removed):
+                continue
+            if path_filter and path_filter not in path.casefold():
+                continue
+            paths.append(path)
+            if len(paths) >= limit:
+                break
+        return paths
+
+    @staticmethod
+    def _is_removed(path: str, removed: set[str]) -> bool:
+        while path and path != os.sep:
+            if path in removed:
+                return True
+            path = os.path.dirname(path)
+        return False
@@ -0,0 +1,360 @@
+from fabric.core.service import Service, Signal
+from fabric.hyprland.widgets import get_hyprland_connection
+from gi.repository import GLib
+from loguru import logger
+
+from utils.hyprland_ipc import HyprlandIPC
+
+SEED_QUERIES = ("monitors", "workspaces", "clients", "activeworkspace", "activewindow")
+RESYNC_TABLES = ("monitors", "workspaces", "clients")
+
+
+def normalize_address(address: str) -> str:
+    """Return a window address in the `0x...` form used by the JSON queries."""
+    address = (address or "").strip()
+    if not address:
+        return ""
+    return address if address.startswith("0x") else f"0x{address}"
+
+
+def _to_int(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class HyprlandState(Service):
+    """
+    In-process mirror of the compositor state shared by every module.
+
+    The store is seeded once from Hyprland's JSON queries and then kept
+    current from the event socket, so modules read clients, monitors and
+    workspaces from memory instead of round-tripping the compositor. Events
+    that carry everything they change are applied in place; events that
+    imply geometry changes (Hyprland never broadcasts window positions)
+    mark the affected table dirty and a single batched query refreshes it
+    once per burst. All queries go through the asynchronous HyprlandIPC
+    client, so the main loop never waits on the compositor. It uses a
+    singleton pattern so all modules share one store.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the HyprlandState service."""
+        if HyprlandState.instance is None:
+            HyprlandState.instance = HyprlandState()
+        return HyprlandState.instance
+
+    @Signal
+    def clients_changed(self) -> None:
+        """Signal emitted when windows open, close, move or change mode."""
+        pass
+
+    @Signal
+    def active_window_changed(self) -> None:
+        """Signal emitted when the focused window changes."""
+        pass
+
+    @Signal
+    def workspace_changed(self) -> None:
+        """Signal emitted when the active workspace or focused monitor changes."""
+        pass
+
+    @Signal
+    def monitors_changed(self) -> None:
+        """Signal emitted when monitors are added, removed or reconfigured."""
+        pass
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._conn = get_hyprland_connection()
+        self._ipc = HyprlandIPC.get_initial()
+
+        self._clients: dict[str, dict] = {}
+        self._monitors: dict[int, dict] = {}
+        self._workspaces: dict[int, dict] = {}
+        self._active_workspace: dict = {}
+        self._active_address = ""
+        self._active_class = ""
+        self._active_title = ""
+
+        self._dirty: set[str] = set()
+        self._resync_id = None
+        self._resync_request = None
+
+        self.seed()
+
+        handlers = {
+            "openwindow": self._on_open_window,
+            "closewindow": self._on_close_window,
+            "movewindowv2": self._on_move_window,
+            "changefloatingmode": self._on_change_floating_mode,
+            "fullscreen": self._on_fullscreen,
+            "windowtitlev2": self._on_window_title,
+            "activewindow": self._on_active_window,
+            "activewindowv2": self._on_active_window_address,
+            "workspacev2": self._on_workspace,
+            "focusedmonv2": self._on_focused_monitor,
+            "createworkspacev2": self._on_create_workspace,
+            "destroyworkspacev2": self._on_destroy_workspace,
+            "renameworkspace": self._on_rename_workspace,
+            "moveworkspacev2": self._on_move_workspace,
+            "monitoradded": self._on_monitors_reconfigured,
+            "monitorremoved": self._on_monitors_reconfigured,
+            "configreloaded": self._on_monitors_reconfigured,
+        }
+        for name, handler in handlers.items():
+            self._conn.connect(f"event::{name}", handler)
+
+    # Queries
+
+    def seed(self) -> None:
+        """
+        Populates every table from the compositor in one batched round-trip.
+        Called once at startup; every signal fires when the reply lands.
+        """
+        self._ipc.query_batch(list(SEED_QUERIES), self._on_seeded)
+
+    def _on_seeded(self, replies) -> None:
+        if not replies or len(replies) != len(SEED_QUERIES):
+            logger.warning("[HyprlandState] Could not seed state from the compositor")
+            return
+        monitors, workspaces, clients, active_workspace, active_window = replies
+        self._load_monitors(monitors)
+        self._load_workspaces(workspaces)
+        self._load_clients(clients)
+
+        if isinstance(active_workspace, dict):
+            self._active_workspace = active_workspace
+
+        if isinstance(active_window, dict):
+            self._active_address = normalize_address(active_window.get("address", ""))
+            self._active_class = active_window.get("class", "")
+            self._active_title = active_window.get("title", "")
+
+        for signal in (
+            "monitors-changed",
+            "clients-changed",
+            "workspace-changed",
+            "active-window-changed",
+        ):
+            self.emit(signal)
+
+    def _load_clients(self, clients) -> None:
+        if isinstance(clients, list):
+            self._clients = {c["address"]: c for c in clients if c.get("address")}
+
+    def _load_monitors(self, monitors) -> None:
+        if isinstance(monitors, list):
+            self._monitors = {m["id"]: m for m in monitors}
+
+    def _load_workspaces(self, workspaces) -> None:
+        if isinstance(workspaces, list):
+            self._workspaces = {w["id"]: w for w in workspaces}
+
+    def _mark_dirty(self, *tables: str) -> None:
+        self._dirty.update(tables)
+        if self._resync_id is None:
+            self._resync_id = GLib.idle_add(self._resync)
+
+    def _resync(self):
+        self._resync_id = None
+        if self._resync_request is not None:
+            # Picked up again once the in-flight refresh lands.
+            return False
+
+        dirty, self._dirty = self._dirty, set()
+        tables = [table for table in RESYNC_TABLES if table in dirty]
+        self._resync_request = self._ipc.query_batch(
+            tables, lambda replies: self._on_resynced(tables, replies)
+        )
+        return False
+
+    def _on_resynced(self, tables: list[str], replies) -> None:
+        self._resync_request = None
+        if replies and len(replies) == len(tables):
+            for table, reply in zip(tables, replies):
+                getattr(self, f"_load_{table}")(reply)
+
+        # Emit even if the refresh failed: in-place edits may already be pending.
+        if "monitors" in tables:
+            self.emit("monitors-changed")
+        if "clients" in tables:
+            self.emit("clients-changed")
+
+        if self._dirty and self._resync_id is None:
+            self._resync_id = GLib.idle_add(self._resync)
+
+    # Read API. Returned dicts are shared with the store and must not be mutated.
+
+    @property
+    def clients(self) -> list[dict]:
+        return list(self._clients.values())
+
+    def get_client(self, address: str) -> dict | None:
+        return self._clients.get(normalize_address(address))
+
+    def clients_on_workspace(self, workspace_id: int) -> list[dict]:
+        return [
+            c for c in self._clients.values()
+            if c.get("workspace", {}).get("id") == workspace_id
+        ]
+
+    @property
+    def monitors(self) -> list[dict]:
+        return [self._monitors[k] for k in sorted(self._monitors)]
+
+    def get_monitor(self, monitor_id: int) -> dict | None:
+        return self._monitors.get(monitor_id)
+
+    def get_monitor_by_name(self, name: str) -> dict | None:
+        for monitor in self._monitors.values():
+            if monitor.get("name") == name:
+                return monitor
+        return None
+
+    @property
+    def focused_monitor(self) -> dict | None:
+        for monitor in self._monitors.values():
+            if monitor.get("focused"):
+                return monitor
+        return self.get_monitor_by_name(self._active_workspace.get("monitor", ""))
+
+    @property
+    def workspaces(self) -> list[dict]:
+        return [self._workspaces[k] for k in sorted(self._workspaces)]
+
+    def get_workspace(self, workspace_id: int) -> dict | None:
+        return self._workspaces.get(workspace_id)
+
+    @property
+    def active_workspace(self) -> dict:
+        return self._active_workspace
+
+    @property
+    def active_window(self) -> dict:
+        """
+        The focused client. Between `activewindow` and `activewindowv2` only
+        the class and title are known, so a minimal dict is returned.
+        """
+        client = self._clients.get(self._active_address)
+        if client is not None:
+            return client
+        if not (self._active_address or self._active_class):
+            return {}
+        return {
+            "address": self._active_address,
+            "class": self._active_class,
+            "initialClass": self._active_class,
+            "title": self._active_title,
+        }
+
+    # Event handlers
+
+    def _on_open_window(self, _, event):
+        self._mark_dirty("clients")
+
+    def _on_close_window(self, _, event):
+        address = normalize_address(event.data[0])
+        self._clients.pop(address, None)
+        if address == self._active_address:
+            self._active_address = ""
+        self._mark_dirty("clients")
+
+    def _on_move_window(self, _, event):
+        address = normalize_address(event.data[0])
+        client = self._clients.get(address)
+        if client is not None and len(event.data) >= 3:
+            client["workspace"] = {
+                "id": _to_int(event.data[1]),
+                "name": ",".join(event.data[2:]),
+            }
+        self._mark_dirty("clients")
+
+    def _on_change_floating_mode(self, _, event):
+        client = self._clients.get(normalize_address(event.data[0]))
+        if client is not None and len(event.data) >= 2:
+            client["floating"] = event.data[1] == "1"
+        self._mark_dirty("clients")
+
+    def _on_fullscreen(self, _, event):
+        self._mark_dirty("clients")
+
+    def _on_window_title(self, _, event):
+        client = self._clients.get(normalize_address(event.data[0]))
+        if client is not None:
+            client["title"] = ",".join(event.data[1:])
+
+    def _on_active_window(self, _, event):
+        self._active_class = event.data[0] if event.data else ""
+        self._active_title = ",".join(event.data[1:])
+        # The address arrives with the following activewindowv2 event.
+        self._active_address = ""
+
+    def _on_active_window_address(self, _, event):
+        self._active_address = normalize_address(event.data[0] if event.data else "")
+        self.emit("active-window-changed")
+
+    def _on_workspace(self, _, event):
+        workspace_id = _to_int(event.data[0])
+        workspace = self._workspaces.get(workspace_id)
+        if workspace is None:
+            focused = self.focused_monitor or {}
+            workspace = {
+                "id": workspace_id,
+                "name": ",".join(event.data[1:]),
+                "monitor": focused.get("name", ""),
+                "monitorID": focused.get("id", -1),
+            }
+            self._workspaces[workspace_id] = workspace
+        self._active_workspace = workspace
+
+        monitor = self.get_monitor_by_name(workspace.get("monitor", ""))
+        if monitor is not None:
+            monitor["activeWorkspace"] = {"id": workspace_id, "name": workspace.get("name", "")}
+        self.emit("workspace-changed")
+
+    def _on_focused_monitor(self, _, event):
+        name = event.data[0]
+        for monitor in self._monitors.values():
+            monitor["focused"] = monitor.get("name") == name
+
+        workspace_id = _to_int(event.data[1]) if len(event.data) > 1 else None
+        workspace = self._workspaces.get(workspace_id)
+        if workspace is not None:
+            self._active_workspace = workspace
+        self.emit("workspace-changed")
+
+    def _on_create_workspace(self, _, event):
+        workspace_id = _to_int(event.data[0])
+        focused = self.focused_monitor or {}
+        self._workspaces.setdefault(workspace_id, {
+            "id": workspace_id,
+            "name": ",".join(event.data[1:]),
+            "monitor": focused.get("name", ""),
+            "monitorID": focused.get("id", -1),
+            "windows": 0,
+        })
+
+    def _on_destroy_workspace(self, _, event):
+        self._workspaces.pop(_to_int(event.data[0]), None)
+
+    def _on_rename_workspace(self, _, event):
+        workspace = self._workspaces.get(_to_int(event.data[0]))
+        if workspace is not None:
+            workspace["name"] = ",".join(event.data[1:])
+
+    def _on_move_workspace(self, _, event):
+        workspace = self._workspaces.get(_to_int(event.data[0]))
+        if workspace is not None and len(event.data) >= 3:
+            monitor_name = event.data[-1]
+            monitor = self.get_monitor_by_name(monitor_name)
+            workspace["monitor"] = monitor_name
+            workspace["monitorID"] = monitor["id"] if monitor else -1
+        self._mark_dirty("monitors", "clients")
+
+    def _on_monitors_reconfigured(self, *_):
+        self._mark_dirty("monitors", "workspaces", "clients")
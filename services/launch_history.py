@@ -0,0 +1,158 @@
+import json
+import math
+import os
+import threading
+import time
+
+from fabric.core.service import Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+import config.data as data
+
+HISTORY_PATH = f"{data.CACHE_DIR}/launch_history.json"
+HISTORY_VERSION = 1
+# A launch counts half as much after this long.
+HALF_LIFE_SECONDS = 7 * 24 * 3600
+DECAY_RATE = math.log(2) / HALF_LIFE_SECONDS
+# Entries decayed below this are forgotten (one launch, about a month ago).
+PRUNE_SCORE = 0.05
+MAX_ENTRIES = 256
+COMPACT_INTERVAL_SECONDS = 3600
+# Launches are written out together after this delay.
+FLUSH_DELAY_MS = 2000
+
+
+def decayed(score: float, stamp: float, now: float) -> float:
+    """`score` as of `stamp`, decayed to `now`."""
+    return score * math.exp(-DECAY_RATE * max(now - stamp, 0))
+
+
+class LaunchHistory(Service):
+    """
+    Time-decayed launch counts ("frecency") per desktop entry.
+
+    Each app keeps a single (score, timestamp) pair: a launch decays the
+    score to the current time and adds one, so recent launches weigh more
+    than old ones and the store stays one pair per app however often it
+    is used. The store lives in memory; changes are written atomically to
+    the cache directory a moment after the last launch, from a worker
+    thread. Compaction, on load and then hourly, rebases scores to the
+    current time, forgets entries that decayed away and keeps at most
+    MAX_ENTRIES. Launches from the launcher and the dock are recorded
+    here; `changed` tells the launcher to re-rank. Uses a singleton
+    pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the LaunchHistory service."""
+        if LaunchHistory.instance is None:
+            LaunchHistory.instance = LaunchHistory()
+        return LaunchHistory.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted after a launch was recorded or scores were compacted."""
+        pass
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # app id -> [score, timestamp of score]
+        self._entries: dict[str, list[float]] = self._load()
+        self._flush_id = None
+        self._write_lock = threading.Lock()
+
+        if self._compact():
+            self._schedule_flush()
+        GLib.timeout_add_seconds(COMPACT_INTERVAL_SECONDS, self._on_compact_timeout)
+
+    def _load(self) -> dict[str, list[float]]:
+        try:
+            with open(HISTORY_PATH, "r") as f:
+                history = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"[LaunchHistory] Ignoring unreadable history: {e}")
+            return {}
+        if not isinstance(history, dict) or history.get("version") != HISTORY_VERSION:
+            return {}
+        entries = {}
+        for app_id, entry in history.get("apps", {}).items():
+            try:
+                entries[app_id] = [float(entry[0]), float(entry[1])]
+            except (TypeError, ValueError, IndexError):
+                continue
+        return entries
+
+    def record(self, app_id: str | None) -> None:
+        """Counts one launch of the desktop entry `app_id`."""
+        if not app_id:
+            return
+        now = time.time()
+        entry = self._entries.get(app_id)
+        score = decayed(*entry, now) if entry else 0.0
+        self._entries[app_id] = [score + 1.0, now]
+        self._schedule_flush()
+        self.emit("changed")
+
+    def score(self, app_id: str | None) -> float:
+        entry = self._entries.get(app_id) if app_id else None
+        return decayed(*entry, time.time()) if entry else 0.0
+
+    def scores(self) -> dict[str, float]:
+        """Current frecency of every recorded app."""
+        now = time.time()
+        return {app_id: decayed(*entry, now) for app_id, entry in self._entries.items()}
+
+    def _compact(self) -> bool:
+        """Rebases, prunes and caps the entries. Returns whether anything was dropped."""
+        now = time.time()
+        scored = sorted(
+            ((decayed(*entry, now), app_id) for app_id, entry in self._entries.items()),
+            reverse=True,
+        )
+        kept = {
+            app_id: [score, now]
+            for score, app_id in scored[:MAX_ENTRIES]
+            if score >= PRUNE_SCORE
+        }
+        dropped = len(kept) != len(self._entries)
+        self._entries = kept
+        return dropped
+
+    def _on_compact_timeout(self):
+        if self._compact():
+            self._schedule_flush()
+        # Scores have decayed since the last ranking.
+        self.emit("changed")
+        return True
+
+    def _schedule_flush(self):
+        if self._flush_id is not None:
+            GLib.source_remove(self._flush_id)
+        self._flush_id = GLib.timeout_add(FLUSH_DELAY_MS, self._flush)
+
+    def _flush(self):
+        self._flush_id = None
+        snapshot = {
+            "version": HISTORY_VERSION,
+            "apps": {app_id: list(entry) for app_id, entry in self._entries.items()},
+        }
+        GLib.Thread.new("launch-history-writer", self._write_history, snapshot)
+        return False
+
+    def _write_history(self, snapshot: dict):
+        tmp_path = f"{HISTORY_PATH}.tmp"
+        # Writers may overlap if flushes come faster than the disk.
+        with self._write_lock:
+            try:
+                os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, HISTORY_PATH)
+            except OSError as e:
+                logger.warning(f"[LaunchHistory] Could not write history: {e}")
@@ -0,0 +1,251 @@
+import hashlib
+import itertools
+import os
+import queue
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+import gi
+from loguru import logger
+
+import config.data as data
+
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib  # noqa: E402
+
+THUMBNAILS_DIR = f"{data.CACHE_DIR}/thumbnails"
+# Bytes of thumbnails kept on disk, and of decoded ones kept in memory;
+# the least recently used go first.
+DISK_BUDGET_BYTES = 64 * 1024 * 1024
+MEMORY_BUDGET_BYTES = 32 * 1024 * 1024
+# Thumbnails decoded at once. Decoding is what takes time, and more
+# workers would mostly compete with the main loop for the CPU.
+WORKERS = 2
+
+PRIORITY_VISIBLE = 0
+PRIORITY_DEFAULT = 1
+
+
+def decode_thumbnail(image: bytes, size: int) -> GdkPixbuf.Pixbuf:
+    """
+    `image` decoded to fit in a `size` pixel square. The loader is told
+    the size before it decodes, so formats that can (JPEG) never decode
+    the full image, and the rest are scaled as they load.
+    """
+    loader = GdkPixbuf.PixbufLoader()
+
+    def on_size_prepared(loader, width, height):
+        if width > size or height > size:
+            scale = size / max(width, height)
+            loader.set_size(max(round(width * scale), 1), max(round(height * scale), 1))
+
+    loader.connect("size-prepared", on_size_prepared)
+    try:
+        loader.write(image)
+    finally:
+        loader.close()
+    pixbuf = loader.get_pixbuf()
+    if pixbuf is None:
+        raise ValueError("image could not be decoded")
+    return pixbuf
+
+
+class _Request:
+    __slots__ = ("key", "load", "size", "callbacks", "priority")
+
+    def __init__(self, key: str, load: Callable[[], bytes | None], size: int, priority: int):
+        self.key = key
+        self.load = load
+        self.size = size
+        self.callbacks = []
+        self.priority = priority
+
+
+class ThumbnailCache:
+    """
+    Small previews of images, cached in memory and on disk.
+
+    Thumbnails are stored by a hash of the image and the size, so the same
+    image copied twice (or under another key) is decoded once, across
+    restarts too. Both caches are bounded LRUs. Requests name an image by
+    a caller's key, such as a clipboard entry, and give a function that
+    reads its bytes; reading, hashing and decoding happen on a few worker
+    threads, visible rows first, and callbacks run on the main loop. Uses
+    a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the ThumbnailCache."""
+        if ThumbnailCache.instance is None:
+            ThumbnailCache.instance = ThumbnailCache()
+        return ThumbnailCache.instance
+
+    def __init__(self, directory: str = THUMBNAILS_DIR):
+        self.directory = directory
+        # Main loop only: "digest-size" -> pixbuf, and caller key -> digest.
+        self._memory: OrderedDict[str, GdkPixbuf.Pixbuf] = OrderedDict()
+        self._memory_bytes = 0
+        self._digests: dict[str, str] = {}
+
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, int], _Request] = {}
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._workers = 0
+        # Worker threads only (under _lock): file name -> size, oldest first.
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+
+    def lookup(self, key: str, size: int) -> GdkPixbuf.Pixbuf | None:
+        """The thumbnail of `key` if it is in memory already."""
+        digest = self._digests.get(key)
+        pixbuf = self._memory.get(f"{digest}-{size}") if digest is not None else None
+        if pixbuf is not None:
+            self._memory.move_to_end(f"{digest}-{size}")
+        return pixbuf
+
+    def request(
+        self,
+        key: str,
+        load: Callable[[], bytes | None],
+        size: int,
+        callback: Callable[[GdkPixbuf.Pixbuf | None], None],
+        visible: bool = False,
+    ):
+        """
+        Calls `callback` on the main loop with the thumbnail of `key`, or
+        None if `load` finds nothing or it cannot be decoded. `load` runs
+        on a worker thread, only when the thumbnail is not cached yet.
+        """
+        pixbuf = self.lookup(key, size)
+        if pixbuf is not None:
+            callback(pixbuf)
+            return
+        priority = PRIORITY_VISIBLE if visible else PRIORITY_DEFAULT
+        with self._lock:
+            request = self._pending.get((key, size))
+            if request is None:
+                request = self._pending[(key, size)] = _Request(key, load, size, priority)
+                self._queue.put((priority, next(self._order), (key, size)))
+            elif priority < request.priority:
+                request.priority = priority
+                self._queue.put((priority, next(self._order), (key, size)))
+            request.callbacks.append(callback)
+            if self._workers < WORKERS:
+                self._workers += 1
+                GLib.Thread.new("thumbnail-worker", self._work, None)
+
+    def prioritize(self, keys, size: int):
+        """Moves pending requests for `keys` ahead of the others, such as when their rows scroll into view."""
+        with self._lock:
+            for key in keys:
+                request = self._pending.get((key, size))
+                if request is not None and request.priority > PRIORITY_VISIBLE:
+                    request.priority = PRIORITY_VISIBLE
+                    self._queue.put((PRIORITY_VISIBLE, next(self._order), (key, size)))
+
+    def _work(self, _):
+        try:
+            while True:
+                _, _, pending_key = self._queue.get()
+                with self._lock:
+                    # Taken out as soon as it is picked up: requests bumped ahead
+                    # are queued twice, and the later copy must find nothing.
+                    request = self._pending.pop(pending_key, None)
+                if request is None:
+                    continue
+                digest, pixbuf = None, None
+                try:
+                    image = request.load()
+                    if image is not None:
+                        digest = hashlib.blake2b(image, digest_size=16).hexdigest()
+                        pixbuf = self._load_or_create(f"{digest}-{request.size}", image, request.size)
+                except Exception as e:
+                    logger.warning(f"[ThumbnailCache] No thumbnail for {request.key}: {e}")
+                GLib.idle_add(self._deliver, request, digest, pixbuf)
+        finally:
+            # Lets request() start another if this one ever stops.
+            with self._lock:
+                self._workers -= 1
+
+    def _load_or_create(self, name: str, image: bytes, size: int) -> GdkPixbuf.Pixbuf:
+        path = os.path.join(self.directory, f"{name}.png")
+        with self._lock:
+            self._scan_disk()
+            cached = name in self._disk
+            if cached:
+                self._disk.move_to_end(name)
+        if cached:
+            try:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+                os.utime(path)
+                return pixbuf
+            except (GLib.Error, OSError):
+                pass
+
+        pixbuf = decode_thumbnail(image, size)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            pixbuf.savev(tmp_path, "png", [], [])
+            os.replace(tmp_path, path)
+            file_size = os.path.getsize(path)
+        except (GLib.Error, OSError) as e:
+            logger.warning(f"[ThumbnailCache] Could not save {path}: {e}")
+            return pixbuf
+        with self._lock:
+            self._disk_bytes += file_size - self._disk.pop(name, 0)
+            self._disk[name] = file_size
+            self._evict_disk()
+        return pixbuf
+
+    def _scan_disk(self):
+        # Once, on the first request: what earlier sessions left, by age.
+        if self._disk is not None:
+            return
+        self._disk = OrderedDict()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".png"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name[:-len(".png")], stat.st_size))
+                    elif entry.name.endswith(".tmp"):
+                        os.unlink(entry.path)
+        except OSError as e:
+            logger.warning(f"[ThumbnailCache] Cannot read {self.directory}: {e}")
+            return
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > DISK_BUDGET_BYTES and len(self._disk) > 1:
+            name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.unlink(os.path.join(self.directory, f"{name}.png"))
+            except OSError:
+                pass
+
+    def _deliver(self, request: _Request, digest: str | None, pixbuf: GdkPixbuf.Pixbuf | None):
+        if digest is not None:
+            self._digests[request.key] = digest
+        if pixbuf is not None:
+            name = f"{digest}-{request.size}"
+            if name not in self._memory:
+                self._memory_bytes += pixbuf.get_rowstride() * pixbuf.get_height()
+            self._memory[name] = pixbuf
+            self._memory.move_to_end(name)
+            while self._memory_bytes > MEMORY_BUDGET_BYTES and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.get_rowstride() * evicted.get_height()
+        for callback in request.callbacks:
+            callback(pixbuf)
+        return False
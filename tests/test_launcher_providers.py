@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("gi")
+pytest.importorskip("fabric")
+
+from modules.launcher_providers import CommandsProvider  # noqa: E402
+from utils.search_providers import CancellationToken  # noqa: E402
+
+
+class FakeNotch:
+    def __init__(self):
+        self.opened = []
+
+    def open_notch(self, widget):
+        self.opened.append(widget)
+
+
+@pytest.mark.parametrize("query, widget", [("p", "power"), ("w", "wallpapers"), ("d", "dashboard")])
+def test_command_key_activates_its_panel(query, widget):
+    notch = FakeNotch()
+    results = list(CommandsProvider(notch).search(query, CancellationToken()))
+    results[0].activate()
+    assert notch.opened == [widget]
+
+
+def test_title_matches_follow_key_matches():
+    results = list(CommandsProvider(FakeNotch()).search("er", CancellationToken()))
+    assert [result.title for result in results] == ["Wallpapers", "Power Menu"]
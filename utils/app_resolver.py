@@ -0,0 +1,165 @@
+import re
+from collections.abc import Iterable
+
+# Length of the substrings indexed by SubstringIndex.
+NGRAM_SIZE = 3
+WINDOW_CLASS_SUFFIXES = (".bin", ".exe", ".so", "-bin", "-gtk")
+# Substring matches are ranked by the field they hit, in this order.
+FIELD_RANKS = {
+    "name": 0,
+    "display_name": 1,
+    "window_class": 2,
+    "executable": 3,
+    "command_line": 4,
+}
+
+
+def normalize_window_class(class_name: str | None) -> str:
+    """Lowercase a window class and strip suffixes such as `.bin` or `-gtk`."""
+    if not class_name:
+        return ""
+    normalized = class_name.lower()
+    for suffix in WINDOW_CLASS_SUFFIXES:
+        if normalized.endswith(suffix):
+            normalized = normalized[:-len(suffix)]
+    return normalized
+
+
+class SubstringIndex:
+    """
+    Answers "which keys contain this string" from an n-gram index.
+
+    Every key is broken into its overlapping NGRAM_SIZE-character grams;
+    a query intersects the posting lists of its own grams, shortest first,
+    and only the surviving candidates are checked with `in`. Queries
+    shorter than one gram fall back to a scan. Results keep the order the
+    keys were given in, so callers get deterministic answers.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = list(dict.fromkeys(keys))
+        self._postings: dict[str, list[int]] = {}
+        for position, key in enumerate(self._keys):
+            for gram in {key[i:i + NGRAM_SIZE] for i in range(len(key) - NGRAM_SIZE + 1)}:
+                self._postings.setdefault(gram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def find_all(self, needle: str) -> list[str]:
+        """All keys containing `needle`, in key order."""
+        if not needle:
+            return []
+        if len(needle) < NGRAM_SIZE:
+            return [key for key in self._keys if needle in key]
+
+        postings = []
+        for i in range(len(needle) - NGRAM_SIZE + 1):
+            posting = self._postings.get(needle[i:i + NGRAM_SIZE])
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return [self._keys[i] for i in sorted(candidates) if needle in self._keys[i]]
+
+    def find_first(self, needle: str) -> str | None:
+        """The first key containing `needle`, or None."""
+        matches = self.find_all(needle)
+        return matches[0] if matches else None
+
+
+class AppResolver:
+    """
+    Maps window classes and other app identifiers to desktop entries.
+
+    Resolution tries, in order: the exact identifier map (name, display
+    name, window class, executable and command basenames), the same map
+    with the normalized window class, and finally a substring match over
+    the lowercased fields of every entry, served by a SubstringIndex. When
+    several entries contain the identifier the best one is picked by a
+    fixed ranking: the field it matched (see FIELD_RANKS), then prefix
+    matches, then the tightest fit, then the entry's position in the index.
+    Results, including misses, are memoized per identifier; the resolver
+    is rebuilt whenever the app index changes.
+    """
+
+    def __init__(self, apps: list, identifiers: dict):
+        self._apps = apps
+        self._identifiers = identifiers
+        # field value -> best (rank, position, app) owning it
+        self._owners: dict[str, tuple[int, int, object]] = {}
+        for position, app in enumerate(apps):
+            for field, rank in FIELD_RANKS.items():
+                value = getattr(app, field, None)
+                if not value:
+                    continue
+                value = value.lower()
+                owner = self._owners.get(value)
+                if owner is None or (rank, position) < owner[:2]:
+                    self._owners[value] = (rank, position, app)
+        self._fields = SubstringIndex(self._owners)
+
+        self._desktop_ids = {}
+        for app in apps:
+            if app.id:
+                self._desktop_ids.setdefault(app.id.lower(), app)
+        self._desktop_id_index = SubstringIndex(self._desktop_ids)
+        self._memo: dict[tuple[str, bool], object] = {}
+
+    def resolve(self, identifier, substring: bool = True):
+        """
+        The desktop entry for `identifier`, or None. With `substring` off,
+        only exact matches (after window class normalization) are accepted.
+        """
+        if not identifier:
+            return None
+        key = (str(identifier).lower(), substring)
+        if key not in self._memo:
+            self._memo[key] = self._resolve(*key)
+        return self._memo[key]
+
+    def _resolve(self, normalized_id: str, substring: bool):
+        app = self._identifiers.get(normalized_id)
+        if app is not None:
+            return app
+        app = self._identifiers.get(normalize_window_class(normalized_id))
+        if app is not None or not substring:
+            return app
+        return self._best_substring_match(normalized_id)
+
+    def _best_substring_match(self, needle: str):
+        best = None
+        for value in self._fields.find_all(needle):
+            rank, position, app = self._owners[value]
+            score = (rank, not value.startswith(needle), len(value) - len(needle), position)
+            if best is None or score < best[0]:
+                best = (score, app)
+        return best[1] if best else None
+
+    def resolve_desktop_id(self, app_id: str):
+        """
+        Guess the desktop entry from its file id: first the whole app id
+        (whitespace removed), then each of its `-`, `.`, `_` separated words.
+        """
+        if not app_id:
+            return None
+        key = ("desktop-id:" + app_id, False)
+        if key in self._memo:
+            return self._memo[key]
+
+        app = None
+        needles = ["".join(app_id.lower().split())]
+        needles += [word.lower() for word in re.split(r"-|\.|_|\s", app_id) if word]
+        for needle in needles:
+            desktop_id = self._desktop_id_index.find_first(needle)
+            if desktop_id is not None:
+                app = self._desktop_ids[desktop_id]
+                break
+        self._memo[key] = app
+        return app
@@ -0,0 +1,471 @@
+import re
+import string
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+# Characters that separate words; a match right after one starts a word.
+WORD_SEPARATORS = " -_./"
+_TO_SPACES = str.maketrans(WORD_SEPARATORS, " " * len(WORD_SEPARATORS))
+# Recent queries whose ranked results are kept, for backspacing and retyping.
+RESULT_CACHE_SIZE = 64
+# Above this many candidates, prefilter by searching all entries' fields at once.
+BULK_THRESHOLD = 256
+# One-character queries ranked ahead of time by warm_step().
+WARM_CHARS = string.ascii_lowercase + string.digits
+# Two-letter queries scored ahead of time by warm_step(), after the above.
+WARM_PAIRS = [first + second for first in string.ascii_lowercase for second in string.ascii_lowercase]
+
+# Scores per kind of match; the best one wins.
+SCORE_EXACT = 1000
+SCORE_PREFIX = 800
+SCORE_WORD_START = 600
+SCORE_ACRONYM = 500
+SCORE_SUBSTRING = 400
+SCORE_SECONDARY_WORD_START = 300
+SCORE_SECONDARY = 200
+SCORE_COMMAND_LINE = 100
+SCORE_FUZZY = 50
+# Most points launch history can add; about one kind of match's worth.
+SCORE_FRECENCY = 250
+# Frecency at which an app gets half of SCORE_FRECENCY.
+FRECENCY_HALF_POINT = 3.0
+
+
+def command_name(command_line: str | None) -> str:
+    """Base command name from a command line, without path and arguments."""
+    if not command_line:
+        return ""
+    # Wrapped commands like "/bin/sh -c "\$SHELL -i -c scrcpy"" say nothing useful.
+    if command_line.startswith("/bin/sh -c"):
+        return ""
+    parts = command_line.split()
+    return parts[0].split("/")[-1] if parts else ""
+
+
+def _char_mask(text: str) -> int:
+    mask = 0
+    for char in text:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _initials(bounded: str) -> str:
+    return "".join(word[0] for word in bounded.split())
+
+
+def _fuzzy_pattern(query: str) -> str:
+    # Non-separator characters of the query, in order, within one line.
+    chars = [re.escape(c) for c in query if c not in WORD_SEPARATORS]
+    return "[^\n]*?".join(chars)
+
+
+def _find_lines(text: str, needle: str) -> list[int]:
+    """Offsets of the first occurrence of `needle` on each line that has one."""
+    offsets = []
+    find = text.find
+    position = find(needle)
+    while position != -1:
+        offsets.append(position)
+        line_end = find("\n", position)
+        if line_end == -1:
+            break
+        position = find(needle, line_end)
+    return offsets
+
+
+class _Entry:
+    __slots__ = (
+        "app", "primary", "primary_bounded", "acronym", "secondary",
+        "secondary_bounded", "secondary_initials", "command_line", "mask",
+        "primary_mask", "rank", "boost",
+    )
+
+    def __init__(self, app):
+        display_name = (app.display_name or "").casefold()
+        name = (app.name or "").casefold()
+        generic_name = (getattr(app, "generic_name", None) or "").casefold()
+        executable = (app.executable or "").split("/")[-1].casefold()
+
+        self.app = app
+        self.primary = (display_name or name).replace("\n", " ")
+        # Leading space plus separators as spaces: " " + q in it means q starts a word.
+        self.primary_bounded = " " + self.primary.translate(_TO_SPACES)
+        self.acronym = _initials(self.primary_bounded)
+        self.secondary = " ".join(
+            filter(None, (name, generic_name, command_name(app.command_line).casefold(), executable))
+        ).replace("\n", " ")
+        self.secondary_bounded = " " + self.secondary.translate(_TO_SPACES)
+        self.secondary_initials = _initials(self.secondary_bounded)
+        self.command_line = (app.command_line or "").casefold().replace("\n", " ")
+        self.primary_mask = _char_mask(self.primary)
+        self.mask = self.primary_mask | _char_mask(self.secondary + self.command_line)
+        # Position in alphabetical order and frecency points, set by the engine.
+        self.rank = 0
+        self.boost = 0
+
+    def single_char_tier(self, char: str) -> int | None:
+        """
+        Position of _score's result for the one-character query `char` in
+        SINGLE_CHAR_TIERS, using cheaper membership tests.
+        """
+        if self.primary.startswith(char):
+            return 0 if len(self.primary) == 1 else 1
+        if char in self.acronym:
+            return 2
+        if char in self.primary:
+            return 3
+        if char in self.secondary_initials:
+            return 4
+        if char in self.secondary:
+            return 5
+        if char in self.command_line:
+            return 6
+        return None
+
+
+# Scores a one-character query can get; acronym and fuzzy matches coincide
+# with the prefix and substring ones.
+SINGLE_CHAR_TIERS = (
+    SCORE_EXACT,
+    SCORE_PREFIX,
+    SCORE_WORD_START,
+    SCORE_SUBSTRING,
+    SCORE_SECONDARY_WORD_START,
+    SCORE_SECONDARY,
+    SCORE_COMMAND_LINE,
+)
+
+
+def _score(entry: _Entry, query: str, bounded_query: str, query_mask: int, fuzzy) -> int | None:
+    primary = entry.primary
+    if primary.startswith(query):
+        return SCORE_EXACT if len(primary) == len(query) else SCORE_PREFIX
+    if bounded_query in entry.primary_bounded:
+        return SCORE_WORD_START
+    if entry.acronym.startswith(query):
+        return SCORE_ACRONYM
+    if query in primary:
+        return SCORE_SUBSTRING
+    if bounded_query in entry.secondary_bounded:
+        return SCORE_SECONDARY_WORD_START
+    if query in entry.secondary:
+        return SCORE_SECONDARY
+    if query in entry.command_line:
+        return SCORE_COMMAND_LINE
+
+    if entry.primary_mask & query_mask != query_mask:
+        return None
+    match = fuzzy.search(primary)
+    if match is None:
+        return None
+    # Tighter subsequences rank higher.
+    return SCORE_FUZZY - (match.end() - match.start() - len(query))
+
+
+class AppSearchEngine:
+    """
+    Ranked fuzzy search over the launcher's applications.
+
+    Casefolded display name, name, generic name, command and executable
+    names, the display name's acronym and a character mask are computed
+    once per app list. A query is scored by its best kind of match: exact,
+    prefix, word start, acronym, substring, word start or substring in a
+    secondary field, substring of the command line, and finally a fuzzy
+    subsequence of the display name. Results are ranked by score plus up
+    to SCORE_FRECENCY points from launch history, then alphabetically; an
+    empty query lists recently used apps first.
+
+    Every kind of match survives removing characters from the end of the
+    query, so when the user extends the previous query only its matches
+    are rescored. Broad queries, which would leave too many candidates for
+    that, are prefiltered by searching all entries' fields joined into one
+    string. One- and two-character queries are answered from tables built
+    on first use or ahead of time by warm_step(); two-character ones keep
+    their scores without launch history, so only sorting is left, and the
+    tables outlive history changes. Ranked results of recent queries are
+    cached until the launch history changes.
+    """
+
+    def __init__(self, apps: list, frecency: dict[str, float] | None = None):
+        self.apps = apps
+        self._entries = sorted((_Entry(app) for app in apps), key=lambda e: e.primary)
+        for rank, entry in enumerate(self._entries):
+            entry.rank = rank
+
+        self._primary_text, self._primary_starts = self._join(e.primary for e in self._entries)
+        self._secondary_text, self._secondary_starts = self._join(
+            f"{e.secondary_bounded} {e.command_line}" for e in self._entries
+        )
+        # Two-character query -> ranks and scores (without boosts) of its matches.
+        self._pairs: dict[str, tuple[array, array]] = {}
+        self._warm_pairs = list(reversed(WARM_PAIRS))
+        self.set_frecency(frecency or {})
+
+    def set_frecency(self, frecency: dict[str, float]) -> None:
+        """
+        Blends launch history (desktop entry id -> frecency) into ranking.
+        Drops all ranked results, so warm_step() has work to do again.
+        """
+        self._boosted = False
+        for entry in self._entries:
+            score = frecency.get(getattr(entry.app, "id", None), 0.0)
+            entry.boost = round(SCORE_FRECENCY * score / (score + FRECENCY_HALF_POINT))
+            self._boosted = self._boosted or entry.boost > 0
+        self._default_order = [
+            entry.app for entry in sorted(self._entries, key=lambda e: (-e.boost, e.rank))
+        ]
+
+        self._single_char: dict[str, list[_Entry]] = {}
+        self._warm_pending = list(WARM_CHARS)
+        self._last_query = ""
+        self._last_matches = self._entries
+        self._results: OrderedDict[str, list] = OrderedDict()
+
+    @staticmethod
+    def _join(lines) -> tuple[str, list[int]]:
+        """One line per entry, in rank order, and the offset each line starts at."""
+        starts = []
+        position = 0
+        parts = []
+        for line in lines:
+            starts.append(position)
+            parts.append(line)
+            position += len(line) + 1
+        return "\n".join(parts), starts
+
+    def warm_step(self) -> bool:
+        """
+        Ranks one common one-character query, or scores a two-letter one,
+        ahead of time. Meant to be driven from an idle callback; returns
+        True while any remain.
+        """
+        while self._warm_pending:
+            char = self._warm_pending.pop()
+            if char not in self._single_char:
+                self._single_char[char] = self._rank_single_char(char)
+                return True
+        while self._warm_pairs:
+            pair = self._warm_pairs.pop()
+            if pair not in self._pairs:
+                self._pairs[pair] = self._score_pair(pair)
+                return bool(self._warm_pairs)
+        return False
+
+    def _rank_single_char(self, char: str) -> list[_Entry]:
+        bit = 1 << (ord(char) & 63)
+        tiers = [[] for _ in SINGLE_CHAR_TIERS]
+        for entry in self._entries:
+            if not entry.mask & bit:
+                continue
+            tier = entry.single_char_tier(char)
+            if tier is not None:
+                tiers[tier].append(entry)
+        if not self._boosted:
+            return [entry for tier in tiers for entry in tier]
+        keyed = [
+            (-(SINGLE_CHAR_TIERS[tier] + entry.boost), entry.rank, entry)
+            for tier, entries in enumerate(tiers)
+            for entry in entries
+        ]
+        keyed.sort(key=lambda key: key[:2])
+        return [key[2] for key in keyed]
+
+    def search(self, query: str) -> list:
+        """
+        Apps matching `query`, best first. An empty query lists all apps,
+        most used first and then alphabetically.
+        """
+        query = query.casefold().strip()
+        if not query:
+            return self._default_order
+
+        cached = self._results.get(query)
+        if cached is not None:
+            self._results.move_to_end(query)
+            return cached
+
+        if len(query) == 1 and query not in WORD_SEPARATORS:
+            matches = self._single_char.get(query)
+            if matches is None:
+                matches = self._single_char[query] = self._rank_single_char(query)
+            results = [entry.app for entry in matches]
+        elif len(query) == 2:
+            table = self._pairs.get(query)
+            if table is None:
+                table = self._pairs[query] = self._score_pair(query)
+            ranks, scores = table
+            matches, results = self._order([self._entries[rank] for rank in ranks], scores)
+        else:
+            matches, results = self._rank(query)
+
+        self._last_query = query
+        self._last_matches = matches
+        self._results[query] = results
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return results
+
+    def _rank(self, query: str) -> tuple[list[_Entry], list]:
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = self._entries
+        return self._order(*self._score_all(query, candidates))
+
+    def _score_pair(self, query: str) -> tuple[array, array]:
+        matches, scores = self._score_all(query, self._entries)
+        return array("I", [entry.rank for entry in matches]), array("i", scores)
+
+    @staticmethod
+    def _order(matches: list[_Entry], scores) -> tuple[list[_Entry], list]:
+        """`matches` and their apps, best first once boosted by launch history."""
+        keys = [(-(score + entry.boost), entry.rank, i) for i, (entry, score) in enumerate(zip(matches, scores))]
+        keys.sort()
+        return matches, [matches[key[2]].app for key in keys]
+
+    def _score_all(self, query: str, candidates: list[_Entry]) -> tuple[list[_Entry], list[int]]:
+        """The candidates matching `query`, and their scores without boosts."""
+        spans = literal = None
+        if len(candidates) > BULK_THRESHOLD:
+            candidates, spans, literal = self._prefilter(query)
+
+        bounded_query = " " + query.translate(_TO_SPACES)
+        query_mask = _char_mask(query)
+        fuzzy = re.compile(".*?".join(map(re.escape, query)))
+        matches = []
+        scores = []
+        for entry in candidates:
+            if spans is not None and entry.rank not in literal:
+                # The query is only a subsequence of the display name, and
+                # the prefilter's search found where, as _score's would.
+                if entry.acronym.startswith(query):
+                    score = SCORE_ACRONYM
+                else:
+                    score = SCORE_FUZZY - (spans[entry.rank] - len(query))
+            else:
+                if entry.mask & query_mask != query_mask:
+                    continue
+                score = _score(entry, query, bounded_query, query_mask, fuzzy)
+                if score is None:
+                    continue
+            scores.append(score)
+            matches.append(entry)
+        return matches, scores
+
+    def _prefilter(self, query: str) -> tuple[list[_Entry], dict[int, int] | None, set[int] | None]:
+        """
+        A superset of the entries _score accepts: every match on the
+        display name keeps the query's characters in order, and every
+        other match contains the query (or its word-bounded form) verbatim.
+
+        For queries without separators, also the length of the first
+        subsequence match in each display name, by rank, and the ranks of
+        entries containing the query verbatim somewhere; the others can
+        only be acronym or fuzzy matches. Both are None otherwise.
+        """
+        pattern = _fuzzy_pattern(query)
+        if not pattern:
+            # Only separators; word-start matches then have no characters to anchor on.
+            return self._entries, None, None
+
+        spans = {}
+        starts = self._primary_starts
+        for match in re.finditer(pattern, self._primary_text):
+            rank = bisect_right(starts, match.start()) - 1
+            if rank not in spans:
+                spans[rank] = match.end() - match.start()
+        literal = set()
+        for offset in _find_lines(self._primary_text, query):
+            literal.add(bisect_right(starts, offset) - 1)
+        starts = self._secondary_starts
+        for text in {query, query.translate(_TO_SPACES)}:
+            for offset in _find_lines(self._secondary_text, text):
+                literal.add(bisect_right(starts, offset) - 1)
+
+        entries = [self._entries[rank] for rank in sorted(spans.keys() | literal)]
+        if any(char in WORD_SEPARATORS for char in query):
+            # The subsequence searched for then skipped some of the query.
+            return entries, None, None
+        return entries, spans, literal
+
+
+def benchmark(app_count: int = 2000, rounds: int = 20) -> None:
+    """
+    Types a few queries character by character against synthetic desktop
+    entries and prints per-keystroke timings, with the worst keystroke
+    taken at its best round as well, which leaves out scheduling noise;
+    once as the launcher sees them after warm_step() has run, and once
+    right after the index is built, before any warm-up.
+    Run with `python -m utils.app_search [app_count]`.
+    """
+    import random
+    import string
+    from types import SimpleNamespace
+
+    rng = random.Random(0)
+
+    def word(length):
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+    apps = []
+    for _ in range(app_count):
+        display_name = " ".join(word(rng.randint(3, 9)).title() for _ in range(rng.randint(1, 3)))
+        binary = word(rng.randint(4, 10))
+        apps.append(SimpleNamespace(
+            id=f"{binary}.desktop",
+            name=display_name,
+            display_name=display_name,
+            generic_name=f"{word(6).title()} {word(7)}",
+            executable=f"/usr/bin/{binary}",
+            command_line=f"/usr/bin/{binary} --{word(4)} %U",
+        ))
+
+    queries = [apps[rng.randrange(app_count)].display_name.split()[0][:6] for _ in range(5)]
+    queries += ["fire", "term", "code", "ffx", "set"]
+    # A heavy user's history: a few dozen apps, some used a lot.
+    frecency = {rng.choice(apps).id: rng.expovariate(0.2) for _ in range(40)}
+
+    def type_queries(engine, timings, best):
+        for query in queries:
+            engine.search("")
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                engine.search(query[:end])
+                elapsed = time.perf_counter() - start
+                timings.append(elapsed)
+                best[query[:end]] = min(elapsed, best.get(query[:end], elapsed))
+
+    def summary(timings, best):
+        timings.sort()
+        average = sum(timings) / len(timings)
+        return (
+            f"{len(timings)} keystrokes: "
+            f"mean {average * 1000:.3f} ms, "
+            f"median {timings[len(timings) // 2] * 1000:.3f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95)] * 1000:.3f} ms, "
+            f"max {timings[-1] * 1000:.3f} ms, "
+            f"worst keystroke at its best {max(best.values()) * 1000:.3f} ms"
+        )
+
+    build_timings = []
+    timings, best = [], {}
+    cold_timings, cold_best = [], {}
+    for _ in range(rounds):
+        type_queries(AppSearchEngine(apps, frecency), cold_timings, cold_best)
+        start = time.perf_counter()
+        engine = AppSearchEngine(apps, frecency)
+        while engine.warm_step():
+            pass
+        build_timings.append(time.perf_counter() - start)
+        type_queries(engine, timings, best)
+
+    print(f"{app_count} apps, index build and warm-up {min(build_timings) * 1000:.1f} ms")
+    print(f"warmed up, {summary(timings, best)}")
+    print(f"before warm-up, {summary(cold_timings, cold_best)}")
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
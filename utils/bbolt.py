@@ -0,0 +1,261 @@
+import fcntl
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+
+# On-disk format of bbolt (go.etcd.io/bbolt), version 2.
+MAGIC = 0xED0CDAED
+VERSION = 2
+
+PAGE_HEADER = struct.Struct("<QHHI")  # id, flags, count, overflow
+BRANCH_ELEMENT = struct.Struct("<IIQ")  # pos, ksize, pgid
+LEAF_ELEMENT = struct.Struct("<IIII")  # flags, pos, ksize, vsize
+BUCKET_HEADER = struct.Struct("<QQ")  # root pgid (0 if inline), sequence
+# magic, version, page size, flags, root bucket (root, sequence),
+# freelist, high water mark, txid; then an FNV-1a checksum of all that.
+META = struct.Struct("<IIIIQQQQQ")
+CHECKSUM = struct.Struct("<Q")
+
+BRANCH_PAGE = 0x01
+LEAF_PAGE = 0x02
+META_PAGE = 0x04
+BUCKET_LEAF = 0x01
+
+# bbolt writers hold an exclusive flock for as long as the database is
+# open; readers wait this long for it, as bbolt's own do.
+LOCK_TIMEOUT_SECONDS = 1.0
+LOCK_POLL_SECONDS = 0.01
+
+
+class BoltFormatError(ValueError):
+    """The file is not a bbolt database this reader understands."""
+
+
+def _fnv1a64(data) -> int:
+    value = 0xCBF29CE484222325
+    for byte in bytes(data):
+        value = ((value ^ byte) * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return value
+
+
+class Bucket:
+    """
+    A bucket of a BoltSnapshot. Values are memoryviews into the mapped
+    file, valid until the snapshot is closed.
+    """
+
+    def __init__(self, snapshot: "BoltSnapshot", root: int, sequence: int):
+        self._snapshot = snapshot
+        # Offset of the root page in the file.
+        self._root = root
+        self.sequence = sequence
+
+    def get(self, key: bytes) -> memoryview | None:
+        """The value stored under `key`, if any (nested buckets excluded)."""
+        found = self._snapshot._find(self._root, key)
+        if found is None or found[0] & BUCKET_LEAF:
+            return None
+        return found[2]
+
+    def bucket(self, name: bytes) -> "Bucket | None":
+        """The nested bucket `name`, if any."""
+        found = self._snapshot._find(self._root, name)
+        if found is None or not found[0] & BUCKET_LEAF:
+            return None
+        return self._snapshot._bucket(found[1])
+
+    def items(self, reverse: bool = False, start: bytes | None = None) -> Iterator[tuple[bytes, memoryview]]:
+        """
+        Key, value pairs in key order, or backwards with `reverse`; from
+        `start` on (up to and including it, backwards) if given. Nested
+        buckets are skipped.
+        """
+        for flags, key, value in self._snapshot._walk(self._root, reverse, start):
+            if not flags & BUCKET_LEAF:
+                yield key, value
+
+    def key_count(self) -> int:
+        """
+        The number of keys, nested buckets included. Only page headers are
+        read, so it is far cheaper than going through items().
+        """
+        return self._snapshot._count(self._root)
+
+
+class BoltSnapshot:
+    """
+    A consistent, read-only view of a bbolt database: the file mapped as
+    it was when the snapshot was taken, under a shared lock so no writer
+    can reuse its pages meanwhile. Keep snapshots short, as writers wait
+    for them; close (or leave the `with` block) when done.
+    """
+
+    def __init__(self, path: str, lock_timeout: float = LOCK_TIMEOUT_SECONDS):
+        self._fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self._map = None
+        try:
+            self._lock(lock_timeout)
+            size = os.fstat(self._fd).st_size
+            if size == 0:
+                raise BoltFormatError("empty file")
+            self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+            self._read_meta()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "BoltSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._view.release()
+                self._map.close()
+            except BufferError:
+                # Values are still referenced; the mapping goes with them.
+                pass
+            self._map = None
+        if self._fd >= 0:
+            os.close(self._fd)  # Releases the lock as well.
+            self._fd = -1
+
+    def _lock(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("database is locked by a writer")
+                time.sleep(LOCK_POLL_SECONDS)
+
+    def _read_meta(self):
+        best = None
+        page_size = None
+        for page in range(2):
+            offset = page * page_size if page_size else 0
+            try:
+                meta = self._meta_at(offset)
+            except (BoltFormatError, struct.error):
+                if page_size is None:
+                    page_size = mmap.PAGESIZE
+                continue
+            if page_size is None:
+                page_size = meta[2]
+            if best is None or meta[8] > best[8]:
+                best = meta
+        if best is None:
+            raise BoltFormatError("no valid meta page")
+        self.page_size = best[2]
+        self.txid = best[8]
+        self.root = Bucket(self, best[4] * self.page_size, best[5])
+
+    def _meta_at(self, offset: int) -> tuple:
+        _, flags, _, _ = PAGE_HEADER.unpack_from(self._map, offset)
+        start = offset + PAGE_HEADER.size
+        meta = META.unpack_from(self._map, start)
+        (checksum,) = CHECKSUM.unpack_from(self._map, start + META.size)
+        if not flags & META_PAGE or meta[0] != MAGIC or meta[1] != VERSION:
+            raise BoltFormatError("not a bbolt meta page")
+        if _fnv1a64(self._view[start:start + META.size]) != checksum:
+            raise BoltFormatError("meta page checksum mismatch")
+        return meta
+
+    def bucket(self, name: bytes) -> Bucket | None:
+        """The top-level bucket `name`, if any."""
+        return self.root.bucket(name)
+
+    def _bucket(self, value_offset: int) -> Bucket:
+        # A bucket's value is its header, then its root page if inline.
+        root, sequence = BUCKET_HEADER.unpack_from(self._map, value_offset)
+        if root == 0:
+            return Bucket(self, value_offset + BUCKET_HEADER.size, sequence)
+        return Bucket(self, root * self.page_size, sequence)
+
+    def _page(self, offset: int) -> tuple[int, int]:
+        try:
+            _, flags, count, _ = PAGE_HEADER.unpack_from(self._map, offset)
+        except struct.error:
+            raise BoltFormatError(f"page at {offset} is out of the file") from None
+        if not flags & (BRANCH_PAGE | LEAF_PAGE):
+            raise BoltFormatError(f"page at {offset} is not a tree page")
+        return flags, count
+
+    def _branch(self, offset: int, count: int) -> tuple[list[bytes], list[int]]:
+        keys, children = [], []
+        for i in range(count):
+            element = offset + PAGE_HEADER.size + i * BRANCH_ELEMENT.size
+            pos, key_size, child = BRANCH_ELEMENT.unpack_from(self._map, element)
+            keys.append(self._map[element + pos:element + pos + key_size])
+            children.append(child * self.page_size)
+        return keys, children
+
+    def _leaf(self, offset: int, i: int) -> tuple[int, bytes, int, memoryview]:
+        element = offset + PAGE_HEADER.size + i * LEAF_ELEMENT.size
+        flags, pos, key_size, value_size = LEAF_ELEMENT.unpack_from(self._map, element)
+        key_start = element + pos
+        value_start = key_start + key_size
+        if value_start + value_size > len(self._map):
+            raise BoltFormatError("element runs past the end of the file")
+        key = self._map[key_start:value_start]
+        return flags, key, value_start, self._view[value_start:value_start + value_size]
+
+    def _leaf_keys(self, offset: int, count: int) -> list[bytes]:
+        keys = []
+        for i in range(count):
+            element = offset + PAGE_HEADER.size + i * LEAF_ELEMENT.size
+            _, pos, key_size, _ = LEAF_ELEMENT.unpack_from(self._map, element)
+            keys.append(self._map[element + pos:element + pos + key_size])
+        return keys
+
+    def _find(self, offset: int, key: bytes) -> tuple[int, int, memoryview] | None:
+        """(flags, value offset, value) of `key` in the tree at `offset`."""
+        while True:
+            flags, count = self._page(offset)
+            if flags & LEAF_PAGE:
+                break
+            keys, children = self._branch(offset, count)
+            offset = children[max(bisect_right(keys, key) - 1, 0)]
+        keys = self._leaf_keys(offset, count)
+        i = bisect_right(keys, key) - 1
+        if i < 0 or keys[i] != key:
+            return None
+        element_flags, _, value_start, value = self._leaf(offset, i)
+        return element_flags, value_start, value
+
+    def _count(self, offset: int) -> int:
+        flags, count = self._page(offset)
+        if flags & LEAF_PAGE:
+            return count
+        return sum(self._count(child) for child in self._branch(offset, count)[1])
+
+    def _walk(self, offset: int, reverse: bool, start: bytes | None) -> Iterator[tuple[int, bytes, memoryview]]:
+        flags, count = self._page(offset)
+        if flags & LEAF_PAGE:
+            if start is None:
+                first = count - 1 if reverse else 0
+            elif reverse:
+                first = bisect_right(self._leaf_keys(offset, count), start) - 1
+            else:
+                first = bisect_left(self._leaf_keys(offset, count), start)
+            indices = range(first, -1, -1) if reverse else range(first, count)
+            for i in indices:
+                element_flags, key, _, value = self._leaf(offset, i)
+                yield element_flags, key, value
+            return
+
+        keys, children = self._branch(offset, count)
+        first = max(bisect_right(keys, start) - 1, 0) if start is not None else (count - 1 if reverse else 0)
+        indices = range(first, -1, -1) if reverse else range(first, count)
+        for i in indices:
+            # Only the first subtree visited can hold keys on the wrong side of `start`.
+            yield from self._walk(children[i], reverse, start if i == first else None)
@@ -0,0 +1,391 @@
+"""
+Calculator engine for the launcher's `=` mode.
+
+Expressions are parsed with `ast` and only a whitelist of syntax and
+functions is accepted; the tree is compiled once into nested closures and
+memoized. Arithmetic is exact where it can be (integers of any size and
+fractions, so 0.1 + 0.2 is 0.3), falling back to floats for functions
+like sin. Results that would be too large are refused before they are
+computed, since a single `9**9**9` can take minutes and gigabytes.
+
+Run as `python -m utils.calculator` it serves evaluations over stdin and
+stdout, one JSON object per line; the shell keeps such a process around
+(see services/calculator.py) so anything that still runs away can be
+killed. This module only uses the standard library for that reason.
+"""
+
+import ast
+import json
+import math
+import re
+import sys
+from decimal import Context, Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NODES = 500
+MAX_DEPTH = 50
+# Largest integer (or numerator/denominator) a calculation may produce,
+# about 300,000 decimal digits.
+MAX_BITS = 1_000_000
+MAX_FACTORIAL = 20_000
+# Integers longer than this are shown in scientific notation.
+MAX_DISPLAY_DIGITS = 40
+# Integers (or numerators/denominators) longer than this are shown
+# from a logarithm of their leading bits.
+LOGARITHM_BITS = 20_000
+# Significant digits of non-integer results.
+DISPLAY_PRECISION = 15
+# Address space of the worker process.
+WORKER_MEMORY_LIMIT = 512 * 1024 * 1024
+
+LOG2_10 = math.log2(10)
+
+
+class CalcError(Exception):
+    """An expression that cannot be evaluated; the message is shown to the user."""
+
+
+def _bits(value) -> int:
+    if isinstance(value, int):
+        return value.bit_length()
+    if isinstance(value, Fraction):
+        return max(value.numerator.bit_length(), value.denominator.bit_length())
+    return 0
+
+
+def _checked(value):
+    if _bits(value) > MAX_BITS:
+        raise CalcError("Result too large")
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return value.numerator
+    if isinstance(value, complex):
+        raise CalcError("Math domain error")
+    return value
+
+
+def _as_integer(value) -> int | None:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return value.numerator
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return None
+
+
+def _power(base, exponent):
+    integer_exponent = _as_integer(exponent) if not isinstance(exponent, float) else None
+    if integer_exponent is not None and isinstance(base, (int, Fraction)):
+        if base == 0 and integer_exponent < 0:
+            raise CalcError("Division by zero")
+        if abs(base) > 1 and abs(integer_exponent) * (_bits(base) - 1) > MAX_BITS:
+            raise CalcError("Result too large")
+        return Fraction(base) ** integer_exponent
+    return float(base) ** float(exponent)
+
+
+def _factorial(value):
+    n = _as_integer(value)
+    if n is None or n < 0:
+        raise CalcError("Factorial needs a non-negative integer")
+    if n > MAX_FACTORIAL:
+        raise CalcError("Result too large")
+    return math.factorial(n)
+
+
+def _sqrt(value):
+    if isinstance(value, (int, Fraction)) and value >= 0:
+        value = Fraction(value)
+        numerator = math.isqrt(value.numerator)
+        denominator = math.isqrt(value.denominator)
+        if numerator * numerator == value.numerator and denominator * denominator == value.denominator:
+            return Fraction(numerator, denominator)
+    return math.sqrt(value)
+
+
+def _round(value, digits=0):
+    digits = _as_integer(digits)
+    if digits is None:
+        raise CalcError("round() needs a whole number of digits")
+    if isinstance(value, float):
+        return round(value, digits)
+    return round(Fraction(value), digits)
+
+
+def _float_function(function):
+    return lambda *args: function(*(float(arg) for arg in args))
+
+
+def _integer_function(function):
+    def call(*args):
+        integers = [_as_integer(arg) for arg in args]
+        if None in integers:
+            raise CalcError(f"{function.__name__}() needs integers")
+        return function(*integers)
+    return call
+
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "phi": (1 + math.sqrt(5)) / 2,
+    "inf": math.inf,
+}
+
+FUNCTIONS = {
+    "sin": _float_function(math.sin),
+    "cos": _float_function(math.cos),
+    "tan": _float_function(math.tan),
+    "asin": _float_function(math.asin),
+    "acos": _float_function(math.acos),
+    "atan": _float_function(math.atan),
+    "sinh": _float_function(math.sinh),
+    "cosh": _float_function(math.cosh),
+    "tanh": _float_function(math.tanh),
+    "log": _float_function(math.log10),
+    "ln": _float_function(math.log),
+    "log2": _float_function(math.log2),
+    "exp": _float_function(math.exp),
+    "degrees": _float_function(math.degrees),
+    "radians": _float_function(math.radians),
+    "sqrt": _sqrt,
+    "abs": abs,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "round": _round,
+    "factorial": _factorial,
+    "gcd": _integer_function(math.gcd),
+    "lcm": _integer_function(math.lcm),
+    "min": min,
+    "max": max,
+}
+
+BINARY_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: Fraction(a) / b if isinstance(a, int) and isinstance(b, int) else a / b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+    ast.Pow: _power,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: lambda a: +a,
+    ast.USub: lambda a: -a,
+}
+
+REPLACEMENTS = (
+    ("^", "**"),
+    ("×", "*"),
+    ("÷", "/"),
+    ("π", "pi"),
+    ("[", "("),
+    ("]", ")"),
+    ("{", "("),
+    ("}", ")"),
+)
+# Decimal literals, rewritten to exact fractions before parsing.
+NUMBER_LITERAL = re.compile(r"(?<![\w.])(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+FACTORIAL = re.compile(r"(\d+)!")
+
+
+def normalize(expression: str) -> str:
+    """The user's notation (`^`, `×`, `5!`, brackets) as Python syntax."""
+    expression = expression.strip()
+    for old, new in REPLACEMENTS:
+        expression = expression.replace(old, new)
+    expression = FACTORIAL.sub(r"factorial(\1)", expression)
+    return NUMBER_LITERAL.sub(_exact_literal, expression)
+
+
+def _exact_literal(match: re.Match) -> str:
+    literal = match.group(0)
+    return literal if literal.isdigit() else f'_decimal("{literal}")'
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str):
+    """
+    A function evaluating the normalized `expression`. Raises CalcError
+    for anything outside the whitelist.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalcError("Expression too long")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        raise CalcError("Invalid expression") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalcError("Expression too long")
+    return _compile(tree.body, 0)
+
+
+def _compile(node, depth: int):
+    if depth > MAX_DEPTH:
+        raise CalcError("Expression too deeply nested")
+    depth += 1
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CalcError("Invalid expression")
+        return lambda: value
+
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise CalcError(f"Unknown name '{node.id}'")
+        value = CONSTANTS[node.id]
+        return lambda: value
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        operator = UNARY_OPERATORS[type(node.op)]
+        operand = _compile(node.operand, depth)
+        return lambda: operator(operand())
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        operator = BINARY_OPERATORS[type(node.op)]
+        left = _compile(node.left, depth)
+        right = _compile(node.right, depth)
+        return lambda: _checked(operator(left(), right()))
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        if name == "_decimal":
+            literal = node.args[0].value if len(node.args) == 1 and isinstance(node.args[0], ast.Constant) else None
+            if not isinstance(literal, str):
+                raise CalcError("Invalid expression")
+            value = _decimal_literal(literal)
+            return lambda: value
+        if name not in FUNCTIONS:
+            raise CalcError(f"Unknown function '{name}'")
+        function = FUNCTIONS[name]
+        args = [_compile(arg, depth) for arg in node.args]
+        return lambda: _checked(function(*(arg() for arg in args)))
+
+    raise CalcError("Invalid expression")
+
+
+def _decimal_literal(literal: str):
+    mantissa, _, exponent = literal.lower().partition("e")
+    if exponent and abs(int(exponent)) * LOG2_10 > MAX_BITS:
+        raise CalcError("Number too large")
+    return _checked(Fraction(literal))
+
+
+def format_result(value) -> str:
+    if isinstance(value, int):
+        return _format_integer(value)
+    if isinstance(value, Fraction):
+        if _bits(value) > LOGARITHM_BITS:
+            return _format_decimal(_approximate(value.numerator, value.denominator))
+        context = Context(prec=DISPLAY_PRECISION)
+        return _format_decimal(context.divide(Decimal(value.numerator), Decimal(value.denominator)))
+    if isinstance(value, float):
+        if math.isnan(value):
+            raise CalcError("Math domain error")
+        if math.isinf(value):
+            return "-∞" if value < 0 else "∞"
+        if value.is_integer() and abs(value) < 10 ** DISPLAY_PRECISION:
+            return str(int(value))
+        return f"{value:.{DISPLAY_PRECISION}g}"
+    raise CalcError("Invalid result")
+
+
+def _format_integer(value: int) -> str:
+    # Estimate first: str() of a huge integer is slow and capped by Python.
+    if value.bit_length() <= MAX_DISPLAY_DIGITS * LOG2_10:
+        digits = str(value)
+        if len(digits.lstrip("-")) <= MAX_DISPLAY_DIGITS:
+            return digits
+    if value.bit_length() > LOGARITHM_BITS:
+        return _format_decimal(_approximate(value, 1))
+    return _format_decimal(Context(prec=DISPLAY_PRECISION).create_decimal(value))
+
+
+def _approximate(numerator: int, denominator: int) -> Decimal:
+    """
+    numerator / denominator to DISPLAY_PRECISION digits, from logarithms of
+    their leading bits: converting huge integers to decimal is quadratic.
+    """
+    context = Context(prec=DISPLAY_PRECISION + 10, Emax=MAX_BITS, Emin=-MAX_BITS)
+    magnitude = context.subtract(_log10(abs(numerator), context), _log10(denominator, context))
+    value = Context(prec=DISPLAY_PRECISION, Emax=MAX_BITS, Emin=-MAX_BITS).plus(
+        context.power(Decimal(10), magnitude)
+    )
+    return -value if numerator < 0 else value
+
+
+def _log10(value: int, context: Context) -> Decimal:
+    shift = max(value.bit_length() - 64, 0)
+    return context.add(
+        context.log10(Decimal(value >> shift)),
+        context.multiply(Decimal(shift), context.log10(Decimal(2))),
+    )
+
+
+def _format_decimal(value: Decimal) -> str:
+    if value.is_zero():
+        return "0"
+    exponent = value.adjusted()
+    if -7 < exponent < DISPLAY_PRECISION:
+        text = format(value, "f")
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return text
+    mantissa, _, exponent_text = format(value, "e").partition("e")
+    if "." in mantissa:
+        mantissa = mantissa.rstrip("0").rstrip(".")
+    return f"{mantissa}e{exponent_text}"
+
+
+def evaluate(expression: str) -> str:
+    """
+    The formatted value of the user's `expression`, e.g. "2^10" -> "1024".
+    Raises CalcError with a short message otherwise.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalcError("Expression too long")
+    normalized = normalize(expression)
+    if not normalized:
+        raise CalcError("Empty expression")
+    function = compile_expression(normalized)
+    try:
+        return format_result(function())
+    except CalcError:
+        raise
+    except ZeroDivisionError:
+        raise CalcError("Division by zero") from None
+    except OverflowError:
+        raise CalcError("Result too large") from None
+    except (ValueError, TypeError, ArithmeticError) as e:
+        raise CalcError(str(e) or "Math error") from None
+
+
+def _serve():
+    """Evaluates requests from stdin until it closes."""
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (WORKER_MEMORY_LIMIT, WORKER_MEMORY_LIMIT))
+    except (ImportError, ValueError, OSError):
+        pass
+    for line in sys.stdin:
+        try:
+            expression = json.loads(line)["expression"]
+            reply = {"result": evaluate(expression)}
+        except CalcError as e:
+            reply = {"error": str(e)}
+        except MemoryError:
+            reply = {"error": "Out of memory"}
+        except Exception as e:
+            reply = {"error": f"Invalid expression ({e.__class__.__name__})"}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,251 @@
+import os
+import struct
+import subprocess
+from collections.abc import Iterator
+from functools import lru_cache
+
+from loguru import logger
+
+from utils.bbolt import BoltFormatError, BoltSnapshot
+from utils.search_providers import CancellationToken
+
+# cliphist keeps its history in a bbolt database, in this bucket, keyed
+# by big-endian 64-bit ids, with the copied bytes as values.
+BUCKET = b"b"
+# Characters of text `cliphist list` shows per entry.
+PREVIEW_WIDTH = 100
+# Entries listed per database snapshot; cliphist cannot store a new
+# entry while one is open, so none is kept for long.
+LIST_BATCH_SIZE = 256
+
+
+@lru_cache(maxsize=1)
+def db_path() -> str:
+    """
+    The cliphist database, found the way cliphist finds it: from
+    $CLIPHIST_DB_PATH, a db-path line in its config file, or its default
+    in the cache directory.
+    """
+    path = os.environ.get("CLIPHIST_DB_PATH")
+    if path:
+        return os.path.expanduser(path)
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    config_path = os.environ.get("CLIPHIST_CONFIG_PATH") or os.path.join(config_home, "cliphist", "config")
+    try:
+        with open(config_path, "r") as f:
+            for line in f:
+                key, _, value = line.strip().partition(" ")
+                if key == "db-path" and value.strip():
+                    return os.path.expanduser(value.strip())
+    except OSError:
+        pass
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "cliphist", "db")
+
+
+def _jpeg_config(data) -> tuple[str, int, int] | None:
+    position = 2
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            position += 2
+            continue
+        if marker in (0xC0, 0xC1, 0xC2):
+            height, width = struct.unpack_from(">HH", data, position + 5)
+            return "jpeg", width, height
+        if marker in (0xD9, 0xDA):
+            return None
+        (length,) = struct.unpack_from(">H", data, position + 2)
+        position += 2 + length
+    return None
+
+
+def _webp_config(data) -> tuple[str, int, int] | None:
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 " and len(data) >= 30 and bytes(data[23:26]) == b"\x9d\x01\x2a":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return "webp", width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        (bits,) = struct.unpack_from("<I", data, 21)
+        return "webp", (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return "webp", width, height
+    return None
+
+
+def _image_config(data) -> tuple[str, int, int] | None:
+    """Format and size of an image in one of the formats cliphist recognizes."""
+    head = bytes(data[:16])
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(data) >= 24 and head[12:16] == b"IHDR":
+        width, height = struct.unpack_from(">II", data, 16)
+        return "png", width, height
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        width, height = struct.unpack_from("<HH", data, 6)
+        return "gif", width, height
+    if head.startswith(b"\xff\xd8"):
+        return _jpeg_config(data)
+    if head.startswith(b"BM") and len(data) >= 26:
+        width, height = struct.unpack_from("<ii", data, 18)
+        return "bmp", width, abs(height)
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return _webp_config(data)
+    return None
+
+
+def _size_text(size: int) -> str:
+    units = ("B", "KiB", "MiB")
+    value = float(size)
+    unit = 0
+    while value >= 1024 and unit < len(units) - 1:
+        value /= 1024
+        unit += 1
+    return f"{value:.0f} {units[unit]}"
+
+
+def preview(data, width: int = PREVIEW_WIDTH) -> str:
+    """The preview `cliphist list` shows for an entry holding `data`."""
+    image = _image_config(data)
+    if image is not None:
+        image_format, image_width, image_height = image
+        return f"[[ binary data {_size_text(len(data))} {image_format} {image_width}x{image_height} ]]"
+    try:
+        text = str(data, "utf-8")
+    except UnicodeDecodeError:
+        return f"[[ binary data {_size_text(len(data))} ]]"
+    text = " ".join(text.split())
+    return text[:width] + "…" if len(text) > width else text
+
+
+def _read_entries(token: CancellationToken | None) -> Iterator[str]:
+    # Batches of entries, newest first, each from its own short snapshot;
+    # a batch starts below the last id of the one before.
+    start = None
+    while True:
+        lines = []
+        with BoltSnapshot(db_path()) as snapshot:
+            bucket = snapshot.bucket(BUCKET)
+            if bucket is None:
+                return
+            for key, value in bucket.items(reverse=True, start=start):
+                if len(key) != 8:
+                    raise BoltFormatError("not a cliphist database")
+                lines.append(f"{int.from_bytes(key, 'big')}\t{preview(value)}")
+                value.release()
+                if len(lines) >= LIST_BATCH_SIZE:
+                    break
+        yield from lines
+        if len(lines) < LIST_BATCH_SIZE or (token is not None and token.stopped):
+            return
+        last_id = entry_id(lines[-1])
+        if last_id == 0:
+            return
+        start = (last_id - 1).to_bytes(8, "big")
+
+
+def _run_list(token: CancellationToken | None) -> Iterator[str]:
+    process = subprocess.Popen(
+        ["cliphist", "list"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for line in process.stdout:
+            if token is not None and token.stopped:
+                return
+            yield line.decode("utf-8", errors="replace").rstrip("\n")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def list_entries(token: CancellationToken | None = None) -> Iterator[str]:
+    """
+    Lines of `cliphist list` ("id<TAB>preview", newest first), as they are
+    read rather than all at once. They come straight from cliphist's
+    database when it is readable, and from the cliphist command (killed
+    once no longer needed) otherwise. Stops once `token` is stopped or the
+    caller stops iterating. Raises OSError if cliphist cannot be run.
+    """
+    last_id = None
+    try:
+        for line in _read_entries(token):
+            if token is not None and token.stopped:
+                return
+            last_id = entry_id(line)
+            yield line
+        return
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"[cliphist] Not reading the database directly: {e}")
+    for line in _run_list(token):
+        line_id = entry_id(line)
+        if last_id is not None and line_id is not None and line_id >= last_id:
+            continue
+        yield line
+
+
+def entry_ids(expected: int) -> set[int] | None:
+    """
+    The ids of every entry in cliphist's database, or None if it holds
+    exactly `expected` entries (counted without reading them) or cannot
+    be read directly.
+    """
+    try:
+        with BoltSnapshot(db_path()) as snapshot:
+            bucket = snapshot.bucket(BUCKET)
+            if bucket is None:
+                return set() if expected else None
+            if bucket.key_count() == expected:
+                return None
+            ids = set()
+            for key, value in bucket.items():
+                if len(key) != 8:
+                    raise BoltFormatError("not a cliphist database")
+                ids.add(int.from_bytes(key, "big"))
+                value.release()
+            return ids
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"[cliphist] Not reading the database directly: {e}")
+    return None
+
+
+def decode(item_id: int | str) -> bytes | None:
+    """
+    The contents of entry `item_id`, as `cliphist decode` gives them, or
+    None if there is no such entry. Read from cliphist's database when
+    possible, without running cliphist. Raises OSError if cliphist cannot
+    be run.
+    """
+    key = int(item_id).to_bytes(8, "big")
+    try:
+        with BoltSnapshot(db_path()) as snapshot:
+            bucket = snapshot.bucket(BUCKET)
+            value = bucket.get(key) if bucket is not None else None
+            if value is None:
+                return None
+            data = bytes(value)
+            value.release()
+            return data
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"[cliphist] Not reading the database directly: {e}")
+    result = subprocess.run(["cliphist", "decode", str(item_id)], capture_output=True)
+    return result.stdout if result.returncode == 0 else None
+
+
+def entry_id(line: str) -> int | None:
+    """The id of a `cliphist list` line, or None if it has none."""
+    item_id, _, _ = line.partition("\t")
+    return int(item_id) if item_id.isdigit() else None
+
+
+def entry_content(line: str) -> str:
+    """The preview part of a `cliphist list` line."""
+    return line.partition("\t")[2] if "\t" in line else line
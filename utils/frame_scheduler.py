@@ -0,0 +1,125 @@
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+from loguru import logger
+
+# Fallback delay when no subscriber widget has a frame clock yet (~one 60 Hz frame).
+FRAME_INTERVAL_MS = 16
+# Backstop in case the widget driving a pending tick gets unrealized.
+TICK_BACKSTOP_MS = 100
+
+
+class Subscription:
+    """
+    A module's registration with the FrameScheduler.
+
+    Connect `mark_dirty` to any number of signals; however many fire in a
+    frame, `callback` runs once on the next frame clock tick.
+    """
+
+    def __init__(self, scheduler: "FrameScheduler", name: str, callback, widget=None):
+        self.name = name
+        self.callback = callback
+        self.widget = widget
+        self.events = 0
+        self.runs = 0
+        self.collapsed = 0
+        self._pending = 0
+        self._scheduler = scheduler
+
+    def mark_dirty(self, *args) -> None:
+        self.events += 1
+        self._pending += 1
+        if self._pending == 1:
+            self._scheduler._enqueue(self)
+
+    def _run(self) -> int:
+        pending, self._pending = self._pending, 0
+        self.runs += 1
+        self.collapsed += pending - 1
+        try:
+            self.callback()
+        except Exception as e:
+            logger.exception(f"[FrameScheduler] Update for '{self.name}' failed: {e}")
+        return pending - 1
+
+
+class FrameScheduler:
+    """
+    Coalesces bursts of compositor events into per-frame module updates.
+
+    Modules subscribe with the callback that rebuilds their view and a
+    widget whose frame clock drives the flush. Every dirty subscription runs
+    exactly once per frame clock tick, no matter how many events marked it
+    dirty; the number of collapsed events is tracked per subscription and
+    logged per flush. Uses a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the FrameScheduler."""
+        if FrameScheduler.instance is None:
+            FrameScheduler.instance = FrameScheduler()
+        return FrameScheduler.instance
+
+    def __init__(self):
+        self._subscriptions: list[Subscription] = []
+        self._dirty: list[Subscription] = []
+        self._tick_widget = None
+        self._tick_id = None
+        self._timeout_id = None
+
+    def subscribe(self, name: str, callback, widget=None) -> Subscription:
+        subscription = Subscription(self, name, callback, widget)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Events received, updates run and events collapsed, per subscription."""
+        return {
+            s.name: {"events": s.events, "runs": s.runs, "collapsed": s.collapsed}
+            for s in self._subscriptions
+        }
+
+    def _enqueue(self, subscription: Subscription) -> None:
+        self._dirty.append(subscription)
+        if self._tick_id is not None or self._timeout_id is not None:
+            return
+        for dirty in self._dirty:
+            widget = dirty.widget
+            if widget is not None and widget.get_realized():
+                self._tick_widget = widget
+                self._tick_id = widget.add_tick_callback(self._on_tick)
+                self._timeout_id = GLib.timeout_add(TICK_BACKSTOP_MS, self._on_timeout)
+                return
+        self._timeout_id = GLib.timeout_add(FRAME_INTERVAL_MS, self._on_timeout)
+
+    def _on_tick(self, widget, frame_clock):
+        self._tick_id = None
+        self._flush()
+        return GLib.SOURCE_REMOVE
+
+    def _on_timeout(self):
+        self._timeout_id = None
+        self._flush()
+        return GLib.SOURCE_REMOVE
+
+    def _flush(self) -> None:
+        if self._tick_id is not None:
+            self._tick_widget.remove_tick_callback(self._tick_id)
+            self._tick_id = None
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        self._tick_widget = None
+
+        # Subscriptions dirtied by these callbacks wait for the next frame.
+        dirty, self._dirty = self._dirty, []
+        collapsed = sum(subscription._run() for subscription in dirty)
+        if collapsed:
+            logger.debug(
+                f"[FrameScheduler] Ran {len(dirty)} update(s), collapsed {collapsed} event(s)"
+            )
@@ -0,0 +1,173 @@
+import mmap
+import struct
+import threading
+from array import array
+
+import cairo
+import gi
+from loguru import logger
+
+from utils.section_file import SectionFile, write_section_file
+
+gi.require_version("Pango", "1.0")
+gi.require_version("PangoCairo", "1.0")
+from gi.repository import GLib, Pango, PangoCairo  # noqa: E402
+
+ATLAS_MAGIC = b"AXATLAS\0"
+ATLAS_VERSION = 1
+# Cells are packed into square pages of this many columns, each a surface
+# of its own, so an atlas only grows with the glyphs actually drawn.
+PAGE_COLUMNS = 16
+PAGE_CELLS = PAGE_COLUMNS * PAGE_COLUMNS
+# A grown atlas is written out once drawing has settled for this long.
+SAVE_DELAY_SECONDS = 5
+
+# magic, version, cell size, glyph count, cells used, glyph set
+# signature, then (offset, length) of each section in SECTIONS.
+SECTIONS = ("style", "slots", "pixels")
+HEADER = struct.Struct("<8sIIIIQQ" + "QQ" * len(SECTIONS))
+
+
+class GlyphAtlas:
+    """
+    Glyphs rasterized once and painted from shared cairo surfaces.
+
+    The atlas holds up to `count` glyphs by id (emoji ids, say). The first
+    time one is drawn, Pango renders its text into the next free cell, and
+    every later draw is a single blit. Cells are `size` pixels square at
+    `scale`, so an atlas serves one size on one kind of display. A grown
+    atlas is saved to `path` and mapped back copy-on-write on the next
+    start, so a glyph is rendered once, not once per session. An atlas
+    saved for another glyph set (`signature`), font or color is thrown
+    away.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        count: int,
+        size: int,
+        scale: int,
+        font: Pango.FontDescription,
+        color: tuple[float, float, float, float],
+        signature: tuple[int, int],
+    ):
+        self.path = path
+        self.count = count
+        self.size = size
+        self.scale = scale
+        self.cell_size = size * scale
+        self._font = font
+        self._color = color
+        self._style = f"{font.to_string()} rgba{color}".encode("utf-8")
+        self._signature = signature
+
+        self._page_width = PAGE_COLUMNS * self.cell_size
+        self._stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, self._page_width)
+        self._page_bytes = self._stride * self._page_width
+        # glyph id -> cell + 1, 0 while not rendered yet
+        self._slots = array("I", bytes(4 * count))
+        self._used = 0
+        self._pages: list[cairo.ImageSurface] = []
+        self._file: SectionFile | None = None
+        self._save_id = 0
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            file = SectionFile(self.path, HEADER, SECTIONS, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError, struct.error):
+            return
+        magic, version, cell_size, count, used, *signature = file.fields
+        pages = -(-used // PAGE_CELLS)
+        if (
+            (magic, version, cell_size, count) != (ATLAS_MAGIC, ATLAS_VERSION, self.cell_size, self.count)
+            or tuple(signature) != self._signature
+            or file.view("style") != self._style
+            or file.lengths["slots"] != 4 * count
+            or file.lengths["pixels"] != pages * self._page_bytes
+        ):
+            return
+
+        pixels = file.view("pixels")
+        self._slots = array("I", file.uint32("slots"))
+        self._used = used
+        self._pages = [
+            cairo.ImageSurface.create_for_data(
+                pixels[page * self._page_bytes:(page + 1) * self._page_bytes],
+                cairo.FORMAT_ARGB32,
+                self._page_width,
+                self._page_width,
+                self._stride,
+            )
+            for page in range(pages)
+        ]
+        # The surfaces draw straight from the (private) mapping.
+        self._file = file
+
+    def draw(self, cr: cairo.Context, glyph_id: int, text: str, x: float, y: float):
+        """Paints glyph `glyph_id`, rendered from `text` if new, in the `size` square at (x, y)."""
+        slot = self._slots[glyph_id] - 1
+        if slot < 0:
+            slot = self._render(glyph_id, text)
+        page = self._pages[slot // PAGE_CELLS]
+        left, top = self._cell_origin(slot)
+        cr.save()
+        cr.translate(x, y)
+        cr.scale(1 / self.scale, 1 / self.scale)
+        cr.rectangle(0, 0, self.cell_size, self.cell_size)
+        cr.clip()
+        cr.set_source_surface(page, -left, -top)
+        cr.paint()
+        cr.restore()
+
+    def _cell_origin(self, slot: int) -> tuple[int, int]:
+        cell = slot % PAGE_CELLS
+        return cell % PAGE_COLUMNS * self.cell_size, cell // PAGE_COLUMNS * self.cell_size
+
+    def _render(self, glyph_id: int, text: str) -> int:
+        slot = self._used
+        if slot // PAGE_CELLS == len(self._pages):
+            self._pages.append(cairo.ImageSurface(cairo.FORMAT_ARGB32, self._page_width, self._page_width))
+        page = self._pages[slot // PAGE_CELLS]
+        left, top = self._cell_origin(slot)
+
+        cr = cairo.Context(page)
+        cr.rectangle(left, top, self.cell_size, self.cell_size)
+        cr.clip()
+        cr.set_operator(cairo.OPERATOR_CLEAR)
+        cr.paint()
+        cr.set_operator(cairo.OPERATOR_OVER)
+        cr.translate(left, top)
+        cr.scale(self.scale, self.scale)
+        layout = PangoCairo.create_layout(cr)
+        layout.set_font_description(self._font)
+        layout.set_text(text, -1)
+        _, logical = layout.get_pixel_extents()
+        cr.move_to((self.size - logical.width) / 2 - logical.x, (self.size - logical.height) / 2 - logical.y)
+        cr.set_source_rgba(*self._color)
+        PangoCairo.show_layout(cr, layout)
+        page.flush()
+
+        self._used += 1
+        self._slots[glyph_id] = slot + 1
+        if not self._save_id:
+            self._save_id = GLib.timeout_add_seconds(SAVE_DELAY_SECONDS, self._save)
+        return slot
+
+    def _save(self):
+        self._save_id = 0
+        pixels = b"".join(bytes(page.get_data()) for page in self._pages)
+        fields = (ATLAS_MAGIC, ATLAS_VERSION, self.cell_size, self.count, self._used, *self._signature)
+        sections = [("style", self._style), ("slots", array("I", self._slots)), ("pixels", pixels)]
+        GLib.Thread.new("glyph-atlas-writer", self._write, (fields, sections))
+        return False
+
+    def _write(self, snapshot):
+        fields, sections = snapshot
+        with self._write_lock:
+            try:
+                write_section_file(self.path, HEADER, fields, sections)
+            except OSError as e:
+                logger.warning(f"[GlyphAtlas] Could not save {self.path}: {e}")
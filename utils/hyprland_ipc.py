@@ -0,0 +1,256 @@
+import json
+import os
+
+import gi
+
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+from loguru import logger
+
+BATCH_PREFIX = "[[BATCH]]"
+READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_TIMEOUT_MS = 2000
+
+
+def get_socket_path() -> str:
+    """Path of Hyprland's request socket for the running instance."""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE", "")
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    path = os.path.join(runtime_dir, "hypr", signature, ".socket.sock")
+    if os.path.exists(path):
+        return path
+    # Hyprland releases before 0.40 kept their sockets under /tmp.
+    return os.path.join("/tmp/hypr", signature, ".socket.sock")
+
+
+def split_json_replies(reply: str) -> list:
+    """
+    Splits the reply of a batched JSON query. Hyprland concatenates the
+    individual replies without a separator, so they are decoded one after
+    another.
+    """
+    decoder = json.JSONDecoder()
+    results = []
+    index = 0
+    length = len(reply)
+    while True:
+        while index < length and reply[index].isspace():
+            index += 1
+        if index >= length:
+            return results
+        value, index = decoder.raw_decode(reply, index)
+        results.append(value)
+
+
+def _parse_json(reply: bytes):
+    return json.loads(reply.decode())
+
+
+def _parse_json_batch(reply: bytes):
+    return split_json_replies(reply.decode())
+
+
+class IpcRequest:
+    """
+    Handle for a request sent through HyprlandIPC; a minimal future.
+
+    Callbacks receive the parsed result, or None if the request failed,
+    timed out or was cancelled (`error` then holds the reason).
+    """
+
+    def __init__(self, payload: bytes, parser=None):
+        self.payload = payload
+        self.cancellable = Gio.Cancellable()
+        self.done = False
+        self.result = None
+        self.error: str | None = None
+        self._parser = parser
+        self._callbacks = []
+        self._connection = None
+        self._buffer = bytearray()
+        self._timeout_id = None
+
+    def add_done_callback(self, callback) -> None:
+        if callback is None:
+            return
+        if self.done:
+            callback(self.result)
+        else:
+            self._callbacks.append(callback)
+
+    def cancel(self) -> None:
+        if not self.done:
+            self.cancellable.cancel()
+
+    def _finish(self, reply: bytes | None, error: str | None) -> None:
+        self.done = True
+        self.error = error
+        if error is None and reply is not None:
+            try:
+                self.result = self._parser(reply) if self._parser else reply.decode()
+            except ValueError as e:
+                self.error = f"Malformed reply: {e}"
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self.result)
+            except Exception as e:
+                logger.exception(f"[HyprlandIPC] Reply callback failed: {e}")
+
+
+class HyprlandIPC:
+    """
+    Non-blocking client for Hyprland's request socket, built on Gio.
+
+    Hyprland answers one request per connection, so every request gets its
+    own connection and any number of them can be in flight at once.
+    Identical read-only queries that overlap share a single round-trip, and
+    `query_batch`/`dispatch_batch` fold several commands into one using the
+    `[[BATCH]]` syntax. Results are delivered on the main loop; a request
+    that outlives the timeout is cancelled and completes with None, so a
+    hung compositor never blocks the UI. Uses a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the HyprlandIPC client."""
+        if HyprlandIPC.instance is None:
+            HyprlandIPC.instance = HyprlandIPC()
+        return HyprlandIPC.instance
+
+    def __init__(self, timeout_ms: int = DEFAULT_TIMEOUT_MS):
+        self.timeout_ms = timeout_ms
+        self._client = Gio.SocketClient.new()
+        self._in_flight: dict[bytes, IpcRequest] = {}
+
+    def send(self, command: str, callback=None, parser=None, shareable: bool = False) -> IpcRequest:
+        """
+        Sends a raw command. With `shareable`, a request for the same
+        command that is already in flight is reused instead of sent again.
+        """
+        payload = command.encode()
+        if shareable and payload in self._in_flight:
+            request = self._in_flight[payload]
+            request.add_done_callback(callback)
+            return request
+
+        request = IpcRequest(payload, parser)
+        request.add_done_callback(callback)
+        if shareable:
+            self._in_flight[payload] = request
+
+        request._timeout_id = GLib.timeout_add(self.timeout_ms, self._on_timeout, request)
+        self._client.connect_async(
+            Gio.UnixSocketAddress.new(get_socket_path()),
+            request.cancellable,
+            self._on_connected,
+            request,
+        )
+        return request
+
+    def query(self, command: str, callback=None) -> IpcRequest:
+        """Runs a JSON query such as `clients` or `j/monitors`."""
+        if not command.startswith("j/"):
+            command = f"j/{command}"
+        return self.send(command, callback, parser=_parse_json, shareable=True)
+
+    def query_batch(self, commands: list[str], callback=None) -> IpcRequest:
+        """Runs several JSON queries in one round-trip; the result is a list."""
+        commands = [c if c.startswith("j/") else f"j/{c}" for c in commands]
+        return self.send(
+            BATCH_PREFIX + ";".join(commands),
+            callback,
+            parser=_parse_json_batch,
+            shareable=True,
+        )
+
+    def dispatch(self, dispatcher: str, args: str = "", callback=None) -> IpcRequest:
+        """Runs a dispatcher, e.g. `dispatch("focuswindow", "address:0x...")`."""
+        return self.send(f"dispatch {dispatcher} {args}".rstrip(), callback)
+
+    def dispatch_batch(self, dispatches: list[str], callback=None) -> IpcRequest:
+        """Runs several `"<dispatcher> <args>"` strings in one round-trip."""
+        return self.send(
+            BATCH_PREFIX + ";".join(f"dispatch {d}" for d in dispatches), callback
+        )
+
+    def _on_connected(self, client, result, request: IpcRequest):
+        try:
+            connection = client.connect_finish(result)
+        except GLib.Error as e:
+            self._complete(request, None, e.message)
+            return
+        if request.done:
+            connection.close(None)
+            return
+        request._connection = connection
+        self._write(request, request.payload)
+
+    def _write(self, request: IpcRequest, data: bytes):
+        request._connection.get_output_stream().write_bytes_async(
+            GLib.Bytes.new(data),
+            GLib.PRIORITY_DEFAULT,
+            request.cancellable,
+            self._on_written,
+            (request, data),
+        )
+
+    def _on_written(self, stream, result, args):
+        request, data = args
+        try:
+            written = stream.write_bytes_finish(result)
+        except GLib.Error as e:
+            self._complete(request, None, e.message)
+            return
+        if written < len(data):
+            self._write(request, data[written:])
+        else:
+            self._read(request)
+
+    def _read(self, request: IpcRequest):
+        request._connection.get_input_stream().read_bytes_async(
+            READ_CHUNK_SIZE,
+            GLib.PRIORITY_DEFAULT,
+            request.cancellable,
+            self._on_read,
+            request,
+        )
+
+    def _on_read(self, stream, result, request: IpcRequest):
+        try:
+            chunk = stream.read_bytes_finish(result)
+        except GLib.Error as e:
+            self._complete(request, None, e.message)
+            return
+        if chunk.get_size() == 0:
+            self._complete(request, bytes(request._buffer))
+            return
+        request._buffer += chunk.get_data()
+        self._read(request)
+
+    def _on_timeout(self, request: IpcRequest):
+        request._timeout_id = None
+        self._complete(request, None, f"timed out after {self.timeout_ms} ms")
+        return False
+
+    def _complete(self, request: IpcRequest, reply: bytes | None, error: str | None = None):
+        if request.done:
+            return
+        if request._timeout_id is not None:
+            GLib.source_remove(request._timeout_id)
+            request._timeout_id = None
+        if error is not None:
+            request.cancellable.cancel()
+            logger.warning(f"[HyprlandIPC] '{request.payload.decode()}' failed: {error}")
+        if request._connection is not None:
+            try:
+                request._connection.close(None)
+            except GLib.Error:
+                # A cancelled operation may still be pending on the stream.
+                pass
+            request._connection = None
+        if self._in_flight.get(request.payload) is request:
+            del self._in_flight[request.payload]
+        request._finish(reply, error)
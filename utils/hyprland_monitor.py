@@ -1,4 +1,3 @@
-import json
 from typing import Dict
 
 import gi
@@ -10,6 +9,8 @@ from fabric.hyprland import Hyprland
 gi.require_version("Gdk", "3.0")
 from gi.repository import Gdk
 
+from services.hyprland_state import HyprlandState
+
 
 # IDC,  Gdk.Screen.get_monitor_plug_name is deprecated
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -36,7 +37,7 @@ class HyprlandWithMonitors(Hyprland):
 
     # Add new arguments
     def get_all_monitors(self) -> Dict:
-        monitors = json.loads(self.send_command("j/monitors").reply)
+        monitors = HyprlandState.get_initial().monitors
         return {monitor["id"]: monitor["name"] for monitor in monitors}
 
     def get_gdk_monitor_id_from_name(self, plug_name: str) -> int | None:
@@ -52,5 +53,5 @@ class HyprlandWithMonitors(Hyprland):
         return None
 
     def get_current_gdk_monitor_id(self) -> int | None:
-        active_workspace = json.loads(self.send_command("j/activeworkspace").reply)
-        return self.get_gdk_monitor_id_from_name(active_workspace["monitor"])
+        active_workspace = HyprlandState.get_initial().active_workspace
+        return self.get_gdk_monitor_id_from_name(active_workspace.get("monitor", ""))
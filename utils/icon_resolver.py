@@ -1,21 +1,48 @@
 import json
 import os
-import re
+import threading
+from collections import OrderedDict
 
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import GLib, Gtk
+from gi.repository import GdkPixbuf, GLib, Gtk
 from loguru import logger
 
 import config.data as data
+from services.desktop_apps import DesktopAppIndex
 
 ICON_CACHE_FILE = data.CACHE_DIR + "/icons.json"
 if not os.path.exists(data.CACHE_DIR):
     os.makedirs(data.CACHE_DIR)
 
+# Loaded pixbufs kept around, keyed by (icon name, size, scale).
+PIXBUF_CACHE_SIZE = 256
+# New app id -> icon name mappings are written out together after this delay.
+FLUSH_DELAY_MS = 2000
+
 
 class IconResolver:
+    """
+    Resolves app ids to themed icons, shared by Dock, Notch and Overview.
+
+    Resolved app id -> icon name mappings persist in icons.json. New
+    mappings are batched and written atomically from a worker thread a
+    moment after the last one arrives, so resolving a burst of new windows
+    never blocks the main loop on disk. Loaded pixbufs are kept in an LRU
+    keyed by (icon name, size, scale). Both caches are dropped when the
+    icon theme changes. Uses a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the IconResolver."""
+        if IconResolver.instance is None:
+            IconResolver.instance = IconResolver()
+        return IconResolver.instance
+
     def __init__(self, default_applicaiton_icon: str = "application-x-executable-symbolic"):
         if os.path.exists(ICON_CACHE_FILE):
             with open(ICON_CACHE_FILE) as f:
@@ -28,6 +55,11 @@ class IconResolver:
             self._icon_dict = {}
 
         self.default_applicaiton_icon = default_applicaiton_icon
+        self._pixbufs: OrderedDict[tuple[str, int, int], object] = OrderedDict()
+        self._flush_id = None
+        self._write_lock = threading.Lock()
+
+        Gtk.IconTheme.get_default().connect("changed", self._on_theme_changed)
 
     def get_icon_name(self, app_id: str):
         if app_id in self._icon_dict:
@@ -39,20 +71,42 @@ class IconResolver:
         self._store_new_icon(app_id, new_icon)
         return new_icon
 
-    def get_icon_pixbuf(self, app_id: str, size: int = 16):
+    def get_icon_pixbuf(self, app_id: str, size: int = 16, scale: int = 1):
+        return self.get_named_icon_pixbuf(self.get_icon_name(app_id), size, scale)
+
+    def get_named_icon_pixbuf(self, icon_name: str | None, size: int = 16, scale: int = 1):
+        """An icon by theme name or absolute path, such as a desktop entry's Icon."""
+        icon_name = icon_name or self.default_applicaiton_icon
+        key = (icon_name, size, scale)
+        if key in self._pixbufs:
+            self._pixbufs.move_to_end(key)
+            return self._pixbufs[key]
+
+        pixbuf = self._load_pixbuf(icon_name, size, scale)
+        self._pixbufs[key] = pixbuf
+        if len(self._pixbufs) > PIXBUF_CACHE_SIZE:
+            self._pixbufs.popitem(last=False)
+        return pixbuf
+
+    def _load_pixbuf(self, icon_name: str, size: int, scale: int):
         icon_theme = Gtk.IconTheme.get_default()
-        icon_name = self.get_icon_name(app_id)
         try:
+            if os.path.isabs(icon_name):
+                return GdkPixbuf.Pixbuf.new_from_file_at_size(
+                    icon_name, size * scale, size * scale
+                )
             # Try to load the resolved icon.
-            return icon_theme.load_icon(icon_name, size, Gtk.IconLookupFlags.FORCE_SIZE)
+            return icon_theme.load_icon_for_scale(
+                icon_name, size, scale, Gtk.IconLookupFlags.FORCE_SIZE
+            )
         except GLib.Error as primary_error:
             logger.warning(
                 f"Warning: Icon '{icon_name}' not found in theme. Error: {primary_error}"
             )
             try:
                 # Fallback to the default application icon.
-                return icon_theme.load_icon(
-                    self.default_applicaiton_icon, size, Gtk.IconLookupFlags.FORCE_SIZE
+                return icon_theme.load_icon_for_scale(
+                    self.default_applicaiton_icon, size, scale, Gtk.IconLookupFlags.FORCE_SIZE
                 )
             except GLib.Error as fallback_error:
                 logger.error(
@@ -60,33 +114,42 @@ class IconResolver:
                 )
                 return None
 
+    def _on_theme_changed(self, *args):
+        # Which names exist, and what they look like, depend on the theme.
+        self._pixbufs.clear()
+        if self._icon_dict:
+            self._icon_dict = {}
+            self._schedule_flush()
+
     def _store_new_icon(self, app_id: str, icon: str):
         self._icon_dict[app_id] = icon
-        with open(ICON_CACHE_FILE, "w") as f:
-            json.dump(self._icon_dict, f)
-
-    def _get_icon_from_desktop_file(self, desktop_file_path: str):
-        # Retrieve the icon specified in the [Desktop Entry] section.
-        with open(desktop_file_path) as f:
-            for line in f.readlines():
-                if "Icon=" in line:
-                    return "".join(line[5:].split())
-            return self.default_applicaiton_icon
-
-    def _get_desktop_file(self, app_id: str) -> str | None:
-        data_dirs = GLib.get_system_data_dirs()
-        for data_dir in data_dirs:
-            data_dir = os.path.join(data_dir, "applications")
-            if os.path.exists(data_dir):
-                files = os.listdir(data_dir)
-                matching = [s for s in files if "".join(app_id.lower().split()) in s.lower()]
-                if matching:
-                    return os.path.join(data_dir, matching[0])
-                for word in list(filter(None, re.split(r"-|\.|_|\s", app_id))):
-                    matching = [s for s in files if word.lower() in s.lower()]
-                    if matching:
-                        return os.path.join(data_dir, matching[0])
-        return None
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_id is not None:
+            GLib.source_remove(self._flush_id)
+        self._flush_id = GLib.timeout_add(FLUSH_DELAY_MS, self._flush)
+
+    def _flush(self):
+        self._flush_id = None
+        snapshot = dict(self._icon_dict)
+        GLib.Thread.new("icon-cache-writer", self._write_icon_cache, snapshot)
+        return False
+
+    def _write_icon_cache(self, snapshot: dict):
+        tmp_path = f"{ICON_CACHE_FILE}.tmp"
+        # Writers may overlap if flushes come faster than the disk.
+        with self._write_lock:
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, ICON_CACHE_FILE)
+            except OSError as e:
+                logger.warning(f"[ICONS] Could not write icon cache: {e}")
+
+    def _get_desktop_app(self, app_id: str):
+        # Match the app id against desktop file ids through the shared index.
+        return DesktopAppIndex.get_initial().resolver.resolve_desktop_id(app_id)
 
     def _compositor_find_icon(self, app_id: str):
         icon_theme = Gtk.IconTheme.get_default()
@@ -94,9 +157,7 @@ class IconResolver:
             return app_id
         if icon_theme.has_icon(app_id + "-desktop"):
             return app_id + "-desktop"
-        desktop_file = self._get_desktop_file(app_id)
-        return (
-            self._get_icon_from_desktop_file(desktop_file)
-            if desktop_file
-            else self.default_applicaiton_icon
-        )
+        desktop_app = self._get_desktop_app(app_id)
+        if desktop_app and desktop_app.icon_name:
+            return desktop_app.icon_name
+        return self.default_applicaiton_icon
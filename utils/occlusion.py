@@ -1,61 +1,171 @@
-import subprocess
-import json
-
 import config.data as data
+from services.hyprland_state import HyprlandState
 
-def get_current_workspace():
+SIDES = ("top", "bottom", "left", "right")
+
+
+class OcclusionIndex:
     """
-    Get the current workspace ID using hyprctl.
+    Window rectangles bucketed by workspace, kept in sync with HyprlandState.
+
+    Every clients-changed signal is diffed against the previous snapshot by
+    window address, so only the workspaces whose windows actually moved get
+    their buckets touched and their cached answers dropped. Queries never
+    leave the process: a repeated "is this edge covered" check is a dict
+    lookup, and a fresh one scans only the windows of one workspace.
     """
-    try:
-        result = subprocess.run(
-            ["hyprctl", "activeworkspace"],
-            capture_output=True,
-            text=True
+
+    def __init__(self, state: HyprlandState):
+        self._state = state
+        # address -> (workspace_id, (x1, y1, x2, y2))
+        self._windows: dict[str, tuple[int, tuple[int, int, int, int]]] = {}
+        # workspace_id -> {address: (x1, y1, x2, y2)}
+        self._by_workspace: dict[int, dict[str, tuple[int, int, int, int]]] = {}
+        # workspace_id -> {region: occluded}
+        self._answers: dict[int, dict[tuple, bool]] = {}
+
+        self._state.connect("clients-changed", self.sync)
+        self.sync()
+
+    @staticmethod
+    def _entry_for(client: dict):
+        if not client.get("mapped", False):
+            return None
+        position = client.get("at")
+        size = client.get("size")
+        if not position or not size:
+            return None
+        x, y = position
+        width, height = size
+        workspace_id = client.get("workspace", {}).get("id")
+        return workspace_id, (x, y, x + width, y + height)
+
+    def _drop(self, address: str, workspace_id: int) -> None:
+        bucket = self._by_workspace.get(workspace_id)
+        if bucket is not None:
+            bucket.pop(address, None)
+            if not bucket:
+                del self._by_workspace[workspace_id]
+        self._answers.pop(workspace_id, None)
+
+    def sync(self, *_) -> None:
+        """Applies the difference between the store and the index."""
+        seen = set()
+        for client in self._state.clients:
+            address = client["address"]
+            seen.add(address)
+            entry = self._entry_for(client)
+            previous = self._windows.get(address)
+            if entry == previous:
+                continue
+            if previous is not None:
+                self._drop(address, previous[0])
+            if entry is None:
+                self._windows.pop(address, None)
+                continue
+            workspace_id, rect = entry
+            self._windows[address] = entry
+            self._by_workspace.setdefault(workspace_id, {})[address] = rect
+            self._answers.pop(workspace_id, None)
+
+        for address in [a for a in self._windows if a not in seen]:
+            workspace_id, _ = self._windows.pop(address)
+            self._drop(address, workspace_id)
+
+    def is_region_occluded(self, region: tuple, workspace_id: int) -> bool:
+        """Whether any mapped window of the workspace overlaps (x, y, w, h)."""
+        answers = self._answers.setdefault(workspace_id, {})
+        cached = answers.get(region)
+        if cached is not None:
+            return cached
+
+        occ_x, occ_y, occ_width, occ_height = region
+        occ_x2 = occ_x + occ_width
+        occ_y2 = occ_y + occ_height
+        occluded = any(
+            not (x2 <= occ_x or x1 >= occ_x2 or y2 <= occ_y or y1 >= occ_y2)
+            for x1, y1, x2, y2 in self._by_workspace.get(workspace_id, {}).values()
         )
-        # Assume the output similar to: "ID <number>"
-        # Extracting the number from the output
-        parts = result.stdout.split()
-        for i, part in enumerate(parts):
-            if part == "ID" and i + 1 < len(parts):
-                return int(parts[i+1])
-    except Exception as e:
-        print(f"Error getting current workspace: {e}")
-    return -1
+        answers[region] = occluded
+        return occluded
+
+    def is_edge_occluded(self, side: str, size: int, monitor: dict | None = None) -> bool:
+        """Whether the `size` px strip along `side` of a monitor is covered."""
+        monitor = monitor or self._state.focused_monitor
+        if monitor is None:
+            return False
+        workspace_id = monitor.get("activeWorkspace", {}).get("id", -1)
+        return self.is_region_occluded(edge_region(side, size, monitor), workspace_id)
+
+
+_index: OcclusionIndex | None = None
+
+
+def get_occlusion_index() -> OcclusionIndex:
+    """Returns the process-wide occlusion index, building it on first use."""
+    global _index
+    if _index is None:
+        _index = OcclusionIndex(HyprlandState.get_initial())
+    return _index
+
+
+def monitor_geometry(monitor: dict) -> tuple[int, int, int, int]:
+    """
+    Logical (x, y, width, height) of a monitor in layout coordinates, the
+    same space Hyprland reports window positions in.
+    """
+    scale = monitor.get("scale", 1) or 1
+    width = round(monitor.get("width", data.CURRENT_WIDTH) / scale)
+    height = round(monitor.get("height", data.CURRENT_HEIGHT) / scale)
+    if monitor.get("transform", 0) % 2 == 1:
+        width, height = height, width
+    return monitor.get("x", 0), monitor.get("y", 0), width, height
+
+
+def edge_region(side: str, size: int, monitor: dict) -> tuple[int, int, int, int]:
+    """Converts a (side, size) pair into an (x, y, width, height) region."""
+    x, y, width, height = monitor_geometry(monitor)
+    side = side.lower()
+    if side == "bottom":
+        return (x, y + height - size, width, size)
+    if side == "top":
+        return (x, y, width, size)
+    if side == "left":
+        return (x, y, size, height)
+    if side == "right":
+        return (x + width - size, y, size, height)
+    raise ValueError(f"Unknown side: {side}")
+
+
+def get_current_workspace():
+    """
+    Get the current workspace ID from the shared Hyprland state.
+    """
+    return HyprlandState.get_initial().active_workspace.get("id", -1)
 
 def get_screen_dimensions():
     """
-    Get screen dimensions from hyprctl.
-    
+    Get screen dimensions from the shared Hyprland state.
+
     Returns:
         tuple: (width, height) of the monitor containing the current workspace
     """
-    try:
-        # Get current workspace
-        workspace_id = get_current_workspace()
-        
-        # Get monitor information
-        result = subprocess.run(
-            ["hyprctl", "-j", "monitors"],
-            capture_output=True,
-            text=True
-        )
-        monitors = json.loads(result.stdout)
-        
-        # Find the monitor containing our workspace
-        for monitor in monitors:
-            if monitor.get("activeWorkspace", {}).get("id") == workspace_id:
-                return monitor.get("width", data.CURRENT_WIDTH), monitor.get("height", data.CURRENT_HEIGHT)
-                
-        # Fallback to first monitor
-        if monitors:
-            return monitors[0].get("width", data.CURRENT_WIDTH), monitors[0].get("height", data.CURRENT_HEIGHT)
-    except Exception as e:
-        print(f"Error getting screen dimensions: {e}")
-    
+    monitor = _monitor_for_workspace(get_current_workspace())
+    if monitor is not None:
+        _, _, width, height = monitor_geometry(monitor)
+        return width, height
+
     # Default fallback values
     return data.CURRENT_WIDTH, data.CURRENT_HEIGHT
 
+def _monitor_for_workspace(workspace_id):
+    state = HyprlandState.get_initial()
+    for monitor in state.monitors:
+        if monitor.get("activeWorkspace", {}).get("id") == workspace_id:
+            return monitor
+    monitors = state.monitors
+    return monitors[0] if monitors else None
+
 def check_occlusion(occlusion_region, workspace=None):
     """
     Check if a region is occupied by any window on a given workspace.
@@ -63,7 +173,8 @@ def check_occlusion(occlusion_region, workspace=None):
     Parameters:
         occlusion_region: Can be one of:
             - tuple (side, size): where side is "top", "bottom", "left", or "right"
-              and size is the pixel width of the region
+              and size is the pixel width of the region, measured from the edge of
+              the monitor showing the workspace
             - tuple (x, y, width, height): The full region coordinates (legacy format)
         workspace (int, optional): The workspace ID to check. If None, the current workspace is used.
 
@@ -72,66 +183,19 @@ def check_occlusion(occlusion_region, workspace=None):
     """
     if workspace is None:
         workspace = get_current_workspace()
-    
+
     # Handle simplified side-based format
     if isinstance(occlusion_region, tuple) and len(occlusion_region) == 2:
         side, size = occlusion_region
-        if isinstance(side, str):
-            # Convert side-based format to coordinates
-            screen_width, screen_height = get_screen_dimensions()
-            
-            if side.lower() == "bottom":
-                occlusion_region = (0, screen_height - size, screen_width, size)
-            elif side.lower() == "top":
-                occlusion_region = (0, 0, screen_width, size)
-            elif side.lower() == "left":
-                occlusion_region = (0, 0, size, screen_height)
-            elif side.lower() == "right":
-                occlusion_region = (screen_width - size, 0, size, screen_height)
-    
+        if isinstance(side, str) and side.lower() in SIDES:
+            monitor = _monitor_for_workspace(workspace)
+            if monitor is None:
+                return False
+            occlusion_region = edge_region(side, size, monitor)
+
     # Ensure occlusion_region is in the correct format (x, y, width, height)
     if not isinstance(occlusion_region, tuple) or len(occlusion_region) != 4:
         print(f"Invalid occlusion region format: {occlusion_region}")
         return False
 
-    try:
-        result = subprocess.run(
-            ["hyprctl", "-j", "clients"],
-            capture_output=True,
-            text=True
-        )
-        clients = json.loads(result.stdout)
-    except Exception as e:
-        print(f"Error retrieving client windows: {e}")
-        return False
-
-    occ_x, occ_y, occ_width, occ_height = occlusion_region
-    occ_x2 = occ_x + occ_width
-    occ_y2 = occ_y + occ_height
-
-    for client in clients:
-        # Check if client is mapped
-        if not client.get("mapped", False):
-            continue
-
-        # Ensure client has proper workspace information and matches the workspace
-        client_workspace = client.get("workspace", {})
-        if client_workspace.get("id") != workspace:
-            continue
-
-        # Ensure client has position and size info
-        position = client.get("at")
-        size = client.get("size")
-        if not position or not size:
-            continue
-
-        x, y = position
-        width, height = size
-        win_x1, win_y1 = x, y
-        win_x2, win_y2 = x + width, y + height
-
-        # Check for intersection between the window and occlusion region
-        if not (win_x2 <= occ_x or win_x1 >= occ_x2 or win_y2 <= occ_y or win_y1 >= occ_y2):
-            return True  # Occlusion region is occupied
-
-    return False  # No window overlaps the occlusion region
+    return get_occlusion_index().is_region_occluded(occlusion_region, workspace)
@@ -0,0 +1,214 @@
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from gi.repository import GLib
+from loguru import logger
+
+# Worker threads shared by all providers that do not run inline.
+MAX_WORKERS = 4
+# Results a worker collects before handing them to the main loop.
+CHUNK_SIZE = 32
+# How long a provider may keep producing results for one query.
+DEFAULT_BUDGET_MS = 300
+
+
+class CancellationToken:
+    """
+    Tells a provider to stop: set when the query it is answering is
+    superseded, or once its time budget runs out. Providers check
+    `stopped` between results and may pass `remaining()` as the timeout
+    of anything that blocks.
+    """
+
+    __slots__ = ("_cancelled", "_parent", "deadline")
+
+    def __init__(self, parent: "CancellationToken | None" = None, budget_ms: int | None = None):
+        self._cancelled = False
+        self._parent = parent
+        self.deadline = time.monotonic() + budget_ms / 1000 if budget_ms is not None else None
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or (self._parent is not None and self._parent.cancelled)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def stopped(self) -> bool:
+        return self.cancelled or self.expired
+
+    def remaining(self) -> float | None:
+        """Seconds left in the budget (never negative), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+class SearchResult:
+    """
+    One launcher row from a provider other than the app search, which
+    yields the apps themselves. `icon` is a theme icon name or an absolute
+    path; `glyph` is markup shown instead, such as an emoji or one of the
+    icon font's characters. Compact results are single-line text rows.
+    """
+
+    __slots__ = ("title", "action", "subtitle", "icon", "glyph", "tooltip", "compact", "data")
+
+    def __init__(
+        self,
+        title: str,
+        action: Callable[[], object],
+        subtitle: str = "",
+        icon: str | None = None,
+        glyph: str | None = None,
+        tooltip: str | None = None,
+        compact: bool = False,
+        data=None,
+    ):
+        self.title = title
+        self.action = action
+        self.subtitle = subtitle
+        self.icon = icon
+        self.glyph = glyph
+        self.tooltip = tooltip
+        self.compact = compact
+        self.data = data
+
+    def activate(self):
+        return self.action()
+
+
+class SearchProvider:
+    """
+    A source of launcher results.
+
+    Providers with a `prefix` answer only queries starting with it, and
+    get the query without it; the others make up the default search, in
+    the order they were registered. `search` runs in a worker thread and
+    should yield results as it finds them, checking the token between
+    them; inline providers, which only read memory owned by the main
+    loop, run on it instead and are shown before any worker result.
+    """
+
+    name = "provider"
+    prefix: str | None = None
+    inline = False
+    min_query_length = 0
+    limit: int | None = None
+    budget_ms = DEFAULT_BUDGET_MS
+    # Whether the first result is preselected, so Enter activates it.
+    select_first = True
+
+    def search(self, query: str, token: CancellationToken) -> Iterable:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Called when the launcher opens; drops anything cached while it was last open."""
+
+
+class SearchDispatcher:
+    """
+    Runs every provider that applies to a query and streams their results.
+
+    Each query gets a fresh cancellation token, and the previous one is
+    cancelled, so providers still working on an older query stop at their
+    next check and their leftovers are dropped. Every provider runs under
+    its own time budget. Worker results reach `on_results(generation,
+    provider, results, done)` on the main loop in chunks of CHUNK_SIZE, so
+    a slow provider never holds back the others.
+    """
+
+    def __init__(self, providers: list[SearchProvider], on_results):
+        self.providers = providers
+        self._on_results = on_results
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="launcher-search")
+        self._token = CancellationToken()
+        self._futures = []
+        self.generation = 0
+
+    def providers_for(self, text: str) -> list[tuple[SearchProvider, str]]:
+        """The providers that answer `text`, with the query each one gets."""
+        for provider in self.providers:
+            if provider.prefix and text.startswith(provider.prefix):
+                return [(provider, text[len(provider.prefix):])]
+        query = text.strip()
+        return [
+            (provider, query)
+            for provider in self.providers
+            if provider.prefix is None and len(query) >= provider.min_query_length
+        ]
+
+    def search(self, text: str) -> list[SearchProvider]:
+        """
+        Starts answering `text`. Inline providers have delivered their
+        results when this returns. Returns the providers involved.
+        """
+        self.cancel()
+        self.generation += 1
+        token = self._token = CancellationToken()
+        active = self.providers_for(text)
+
+        for provider, query in active:
+            provider_token = CancellationToken(token, provider.budget_ms)
+            if provider.inline:
+                self._run_inline(self.generation, provider, query, provider_token)
+            else:
+                self._futures.append(self._executor.submit(
+                    self._run_in_worker, self.generation, provider, query, provider_token
+                ))
+        return [provider for provider, _ in active]
+
+    def cancel(self) -> None:
+        self._token.cancel()
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def _run_inline(self, generation, provider, query, token):
+        try:
+            results = provider.search(query, token)
+            if provider.limit is not None or not isinstance(results, list):
+                results = self._collect(results, provider.limit, token)
+        except Exception as e:
+            logger.warning(f"[Launcher] Provider '{provider.name}' failed: {e}")
+            results = []
+        self._on_results(generation, provider, results, True)
+
+    @staticmethod
+    def _collect(results, limit, token) -> list:
+        collected = []
+        for result in results:
+            collected.append(result)
+            if (limit is not None and len(collected) >= limit) or token.stopped:
+                break
+        return collected
+
+    def _run_in_worker(self, generation, provider, query, token):
+        if token.stopped:
+            return
+        chunk = []
+        count = 0
+        try:
+            for result in provider.search(query, token):
+                if token.cancelled:
+                    return
+                chunk.append(result)
+                count += 1
+                if provider.limit is not None and count >= provider.limit:
+                    break
+                if len(chunk) >= CHUNK_SIZE:
+                    GLib.idle_add(self._on_results, generation, provider, chunk, False)
+                    chunk = []
+                if token.expired:
+                    logger.debug(f"[Launcher] Provider '{provider.name}' ran out of time")
+                    break
+        except Exception as e:
+            logger.warning(f"[Launcher] Provider '{provider.name}' failed: {e}")
+        if not token.cancelled:
+            GLib.idle_add(self._on_results, generation, provider, chunk, True)
@@ -0,0 +1,69 @@
+import mmap
+import os
+import struct
+from array import array
+
+
+def write_section_file(path: str, header: struct.Struct, fields: tuple, sections: list) -> None:
+    """
+    Writes `sections`, (name, bytes or array) pairs, atomically to `path`.
+    The file starts with `header`, packed from `fields` followed by the
+    (offset, length) of every section, so `header` must end with a "QQ"
+    per section. Sections are 8-byte aligned so they can be cast in place.
+    """
+    table = []
+    chunks = []
+    position = header.size
+    for _, chunk in sections:
+        chunk = chunk.tobytes() if isinstance(chunk, array) else chunk
+        padding = -position % 8
+        chunks.append(b"\0" * padding)
+        position += padding
+        table += [position, len(chunk)]
+        chunks.append(chunk)
+        position += len(chunk)
+
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(header.pack(*fields, *table))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+class SectionFile:
+    """
+    A file written by write_section_file, memory-mapped read-only. Only
+    the header is read up front; `fields` holds its values (without the
+    section table), `uint32(name)` gives a section as an array of
+    unsigned 32-bit ints, `bytes(name, start, end)` a slice of one and
+    `view(name)` a whole one in place. With mmap.ACCESS_COPY, views are
+    writable and changes stay private to the process.
+    """
+
+    def __init__(self, path: str, header: struct.Struct, names: tuple[str, ...], access: int = mmap.ACCESS_READ):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=access)
+        values = header.unpack_from(self.map, 0)
+        count = 2 * len(names)
+        self.fields = values[:-count]
+        table = values[-count:]
+        self.starts = {}
+        self.lengths = {}
+        for i, name in enumerate(names):
+            self.starts[name], self.lengths[name] = table[2 * i], table[2 * i + 1]
+            if self.starts[name] + self.lengths[name] > len(self.map):
+                raise ValueError("truncated file")
+        self._view = memoryview(self.map)
+
+    def view(self, name: str) -> memoryview:
+        start = self.starts[name]
+        return self._view[start:start + self.lengths[name]]
+
+    def uint32(self, name: str) -> memoryview:
+        return self.view(name).cast("I")
+
+    def bytes(self, name: str, start: int, end: int) -> bytes:
+        base = self.starts[name]
+        return self.map[base + start:base + end]
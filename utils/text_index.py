@@ -0,0 +1,125 @@
+import threading
+from array import array
+from collections.abc import Iterable
+
+from utils.search_providers import CancellationToken
+
+# Texts checked between looks at the cancellation token.
+CHECK_INTERVAL = 1024
+# Removed texts left in place before the index is rebuilt without them,
+# once they also outnumber the texts still in it.
+COMPACT_MIN = 1024
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Case-insensitive substring search over many short texts, such as the
+    entries of the clipboard history.
+
+    Texts are stored casefolded under integer keys, and every three
+    character substring of a text lists it. A query of three characters
+    or more only checks the texts listed under its rarest trigram; shorter
+    ones check them all. Texts can be added and removed from any thread
+    while searches run on others; searches see the index as it was when
+    they started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Removes every text."""
+        with self._lock:
+            # Ordinal -> key, and -> text (None once removed); trigram -> ordinals.
+            self._keys: list[int] = []
+            self._texts: list[str | None] = []
+            self._ordinals: dict[int, int] = {}
+            self._postings: dict[str, array] = {}
+            self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, entries: Iterable[tuple[int, str]]):
+        """Adds (key, text) pairs. Keys already in the index are skipped."""
+        prepared = []
+        for key, text in entries:
+            text = text.casefold()
+            prepared.append((key, text, _trigrams(text)))
+        with self._lock:
+            keys, texts, ordinals, postings = self._keys, self._texts, self._ordinals, self._postings
+            for key, text, trigrams in prepared:
+                if key in ordinals:
+                    continue
+                ordinal = ordinals[key] = len(texts)
+                keys.append(key)
+                texts.append(text)
+                for trigram in trigrams:
+                    posting = postings.get(trigram)
+                    if posting is None:
+                        postings[trigram] = array("I", (ordinal,))
+                    else:
+                        posting.append(ordinal)
+
+    def remove(self, keys: Iterable[int]):
+        """Removes the texts of `keys`; unknown keys are ignored."""
+        with self._lock:
+            for key in keys:
+                ordinal = self._ordinals.pop(key, None)
+                if ordinal is not None:
+                    # Postings keep the ordinal; searches skip it from now on.
+                    self._texts[ordinal] = None
+                    self._removed += 1
+            if self._removed >= COMPACT_MIN and self._removed > len(self._ordinals):
+                self._compact()
+
+    def _compact(self):
+        # New containers rather than in-place edits: searches running now
+        # hold the old ones, and ordinals in them must keep their meaning.
+        keys, texts, ordinals, postings = [], [], {}, {}
+        for key, text in zip(self._keys, self._texts):
+            if text is None:
+                continue
+            ordinal = ordinals[key] = len(texts)
+            keys.append(key)
+            texts.append(text)
+            for trigram in _trigrams(text):
+                posting = postings.get(trigram)
+                if posting is None:
+                    postings[trigram] = array("I", (ordinal,))
+                else:
+                    posting.append(ordinal)
+        self._keys, self._texts, self._ordinals, self._postings = keys, texts, ordinals, postings
+        self._removed = 0
+
+    def search(self, query: str, token: CancellationToken | None = None) -> list[int] | None:
+        """
+        Keys of the texts containing `query`, ignoring case, in descending
+        order. None if `token` was cancelled first.
+        """
+        needle = query.casefold()
+        with self._lock:
+            keys, texts = self._keys, self._texts
+            if len(needle) >= 3:
+                postings = [self._postings.get(trigram) for trigram in _trigrams(needle)]
+                if any(posting is None for posting in postings):
+                    return []
+                # Copied, as adding texts extends the arrays in place.
+                candidates = min(postings, key=len)[:]
+            else:
+                candidates = range(len(texts))
+
+        matches = []
+        for count, ordinal in enumerate(candidates):
+            if count % CHECK_INTERVAL == 0 and token is not None and token.cancelled:
+                return None
+            text = texts[ordinal]
+            if text is not None and needle in text:
+                matches.append(keys[ordinal])
+        matches.sort(reverse=True)
+        return matches
@@ -0,0 +1,461 @@
+import math
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Base dimensions; a unit's dimension is a vector of exponents over these.
+DIMENSIONS = (
+    "length",
+    "mass",
+    "time",
+    "current",
+    "temperature",
+    "amount",
+    "luminosity",
+    "information",
+    "angle",
+)
+
+
+def dimension(**exponents: int) -> tuple[int, ...]:
+    """The dimension vector with the given exponents, e.g. dimension(length=1, time=-1)."""
+    return tuple(exponents.get(name, 0) for name in DIMENSIONS)
+
+
+DIMENSIONLESS = dimension()
+LENGTH = dimension(length=1)
+AREA = dimension(length=2)
+VOLUME = dimension(length=3)
+MASS = dimension(mass=1)
+TIME = dimension(time=1)
+FREQUENCY = dimension(time=-1)
+SPEED = dimension(length=1, time=-1)
+ACCELERATION = dimension(length=1, time=-2)
+FORCE = dimension(mass=1, length=1, time=-2)
+PRESSURE = dimension(mass=1, length=-1, time=-2)
+ENERGY = dimension(mass=1, length=2, time=-2)
+POWER = dimension(mass=1, length=2, time=-3)
+CURRENT = dimension(current=1)
+CHARGE = dimension(current=1, time=1)
+VOLTAGE = dimension(mass=1, length=2, time=-3, current=-1)
+RESISTANCE = dimension(mass=1, length=2, time=-3, current=-2)
+CAPACITANCE = dimension(mass=-1, length=-2, time=4, current=2)
+INDUCTANCE = dimension(mass=1, length=2, time=-2, current=-2)
+TEMPERATURE = dimension(temperature=1)
+AMOUNT = dimension(amount=1)
+LUMINOUS_INTENSITY = dimension(luminosity=1)
+ILLUMINANCE = dimension(luminosity=1, length=-2)
+INFORMATION = dimension(information=1)
+DATA_RATE = dimension(information=1, time=-1)
+ANGLE = dimension(angle=1)
+
+DIMENSION_NAMES = {
+    DIMENSIONLESS: "number",
+    LENGTH: "length",
+    AREA: "area",
+    VOLUME: "volume",
+    MASS: "mass",
+    TIME: "time",
+    FREQUENCY: "frequency",
+    SPEED: "speed",
+    ACCELERATION: "acceleration",
+    FORCE: "force",
+    PRESSURE: "pressure",
+    ENERGY: "energy",
+    POWER: "power",
+    CURRENT: "current",
+    CHARGE: "charge",
+    VOLTAGE: "voltage",
+    RESISTANCE: "resistance",
+    CAPACITANCE: "capacitance",
+    INDUCTANCE: "inductance",
+    TEMPERATURE: "temperature",
+    AMOUNT: "amount of substance",
+    LUMINOUS_INTENSITY: "luminous intensity",
+    ILLUMINANCE: "illuminance",
+    INFORMATION: "information",
+    DATA_RATE: "data rate",
+    ANGLE: "angle",
+}
+
+# (symbol, name, factor)
+SI_PREFIXES = (
+    ("Y", "yotta", 1e24),
+    ("Z", "zetta", 1e21),
+    ("E", "exa", 1e18),
+    ("P", "peta", 1e15),
+    ("T", "tera", 1e12),
+    ("G", "giga", 1e9),
+    ("M", "mega", 1e6),
+    ("k", "kilo", 1e3),
+    ("h", "hecto", 1e2),
+    ("da", "deca", 1e1),
+    ("d", "deci", 1e-1),
+    ("c", "centi", 1e-2),
+    ("m", "milli", 1e-3),
+    ("µ", "micro", 1e-6),
+    ("μ", None, 1e-6),
+    ("u", None, 1e-6),
+    ("n", "nano", 1e-9),
+    ("p", "pico", 1e-12),
+    ("f", "femto", 1e-15),
+    ("a", "atto", 1e-18),
+    ("z", "zepto", 1e-21),
+    ("y", "yocto", 1e-24),
+)
+# Bits and bytes only come in multiples, decimal or binary.
+DATA_PREFIXES = tuple(prefix for prefix in SI_PREFIXES if prefix[2] >= 1e3) + (
+    ("K", None, 1e3),
+    ("Ki", "kibi", 2.0 ** 10),
+    ("Mi", "mebi", 2.0 ** 20),
+    ("Gi", "gibi", 2.0 ** 30),
+    ("Ti", "tebi", 2.0 ** 40),
+    ("Pi", "pebi", 2.0 ** 50),
+    ("Ei", "exbi", 2.0 ** 60),
+)
+
+
+class Unit(NamedTuple):
+    """
+    A unit as a dimension vector and its relation to the SI base units:
+    a value v of it is (v + offset) * factor in base units. Only absolute
+    temperature scales have an offset.
+    """
+
+    dimension: tuple[int, ...]
+    factor: float
+    offset: float = 0.0
+
+    def __mul__(self, other: "Unit") -> "Unit":
+        return Unit(
+            tuple(a + b for a, b in zip(self.dimension, other.dimension)),
+            self.factor * other.factor,
+        )
+
+    def __truediv__(self, other: "Unit") -> "Unit":
+        return Unit(
+            tuple(a - b for a, b in zip(self.dimension, other.dimension)),
+            self.factor / other.factor,
+        )
+
+    def __pow__(self, exponent: int) -> "Unit":
+        return Unit(tuple(a * exponent for a in self.dimension), self.factor ** exponent)
+
+
+# (symbols, names, dimension, factor, offset, prefixes). Symbols take
+# prefix symbols ("km"), names take prefix names ("kilometer") and plurals.
+DEFINITIONS = (
+    # Length
+    (("m",), ("meter", "metre"), LENGTH, 1, 0, SI_PREFIXES),
+    (("mi",), ("mile",), LENGTH, 1609.344, 0, None),
+    (("yd",), ("yard",), LENGTH, 0.9144, 0, None),
+    (("ft", "'"), ("foot", "feet"), LENGTH, 0.3048, 0, None),
+    (("in", '"'), ("inch",), LENGTH, 0.0254, 0, None),
+    (("nmi",), ("nautical-mile",), LENGTH, 1852, 0, None),
+    (("au",), ("astronomical-unit",), LENGTH, 149597870700, 0, None),
+    (("ly",), ("light-year",), LENGTH, 9460730472580800, 0, None),
+    (("pc",), ("parsec",), LENGTH, 3.0856775814913673e16, 0, None),
+    (("Å",), ("angstrom",), LENGTH, 1e-10, 0, None),
+    # Area
+    (("ha",), ("hectare",), AREA, 1e4, 0, None),
+    (("a",), ("are",), AREA, 1e2, 0, None),
+    (("ac",), ("acre",), AREA, 4046.8564224, 0, None),
+    # Volume
+    (("L", "l"), ("liter", "litre"), VOLUME, 1e-3, 0, SI_PREFIXES),
+    (("gal",), ("gallon",), VOLUME, 3.785411784e-3, 0, None),
+    (("qt",), ("quart",), VOLUME, 9.46352946e-4, 0, None),
+    (("pt",), ("pint",), VOLUME, 4.73176473e-4, 0, None),
+    (("floz", "fl-oz"), ("fluid-ounce",), VOLUME, 2.95735295625e-5, 0, None),
+    ((), ("cup",), VOLUME, 2.365882365e-4, 0, None),
+    (("tbsp",), ("tablespoon",), VOLUME, 1.478676478125e-5, 0, None),
+    (("tsp",), ("teaspoon",), VOLUME, 4.92892159375e-6, 0, None),
+    # Mass
+    (("g",), ("gram",), MASS, 1e-3, 0, SI_PREFIXES),
+    (("t",), ("tonne", "ton", "metric-ton", "metric-tonne"), MASS, 1e3, 0, None),
+    ((), ("long-ton",), MASS, 1016.0469088, 0, None),
+    ((), ("short-ton",), MASS, 907.18474, 0, None),
+    (("lb", "lbs"), ("pound",), MASS, 0.45359237, 0, None),
+    (("st",), ("stone",), MASS, 6.35029318, 0, None),
+    (("oz",), ("ounce",), MASS, 0.028349523125, 0, None),
+    (("ct",), ("carat", "carrat"), MASS, 2e-4, 0, None),
+    (("u", "amu", "Da"), ("atomic-mass-unit", "dalton"), MASS, 1.66053906660e-27, 0, None),
+    # Time
+    (("s", "sec"), ("second",), TIME, 1, 0, SI_PREFIXES),
+    ((), ("milisecond",), TIME, 1e-3, 0, None),
+    (("min",), ("minute",), TIME, 60, 0, None),
+    (("h", "hr"), ("hour",), TIME, 3600, 0, None),
+    (("d",), ("day",), TIME, 86400, 0, None),
+    (("w", "wk"), ("week",), TIME, 604800, 0, None),
+    ((), ("fortnight",), TIME, 1209600, 0, None),
+    (("mo",), ("month",), TIME, 2628000, 0, None),
+    (("yr", "y"), ("year",), TIME, 31536000, 0, None),
+    (("dec",), ("decade",), TIME, 315360000, 0, None),
+    (("cent",), ("century",), TIME, 3153600000, 0, None),
+    ((), ("millennium", "millenia", "millennia"), TIME, 31536000000, 0, None),
+    # Frequency
+    (("Hz",), ("hertz",), FREQUENCY, 1, 0, SI_PREFIXES),
+    (("rpm",), (), FREQUENCY, 1 / 60, 0, None),
+    # Speed; compounds such as km/h and m/s work too.
+    (("mps",), (), SPEED, 1, 0, None),
+    (("kmph", "kph"), (), SPEED, 1 / 3.6, 0, None),
+    (("mph",), (), SPEED, 0.44704, 0, None),
+    (("fps",), (), SPEED, 0.3048, 0, None),
+    (("kn", "kt"), ("knot",), SPEED, 1852 / 3600, 0, None),
+    # Force and pressure
+    (("N",), ("newton",), FORCE, 1, 0, SI_PREFIXES),
+    (("lbf",), ("pound-force",), FORCE, 4.4482216152605, 0, None),
+    (("dyn",), ("dyne",), FORCE, 1e-5, 0, None),
+    (("Pa",), ("pascal",), PRESSURE, 1, 0, SI_PREFIXES),
+    (("bar",), (), PRESSURE, 1e5, 0, SI_PREFIXES),
+    (("atm",), ("atmosphere",), PRESSURE, 101325, 0, None),
+    (("torr", "mmHg"), (), PRESSURE, 101325 / 760, 0, None),
+    (("psi",), (), PRESSURE, 6894.757293168, 0, None),
+    # Energy and power
+    (("J",), ("joule",), ENERGY, 1, 0, SI_PREFIXES),
+    (("cal",), ("calorie",), ENERGY, 4.184, 0, SI_PREFIXES),
+    (("Wh",), ("watt-hour",), ENERGY, 3600, 0, SI_PREFIXES),
+    (("eV",), ("electronvolt",), ENERGY, 1.602176634e-19, 0, SI_PREFIXES),
+    (("BTU", "btu"), (), ENERGY, 1055.05585262, 0, None),
+    (("W",), ("watt",), POWER, 1, 0, SI_PREFIXES),
+    (("hp",), ("horsepower",), POWER, 745.69987158227, 0, None),
+    # Electricity
+    (("A",), ("ampere", "amp"), CURRENT, 1, 0, SI_PREFIXES),
+    ((), ("coulomb",), CHARGE, 1, 0, SI_PREFIXES),
+    (("Ah",), ("ampere-hour",), CHARGE, 3600, 0, SI_PREFIXES),
+    (("V",), ("volt",), VOLTAGE, 1, 0, SI_PREFIXES),
+    (("Ω", "ohm"), ("ohm",), RESISTANCE, 1, 0, SI_PREFIXES),
+    ((), ("kilohm",), RESISTANCE, 1e3, 0, None),
+    ((), ("megohm",), RESISTANCE, 1e6, 0, None),
+    (("F",), ("farad",), CAPACITANCE, 1, 0, SI_PREFIXES),
+    (("H",), ("henry",), INDUCTANCE, 1, 0, SI_PREFIXES),
+    # Temperature; "c", "f" and "k" as in earlier versions.
+    (("K", "k"), ("kelvin",), TEMPERATURE, 1, 0, None),
+    (("°C", "C", "c", "degC"), ("celsius",), TEMPERATURE, 1, 273.15, None),
+    (("°F", "f", "degF"), ("fahrenheit",), TEMPERATURE, 5 / 9, 459.67, None),
+    (("°R", "R"), ("rankine",), TEMPERATURE, 5 / 9, 0, None),
+    (("Ré",), ("reaumur",), TEMPERATURE, 5 / 4, 218.52, None),
+    # Light and amount of substance
+    (("cd",), ("candela",), LUMINOUS_INTENSITY, 1, 0, None),
+    (("lm",), ("lumen",), LUMINOUS_INTENSITY, 1, 0, None),
+    (("lx",), ("lux",), ILLUMINANCE, 1, 0, None),
+    (("mol",), ("mole",), AMOUNT, 1, 0, SI_PREFIXES),
+    # Information
+    # "Gb" is a gigabit and "GB" a gigabyte; bytes come first so that
+    # spellings matched ignoring case ("gb") stay bytes.
+    (("B",), ("byte",), INFORMATION, 8, 0, DATA_PREFIXES),
+    (("bit", "b"), (), INFORMATION, 1, 0, DATA_PREFIXES),
+    (("bps",), (), DATA_RATE, 1, 0, DATA_PREFIXES),
+    # Angle
+    (("rad",), ("radian",), ANGLE, 1, 0, SI_PREFIXES),
+    (("deg", "°"), ("degree",), ANGLE, math.pi / 180, 0, None),
+    (("grad", "gon"), ("gradian",), ANGLE, math.pi / 200, 0, None),
+    (("arcmin",), ("arcminute",), ANGLE, math.pi / 10800, 0, None),
+    (("arcsec",), ("arcsecond",), ANGLE, math.pi / 648000, 0, None),
+    (("rev",), ("turn", "revolution"), ANGLE, 2 * math.pi, 0, None),
+    # Plain numbers
+    (("%",), ("percent",), DIMENSIONLESS, 1e-2, 0, None),
+    (("dozen",), (), DIMENSIONLESS, 12, 0, None),
+)
+
+# Names that mean something else when the other side of a conversion
+# needs it: "m" is a minute next to "s", "oz" a fluid ounce next to "ml",
+# "F" degrees Fahrenheit next to "C".
+ALTERNATES = {
+    "F": "°F",
+    "m": "min",
+    "oz": "floz",
+    "ounce": "fluid-ounce",
+    "ounces": "fluid-ounces",
+}
+
+# Upper-case spellings earlier versions accepted, which would otherwise
+# fold to the mega-prefixed unit ("MM" is a millimeter, not a megameter).
+LEGACY_SPELLINGS = {
+    "M": "m",
+    "KM": "km",
+    "CM": "cm",
+    "MM": "mm",
+    "UM": "um",
+    "NM": "nm",
+    "MI": "mi",
+    "YD": "yd",
+    "FT": "ft",
+    "IN": "in",
+    "NMI": "nmi",
+}
+
+TERM = re.compile(r"^(?:(square|cubic)-)?(.+?)(?:\^?(-?\d+))?$")
+SQUARE_CUBE = {"square": 2, "cubic": 3}
+
+
+def plural(name: str) -> str:
+    if name.endswith(("s", "x", "z", "ch", "sh")):
+        return name + "es"
+    if name.endswith("y") and name[-2:-1] not in "aeiou":
+        return name[:-1] + "ies"
+    return name + "s"
+
+
+class UnitRegistry:
+    """
+    Every known unit spelling, compiled once into a single hash map from
+    spelling to Unit: symbols and names, each with its prefixes, and the
+    plural of every name. Lookups are a dictionary hit, with a
+    case-insensitive fallback for spellings like "KWH". Compound units
+    (km/h, kWh, MiB/s, m^2, square-feet, N*m) are built from their terms
+    and memoized. Uses a singleton pattern.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        """Gets the singleton instance of the UnitRegistry."""
+        if UnitRegistry.instance is None:
+            UnitRegistry.instance = UnitRegistry()
+        return UnitRegistry.instance
+
+    def __init__(self):
+        self._units: dict[str, Unit] = {}
+        generated = []
+        for symbols, names, dim, factor, offset, prefixes in DEFINITIONS:
+            unit = Unit(dim, float(factor), float(offset))
+            for spelling in (*symbols, *names):
+                self._units.setdefault(spelling, unit)
+            for name in names:
+                self._units.setdefault(plural(name), unit)
+            for prefix_symbol, prefix_name, prefix_factor in prefixes or ():
+                prefixed = Unit(dim, factor * prefix_factor, offset)
+                generated.extend((prefix_symbol + symbol, prefixed) for symbol in symbols)
+                if prefix_name:
+                    for name in names:
+                        generated.append((prefix_name + name, prefixed))
+                        generated.append((plural(prefix_name + name), prefixed))
+        # Spelled-out units win over prefixed ones ("min" is not milli-inch).
+        for spelling, unit in generated:
+            self._units.setdefault(spelling, unit)
+        for spelling, canonical in LEGACY_SPELLINGS.items():
+            self._units[spelling] = self._units[canonical]
+
+        # Earlier spellings, and larger prefixes, win when case is ignored:
+        # "mhz" is a megahertz.
+        self._folded: dict[str, Unit] = {}
+        for spelling, unit in self._units.items():
+            self._folded.setdefault(spelling.casefold(), unit)
+
+    def __contains__(self, expression: str) -> bool:
+        try:
+            self.unit(expression)
+        except ValueError:
+            return False
+        return True
+
+    def lookup(self, spelling: str) -> Unit | None:
+        """The unit spelled exactly `spelling`, or ignoring case, if any."""
+        unit = self._units.get(spelling)
+        if unit is None:
+            unit = self._folded.get(spelling.casefold())
+        return unit
+
+    def unit(self, expression: str) -> Unit:
+        """The unit for `expression`, simple or compound. Raises ValueError if unknown."""
+        return self._parse(expression.strip())
+
+    @lru_cache(maxsize=512)
+    def _parse(self, expression: str) -> Unit:
+        unit = self.lookup(expression)
+        if unit is not None:
+            return unit
+        expression = expression.replace("-per-", "/").replace("·", "*").replace("×", "*")
+        parts = re.split(r"([*/])", expression)
+        if not parts[0]:
+            raise ValueError(f"Unknown unit '{expression}'")
+
+        result = None
+        operator = "*"
+        for index, part in enumerate(parts):
+            if index % 2:
+                operator = part
+                continue
+            term = self._parse_term(part, expression)
+            if term.offset and len(parts) > 1:
+                raise ValueError(f"'{part}' cannot be part of a compound unit")
+            if result is None:
+                result = term
+            else:
+                result = result * term if operator == "*" else result / term
+        if not 0 < result.factor < math.inf:
+            raise ValueError(f"'{expression}' is out of range")
+        return result
+
+    def _parse_term(self, term: str, expression: str) -> Unit:
+        unit = self.lookup(term)
+        if unit is not None:
+            return unit
+        match = TERM.match(term)
+        if match is None:
+            raise ValueError(f"Unknown unit '{expression}'")
+        power, name, exponent = match.groups()
+        unit = self.lookup(name)
+        if unit is None:
+            raise ValueError(f"Unknown unit '{name}'")
+        exponent = int(exponent) if exponent else 1
+        if power:
+            exponent *= SQUARE_CUBE[power]
+        if exponent != 1:
+            if unit.offset:
+                raise ValueError(f"'{name}' cannot be raised to a power")
+            try:
+                unit = unit ** exponent
+            except OverflowError:
+                unit = None
+            # Powers can also leave a factor too small to be told from zero.
+            if unit is None or not 0 < unit.factor < math.inf:
+                raise ValueError(f"'{term}' is out of range")
+        return unit
+
+    def resolve(self, from_unit: str, to_unit: str) -> tuple[Unit, Unit]:
+        """
+        The units for converting `from_unit` to `to_unit`, trying the
+        alternate meanings of ambiguous names. Raises ValueError when the
+        dimensions do not match.
+        """
+        source = self.unit(from_unit)
+        target = self.unit(to_unit)
+        if source.dimension == target.dimension:
+            return source, target
+        for from_spelling, to_spelling in (
+            (ALTERNATES.get(from_unit), to_unit),
+            (from_unit, ALTERNATES.get(to_unit)),
+        ):
+            if from_spelling and to_spelling:
+                source_alt, target_alt = self.unit(from_spelling), self.unit(to_spelling)
+                if source_alt.dimension == target_alt.dimension:
+                    return source_alt, target_alt
+        raise ValueError(
+            f"Cannot convert {describe(source.dimension)} ({from_unit}) "
+            f"to {describe(target.dimension)} ({to_unit})"
+        )
+
+    def convert(self, value: float, from_unit: str, to_unit: str) -> float:
+        return self.convert_many((value,), from_unit, to_unit)[0]
+
+    def convert_many(self, values, from_unit: str, to_unit: str) -> list[float]:
+        """Converts every value in `values`, resolving the units once."""
+        source, target = self.resolve(from_unit, to_unit)
+        # value -> (value + source.offset) * scale - target.offset
+        scale = source.factor / target.factor
+        shift = source.offset * scale - target.offset
+        return [value * scale + shift for value in values]
+
+
+def describe(dim: tuple[int, ...]) -> str:
+    """A readable name for a dimension vector, e.g. "speed" or "length²·time"."""
+    if dim in DIMENSION_NAMES:
+        return DIMENSION_NAMES[dim]
+    superscripts = str.maketrans("-0123456789", "⁻⁰¹²³⁴⁵⁶⁷⁸⁹")
+    return "·".join(
+        name if exponent == 1 else f"{name}{str(exponent).translate(superscripts)}"
+        for name, exponent in zip(DIMENSIONS, dim)
+        if exponent
+    )
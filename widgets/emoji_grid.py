@@ -0,0 +1,207 @@
+import math
+from typing import Callable
+
+import cairo
+import gi
+from fabric.widgets.widget import Widget
+
+import config.data as data
+from services.emoji_index import EmojiIndex
+from utils.glyph_atlas import GlyphAtlas
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gdk, Gtk, Pango  # noqa: E402
+
+ATLAS_DIR = f"{data.CACHE_DIR}/emoji-atlas"
+
+
+class EmojiGrid(Gtk.DrawingArea, Widget):
+    """
+    A page of emojis painted from a glyph atlas, where a button per emoji
+    would otherwise be.
+
+    Items are emoji ids, laid out `columns` to a row in cells `cell_size`
+    pixels square and `spacing` apart. The grid does its own hit-testing,
+    hover, pressing, selection and tooltips; clicking a cell calls
+    `on_activate` with its emoji id. Glyphs take the grid's font and
+    color, and highlighted cells are drawn with the `cell` style class in
+    the :hover, :active or :selected state. Grids of the same glyph size
+    share an atlas.
+    """
+
+    _atlases: dict[tuple, GlyphAtlas] = {}
+
+    def __init__(
+        self,
+        emoji_index: EmojiIndex,
+        columns: int,
+        rows: int,
+        on_activate: Callable[[int], None],
+        cell_size: int = 56,
+        spacing: int = 2,
+        name: str | None = None,
+        visible: bool = True,
+        **kwargs,
+    ):
+        Gtk.DrawingArea.__init__(self)
+        Widget.__init__(self, name=name, visible=visible, **kwargs)
+        self._emoji_index = emoji_index
+        self._columns = columns
+        self._on_activate = on_activate
+        self._cell_size = cell_size
+        self._spacing = spacing
+        self._items: list[int] = []
+        self._selected = -1
+        self._hovered = -1
+        self._pressed = -1
+        self._atlas: GlyphAtlas | None = None
+
+        self.set_size_request(
+            columns * (cell_size + spacing) - spacing,
+            rows * (cell_size + spacing) - spacing,
+        )
+        self.set_has_tooltip(True)
+        self.add_events(
+            Gdk.EventMask.BUTTON_PRESS_MASK
+            | Gdk.EventMask.BUTTON_RELEASE_MASK
+            | Gdk.EventMask.POINTER_MOTION_MASK
+            | Gdk.EventMask.LEAVE_NOTIFY_MASK
+        )
+        self.connect("draw", self._on_draw)
+        self.connect("motion-notify-event", self._on_motion)
+        self.connect("leave-notify-event", self._on_leave)
+        self.connect("button-press-event", self._on_button_press)
+        self.connect("button-release-event", self._on_button_release)
+        self.connect("query-tooltip", self._on_query_tooltip)
+        self.connect("style-updated", self._drop_atlas)
+        self.connect("notify::scale-factor", self._drop_atlas)
+
+    @property
+    def items(self) -> list[int]:
+        """The emoji ids shown. Must not be mutated."""
+        return self._items
+
+    def set_items(self, items: list[int]):
+        """Shows `items`, without a selection."""
+        self._items = items
+        self._selected = self._hovered = self._pressed = -1
+        self.queue_draw()
+
+    @property
+    def selected(self) -> int:
+        return self._selected
+
+    def select(self, index: int):
+        """Marks the cell of item `index` as selected (-1 for none)."""
+        self._selected = index
+        self.queue_draw()
+
+    def _cell_origin(self, index: int) -> tuple[int, int]:
+        stride = self._cell_size + self._spacing
+        return index % self._columns * stride, index // self._columns * stride
+
+    def _hit(self, x: float, y: float) -> int:
+        stride = self._cell_size + self._spacing
+        if x < 0 or y < 0:
+            return -1
+        column, row = int(x // stride), int(y // stride)
+        if column >= self._columns or x - column * stride >= self._cell_size or y - row * stride >= self._cell_size:
+            return -1
+        index = row * self._columns + column
+        return index if index < len(self._items) else -1
+
+    def _get_atlas(self) -> GlyphAtlas:
+        if self._atlas is not None:
+            return self._atlas
+        context = self.get_style_context()
+        font: Pango.FontDescription = context.get_property("font", Gtk.StateFlags.NORMAL)
+        color = context.get_color(Gtk.StateFlags.NORMAL)
+        color = (color.red, color.green, color.blue, color.alpha)
+        font_size = font.get_size() / Pango.SCALE
+        if not font.get_size_is_absolute():
+            font_size *= 96 / 72
+        # Color emoji run wider and taller than the font size.
+        size = min(math.ceil(font_size * 1.3), self._cell_size)
+        scale = self.get_scale_factor()
+
+        key = (size, scale, font.to_string(), color)
+        atlas = EmojiGrid._atlases.get(key)
+        if atlas is None:
+            atlas = EmojiGrid._atlases[key] = GlyphAtlas(
+                f"{ATLAS_DIR}/{size * scale}px.bin",
+                len(self._emoji_index),
+                size,
+                scale,
+                font,
+                color,
+                self._emoji_index.signature,
+            )
+        self._atlas = atlas
+        return atlas
+
+    def _drop_atlas(self, *args):
+        self._atlas = None
+        self.queue_draw()
+
+    def _on_draw(self, widget, cr: cairo.Context):
+        atlas = self._get_atlas()
+        context = self.get_style_context()
+        cell = self._cell_size
+        inset = (cell - atlas.size) // 2
+        for index, emoji_id in enumerate(self._items):
+            x, y = self._cell_origin(index)
+            state = Gtk.StateFlags.NORMAL
+            if index == self._hovered:
+                state |= Gtk.StateFlags.PRELIGHT
+            if index == self._pressed:
+                state |= Gtk.StateFlags.ACTIVE
+            if index == self._selected:
+                state |= Gtk.StateFlags.SELECTED
+            if state != Gtk.StateFlags.NORMAL:
+                context.save()
+                context.add_class("cell")
+                context.set_state(state)
+                Gtk.render_background(context, cr, x, y, cell, cell)
+                context.restore()
+            atlas.draw(cr, emoji_id, self._emoji_index.char(emoji_id), x + inset, y + inset)
+        return False
+
+    def _set_hovered(self, index: int):
+        if index != self._hovered:
+            self._hovered = index
+            self.queue_draw()
+
+    def _on_motion(self, widget, event):
+        self._set_hovered(self._hit(event.x, event.y))
+        return False
+
+    def _on_leave(self, widget, event):
+        self._set_hovered(-1)
+        return False
+
+    def _on_button_press(self, widget, event):
+        if event.button != Gdk.BUTTON_PRIMARY:
+            return False
+        self._pressed = self._hit(event.x, event.y)
+        self.queue_draw()
+        return self._pressed != -1
+
+    def _on_button_release(self, widget, event):
+        if event.button != Gdk.BUTTON_PRIMARY or self._pressed == -1:
+            return False
+        index, self._pressed = self._pressed, -1
+        self.queue_draw()
+        if self._hit(event.x, event.y) == index:
+            self._on_activate(self._items[index])
+        return True
+
+    def _on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        index = self._hit(x, y)
+        if index == -1:
+            return False
+        left, top = self._cell_origin(index)
+        area = Gdk.Rectangle()
+        area.x, area.y, area.width, area.height = left, top, self._cell_size, self._cell_size
+        tooltip.set_text(self._emoji_index.name(self._items[index]) or "Unknown")
+        tooltip.set_tip_area(area)
+        return True
@@ -0,0 +1,233 @@
+import math
+from collections.abc import Hashable
+from typing import Callable
+
+import gi
+from fabric.widgets.widget import Widget
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib, Gtk  # noqa: E402
+
+
+class VirtualList(Gtk.Layout, Widget):
+    """
+    A scrollable list that only has widgets for the rows on screen.
+
+    Rows are made by `create_row` and filled in by `bind_row(row, item)`.
+    The list keeps a pool of about as many rows as fit in the viewport,
+    plus `overscan` on either side, and rebinds them to other items as it
+    scrolls or its items change, so long lists cost no more widgets than
+    short ones. A bound row carries `list_index` and `item` attributes.
+    Rows are laid out at one height. Lists whose rows come in several
+    shapes pass `row_kind`, which tells an item's shape; each shape is
+    measured once, and rows are as tall as the tallest shape among the
+    items shown. Add it to a ScrolledWindow directly; it is scrollable on
+    its own and needs no viewport.
+    """
+
+    def __init__(
+        self,
+        create_row: Callable[[], Gtk.Widget],
+        bind_row: Callable[[Gtk.Widget, object], None],
+        row_kind: Callable[[object], Hashable] | None = None,
+        spacing: int = 0,
+        overscan: int = 2,
+        name: str | None = None,
+        visible: bool = True,
+        h_expand: bool = False,
+        v_expand: bool = False,
+        **kwargs,
+    ):
+        Gtk.Layout.__init__(self)
+        Widget.__init__(
+            self,
+            name=name,
+            visible=visible,
+            h_expand=h_expand,
+            v_expand=v_expand,
+            **kwargs,
+        )
+        self._create_row = create_row
+        self._bind_row = bind_row
+        self._row_kind = row_kind
+        self._kind_heights: dict = {}
+        self._spacing = spacing
+        self._overscan = overscan
+        self._items: list = []
+        self._rows: list[Gtk.Widget] = []
+        self._row_height = 0
+        self._width = 0
+        self._selected = -1
+        self._adjustment = None
+        self._adjustment_handler = 0
+        self._relayout_id = 0
+
+        self.connect("size-allocate", self._on_size_allocate)
+        self.connect("style-updated", self._on_style_updated)
+        self.connect("notify::vadjustment", self._on_vadjustment_set)
+        self._on_vadjustment_set()
+
+    @property
+    def items(self) -> list:
+        """The items currently shown. Must not be mutated."""
+        return self._items
+
+    def set_items(self, items: list, keep_position: bool = False):
+        """
+        Shows `items` from the top, without a selection. With
+        `keep_position`, as when more results stream in, the scroll
+        position and the selection (if still in range) are kept.
+        """
+        self._items = items
+        if not keep_position or self._selected >= len(items):
+            self._selected = -1
+        for row in self._rows:
+            row.list_index = -1
+        if self._row_kind is not None:
+            # The new items may not include the tallest shape, or may add a taller one.
+            self._row_height = 0
+        self._measure_rows()
+        self._update_size()
+        adjustment = self.get_vadjustment()
+        if adjustment is not None and not keep_position:
+            adjustment.set_value(0)
+        self._update_visible()
+
+    def select(self, index: int):
+        """Marks the row of item `index` as selected (-1 for none) and scrolls to it."""
+        self._selected = index
+        for row in self._rows:
+            self._style_selected(row)
+        if index >= 0:
+            self.scroll_to(index)
+
+    def scroll_to(self, index: int):
+        """Scrolls just enough for item `index` to be fully visible."""
+        adjustment = self.get_vadjustment()
+        if adjustment is None or not self._row_height:
+            return
+        top = index * self._stride
+        bottom = top + self._row_height
+        value = adjustment.get_value()
+        page_size = adjustment.get_page_size()
+        if top < value:
+            adjustment.set_value(top)
+        elif bottom > value + page_size:
+            adjustment.set_value(bottom - page_size)
+
+    @property
+    def _stride(self) -> int:
+        return self._row_height + self._spacing
+
+    def _new_row(self) -> Gtk.Widget:
+        row = self._create_row()
+        row.list_index = -1
+        row.item = None
+        if self._width:
+            row.set_size_request(self._width, -1)
+        self.put(row, 0, 0)
+        row.show_all()
+        self._rows.append(row)
+        return row
+
+    def _measure_rows(self):
+        if self._row_height or not self._items:
+            return
+        if self._row_kind is None:
+            self._row_height = self._measure(0)
+            return
+        first_of_kind = {}
+        for index, item in enumerate(self._items):
+            first_of_kind.setdefault(self._row_kind(item), index)
+        for kind, index in first_of_kind.items():
+            if kind not in self._kind_heights:
+                self._kind_heights[kind] = self._measure(index)
+        self._row_height = max(self._kind_heights[kind] for kind in first_of_kind)
+
+    def _measure(self, index: int) -> int:
+        row = self._rows[0] if self._rows else self._new_row()
+        self._bind(row, index)
+        # Placed before the stride was known; bind it again when shown.
+        row.list_index = -1
+        return max(row.get_preferred_height()[1], 1)
+
+    def _update_size(self):
+        height = max(len(self._items) * self._stride - self._spacing, 0) if self._items else 0
+        self.set_size(self._width, height)
+
+    def _update_visible(self, *args):
+        count = len(self._items)
+        used = set()
+        if count:
+            self._measure_rows()
+            adjustment = self.get_vadjustment()
+            value = adjustment.get_value() if adjustment is not None else 0
+            page_size = adjustment.get_page_size() if adjustment is not None else 0
+            page_size = page_size or self.get_allocated_height()
+            stride = self._stride
+            first = max(int(value // stride) - self._overscan, 0)
+            last = min(int(math.ceil((value + page_size) / stride)) + self._overscan, count)
+            while len(self._rows) < last - first:
+                self._new_row()
+
+            pool_size = len(self._rows)
+            for index in range(first, last):
+                slot = index % pool_size
+                used.add(slot)
+                row = self._rows[slot]
+                if row.list_index != index:
+                    self._bind(row, index)
+                row.show()
+
+        for slot, row in enumerate(self._rows):
+            if slot not in used:
+                row.list_index = -1
+                row.item = None
+                row.hide()
+
+    def _bind(self, row: Gtk.Widget, index: int):
+        row.list_index = index
+        row.item = self._items[index]
+        self._bind_row(row, row.item)
+        self.move(row, 0, index * self._stride)
+        self._style_selected(row)
+
+    def _style_selected(self, row: Gtk.Widget):
+        context = row.get_style_context()
+        if row.list_index >= 0 and row.list_index == self._selected:
+            context.add_class("selected")
+        else:
+            context.remove_class("selected")
+
+    def _on_size_allocate(self, widget, allocation):
+        if allocation.width != self._width:
+            self._width = allocation.width
+            for row in self._rows:
+                row.set_size_request(self._width, -1)
+            self._update_size()
+        self._update_visible()
+
+    def _on_style_updated(self, *args):
+        # Rows may have changed height; measure again once styles settle.
+        if not self._relayout_id:
+            self._relayout_id = GLib.idle_add(self._relayout)
+
+    def _relayout(self):
+        self._relayout_id = 0
+        self._row_height = 0
+        self._kind_heights = {}
+        for row in self._rows:
+            row.list_index = -1
+        self._measure_rows()
+        self._update_size()
+        self._update_visible()
+        return False
+
+    def _on_vadjustment_set(self, *args):
+        if self._adjustment is not None:
+            self._adjustment.disconnect(self._adjustment_handler)
+        self._adjustment = self.get_vadjustment()
+        if self._adjustment is not None:
+            self._adjustment_handler = self._adjustment.connect(
+                "value-changed", self._update_visible
+            )